@@ -0,0 +1,92 @@
+# Общий межпотоковый батч (MultiStreamEngine) против отдельного инференса на каждый источник:
+#   python -m benchmarks.bench_multi_stream --streams 1,2,4,8
+#   python -m benchmarks.bench_multi_stream --model models/best.pt --backend onnx --streams 2,4
+# Источники - синтетические ролики, читаются без пауз. Без --model модель заменяется
+# таймером: батч из n кадров занимает fixed + n * per_frame мс и держит общую блокировку,
+# как одна модель, занимающая все ядра. Такой замер показывает выигрыш от батчинга и
+# честность планировщика, но не конкуренцию за память и кэш - для них нужен --model.
+# В режиме per-stream у каждого источника своя модель (с --model - свой экземпляр бэкенда).
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_pipeline import make_synthetic_clip
+from utils.multi_stream import MultiStreamEngine
+
+
+class TimedModel:
+    """Замена модели: время батча fixed + n * per_frame, вычисления по одному батчу за раз"""
+
+    device_lock = threading.Lock()
+
+    def __init__(self, fixed_ms, per_frame_ms):
+        self.fixed = fixed_ms / 1000.0
+        self.per_frame = per_frame_ms / 1000.0
+
+    def predict(self, frames):
+        with self.device_lock:
+            time.sleep(self.fixed + self.per_frame * len(frames))
+        return [None] * len(frames)
+
+
+def make_model(args):
+    if args.model is None:
+        return TimedModel(args.fixed_ms, args.per_frame_ms)
+    from utils.backends import create_backend
+
+    model = create_backend(args.backend, args.model, imgsz=args.imgsz)
+    model.warmup()
+    return model
+
+
+def run_engines(engines):
+    threads = [threading.Thread(target=e.run, daemon=True) for e in engines]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    streams = [s for e in engines for s in e.stats()['streams']]
+    frames = sum(s['frames_inferred'] for s in streams)
+    latency = sum(s['latency_ms'] for s in streams) / len(streams)
+    batches = sum(e.batches for e in engines)
+    return frames / elapsed, latency, frames / batches if batches else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Shared cross-stream batching vs per-stream inference')
+    parser.add_argument('--streams', default='1,2,4,8')
+    parser.add_argument('--frames', type=int, default=120, help='frames per synthetic clip')
+    parser.add_argument('--size', default='640x360')
+    parser.add_argument('--max-batch', type=int, default=None, help='shared batch limit (default: streams)')
+    parser.add_argument('--fixed-ms', type=float, default=8.0, help='timed model: cost per batch')
+    parser.add_argument('--per-frame-ms', type=float, default=4.0, help='timed model: cost per frame')
+    parser.add_argument('--model', default=None, help='real weights instead of the timed model')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--imgsz', type=int, default=640)
+    args = parser.parse_args(argv)
+
+    size = tuple(int(v) for v in args.size.split('x'))
+    print(f"{'streams':>7} {'mode':>10} {'fps':>8} {'latency, ms':>12} {'mean batch':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (int(c) for c in args.streams.split(',')):
+            clips = [make_synthetic_clip(os.path.join(tmp, f"clip{i}.avi"), args.frames, size, seed=i)
+                     for i in range(count)]
+
+            shared = make_model(args)
+            engine = MultiStreamEngine(clips, shared.predict, lambda *a: None, max_batch=args.max_batch)
+            fps, latency, batch = run_engines([engine])
+            print(f"{count:>7} {'shared':>10} {fps:>8.1f} {latency:>12.1f} {batch:>11.2f}")
+
+            engines = [MultiStreamEngine([clip], make_model(args).predict, lambda *a: None, max_batch=1)
+                       for clip in clips]
+            fps, latency, batch = run_engines(engines)
+            print(f"{count:>7} {'per-stream':>10} {fps:>8.1f} {latency:>12.1f} {batch:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
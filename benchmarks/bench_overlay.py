@@ -0,0 +1,41 @@
+# Стоимость отрисовки рамок на кадре 1080p в зависимости от числа рамок:
+#   python -m benchmarks.bench_overlay
+# Сравнивает Results.plot() (копия кадра + рендер подписей на каждый кадр) с
+# utils.overlay.OverlayRenderer (рисование на месте + кеш спрайтов подписей).
+import argparse
+import time
+
+from benchmarks.bench_detection_aggregation import make_result
+from utils.overlay import OverlayRenderer, result_data
+
+
+def time_call(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Results.plot() vs cached in-place overlay')
+    parser.add_argument('--counts', default='0,5,25,50,100,200')
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    renderer = OverlayRenderer()
+    print(f"{'boxes':>6} {'plot(), ms':>11} {'overlay, ms':>12} {'speedup':>8}")
+    for count in (int(c) for c in args.counts.split(',')):
+        result = make_result(count)
+        frame = result.orig_img.copy()
+        data = result_data(result)
+
+        plot = time_call(result.plot, args.repeat)
+        # Кадр принадлежит вызывающему, поэтому рисуем в него же без копии
+        overlay = time_call(lambda: renderer.draw(frame, data, result.names), args.repeat)
+        print(f"{count:>6} {plot:>11.2f} {overlay:>12.2f} {plot / max(overlay, 1e-6):>7.1f}x")
+    print(f"[BENCH] Sprite cache: {renderer.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# Бенчмарк полного пути обработки VideoThread без дисплея (QT_QPA_PLATFORM=offscreen):
+#   python -m benchmarks.bench_pipeline --model models/best.pt --clips videos/test.mp4 \
+#       --imgsz 320,640 --backend torch,onnx --batch-size 1,4 --threads 2,4 --save-video 0,1 \
+#       --baseline benchmarks/baseline.json
+# Каждая конфигурация запускается в отдельном процессе, чтобы пиковый RSS и число
+# потоков torch/OpenCV не переходили из одного замера в другой.
+# --update-baseline сохраняет результаты как новый эталон; без него при заданном
+# --baseline код возврата 1 означает регрессию.
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def make_synthetic_clip(path, frames=300, size=(1280, 720), fps=30.0, seed=0):
+    """Дорога-заглушка: шум и движущиеся цветные фигуры, чтобы кодек и модель не скучали"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (w, h))
+    shapes = [(rng.integers(0, w), rng.integers(0, h), rng.integers(-8, 8), rng.integers(-4, 4),
+               tuple(int(c) for c in rng.integers(0, 255, 3))) for _ in range(12)]
+    for i in range(frames):
+        frame = rng.integers(60, 120, (h, w, 3), dtype=np.uint8)
+        for x, y, dx, dy, color in shapes:
+            cx, cy = int((x + dx * i) % w), int((y + dy * i) % h)
+            cv2.circle(frame, (cx, cy), 30, color, -1)
+            cv2.rectangle(frame, (cx - 20, cy + 40), (cx + 20, cy + 60), color, -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def run_config(config):
+    """Один прогон в свежем процессе: VideoThread.run() синхронно, модель уже прогрета"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    threads = config['threads']
+    cv2.setNumThreads(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+    from PyQt6.QtCore import QCoreApplication
+    from utils.model_manager import ModelManager
+    from utils.video_thread import VideoThread
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    manager = ModelManager(warmup_runs=2)
+    load_start = time.perf_counter()
+    model = manager.get(config['model'], config['backend'], 'cpu', config['imgsz'])
+    load_ms = (time.perf_counter() - load_start) * 1000.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        thread = VideoThread(config['model'], config['clip'], os.path.join(tmp, 'result.avi'),
+                             device='cpu', imgsz=config['imgsz'], save_video=config['save_video'],
+                             batch_size=config['batch_size'], backend=config['backend'],
+                             model_manager=manager)
+        # Кадры для показа сразу возвращаются в кольцо, как это делал бы GUI
+        thread.frame_ready.connect(lambda qimg, slot: thread.release_display_buffer(slot))
+
+        cpu_start = os.times()
+        start = time.perf_counter()
+        thread.run()
+        elapsed = time.perf_counter() - start
+        cpu_end = os.times()
+
+    manager.shutdown(wait=False)
+    del app
+
+    cpu_seconds = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+    stages = {name: {k: round(v, 3) for k, v in s.items() if k not in ('count', 'buckets')}
+              for name, s in thread.metrics.snapshot().items()}
+    return {
+        'config': config,
+        'backend_used': model.name,
+        'frames': thread.frame_count,
+        'seconds': round(elapsed, 3),
+        'fps': round(thread.frame_count / elapsed, 2) if elapsed > 0 else 0.0,
+        'load_ms': round(load_ms, 1),
+        # Linux: ru_maxrss в килобайтах
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        'cpu_cores_used': round(cpu_seconds / elapsed, 2) if elapsed > 0 else 0.0,
+        'cpu_percent': round(100.0 * cpu_seconds / elapsed / (os.cpu_count() or 1), 1) if elapsed > 0 else 0.0,
+        'stages': stages,
+    }
+
+
+def config_key(config):
+    return (f"{os.path.basename(config['clip'])}|imgsz={config['imgsz']}|{config['backend']}|"
+            f"batch={config['batch_size']}|threads={config['threads']}|save={int(config['save_video'])}")
+
+
+def run_repeated(config, repeat):
+    """Медиана по FPS из repeat прогонов, каждый в новом процессе"""
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            runs.append(pool.submit(run_config, config).result())
+    runs.sort(key=lambda r: r['fps'])
+    result = runs[len(runs) // 2]
+    result['fps_runs'] = [r['fps'] for r in runs]
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии: FPS ниже эталона, p95 стадий или пиковый RSS выше больше чем на tolerance"""
+    regressions = []
+    for key, run in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if run['fps'] < base['fps'] * (1.0 - tolerance):
+            regressions.append(f"{key}: fps {base['fps']} -> {run['fps']}")
+        if run['peak_rss_mb'] > base['peak_rss_mb'] * (1.0 + tolerance):
+            regressions.append(f"{key}: peak RSS {base['peak_rss_mb']} -> {run['peak_rss_mb']} MB")
+        for stage, s in run['stages'].items():
+            base_stage = base['stages'].get(stage)
+            # Стадии короче миллисекунды слишком шумные для сравнения
+            if base_stage is None or base_stage['p95_ms'] < 1.0:
+                continue
+            if s['p95_ms'] > base_stage['p95_ms'] * (1.0 + tolerance):
+                regressions.append(f"{key}: {stage} p95 {base_stage['p95_ms']} -> {s['p95_ms']} ms")
+    return regressions
+
+
+def host_info():
+    import torch
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def _list(text, cast=str):
+    return [cast(v) for v in text.split(',') if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless throughput benchmark of the VideoThread path')
+    parser.add_argument('--model', default='models/best.pt')
+    parser.add_argument('--clips', default='', help='comma-separated recorded clips')
+    parser.add_argument('--synthetic', type=int, default=300,
+                        help='frames in the generated synthetic clip (0 = none)')
+    parser.add_argument('--synthetic-size', default='1280x720')
+    parser.add_argument('--imgsz', default='640')
+    parser.add_argument('--backend', default='torch', help="comma-separated: torch, onnx, openvino")
+    parser.add_argument('--batch-size', default='1,4')
+    parser.add_argument('--threads', default=str(os.cpu_count() or 1))
+    parser.add_argument('--save-video', default='0,1')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default='benchmarks/results/pipeline.json')
+    parser.add_argument('--baseline', default=None, help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    clips = _list(args.clips)
+    if args.synthetic:
+        w, h = (int(v) for v in args.synthetic_size.split('x'))
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        clips.append(make_synthetic_clip(os.path.join(output_dir, f"synthetic_{w}x{h}_{args.synthetic}.avi"),
+                                         args.synthetic, (w, h)))
+    if not clips:
+        print("[BENCH] No clips to run")
+        return 1
+
+    grid = itertools.product(clips, _list(args.imgsz, int), _list(args.backend), _list(args.batch_size, int),
+                             _list(args.threads, int), _list(args.save_video, lambda v: v == '1'))
+    results = {}
+    for clip, imgsz, backend, batch_size, threads, save_video in grid:
+        config = {'model': args.model, 'clip': clip, 'imgsz': imgsz, 'backend': backend,
+                  'batch_size': batch_size, 'threads': threads, 'save_video': save_video}
+        key = config_key(config)
+        print(f"[BENCH] {key} ...", flush=True)
+        try:
+            results[key] = run_repeated(config, args.repeat)
+        except Exception as e:
+            print(f"[BENCH] {key} FAILED: {e}")
+            continue
+        run = results[key]
+        slowest = max((s for s in run['stages'].items() if s[0] not in ('predict', 'latency')),
+                      key=lambda s: s[1]['p95_ms'], default=(None, None))[0]
+        print(f"[BENCH] {key}: {run['fps']} FPS, RSS {run['peak_rss_mb']} MB, "
+              f"CPU {run['cpu_percent']}%, slowest stage: {slowest}")
+
+    report = {'timestamp': time.time(), 'host': host_info(), 'runs': results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Results: {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[BENCH] Baseline updated: {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('host', {}).get('cpu_count') != report['host']['cpu_count']:
+        print("[BENCH] Warning: baseline was recorded on a different host")
+    regressions = compare(results, baseline['runs'], args.tolerance)
+    for line in regressions:
+        print(f"[BENCH] REGRESSION {line}")
+    if not regressions:
+        print(f"[BENCH] No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# Задержка SignTracker на кадр в зависимости от числа знаков в кадре (бюджет - 1 мс):
+#   python -m benchmarks.bench_tracker
+# Знаки движутся с постоянной скоростью и дрожанием рамок, часть детекций
+# пропадает и появляются ложные срабатывания; каждый 4-й кадр - без инференса (predict).
+import argparse
+import time
+
+import numpy as np
+
+from utils.tracker import SignTracker
+
+BUDGET_MS = 1.0
+
+
+def make_scene(count, frames, rng, width=1920, height=1080):
+    """Детекции по кадрам: (N, 6) x1, y1, x2, y2, conf, cls"""
+    start = rng.uniform([0, 0], [width - 100, height - 100], size=(count, 2))
+    velocity = rng.uniform(-8, 8, size=(count, 2))
+    size = rng.uniform(20, 90, size=count)
+    classes = rng.integers(0, 40, size=count)
+    scene = []
+    for t in range(frames):
+        xy = start + velocity * t + rng.normal(0, 1.5, size=(count, 2))
+        keep = rng.random(count) > 0.1
+        data = np.column_stack([xy, xy + size[:, None], rng.uniform(0.3, 0.95, count), classes])[keep]
+        noise = rng.uniform(0, min(width, height) - 50, size=(2, 2))
+        false = np.column_stack([noise, noise + 30, np.full(2, 0.3), rng.integers(0, 40, 2)])
+        scene.append(np.vstack([data, false]))
+    return scene
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SignTracker latency per frame')
+    parser.add_argument('--counts', default='1,5,10,25,50,100')
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'signs':>6} {'update, ms':>11} {'p95, ms':>8} {'predict, ms':>12} {'tracks':>7} {'budget':>7}")
+    for count in (int(c) for c in args.counts.split(',')):
+        scene = make_scene(count, args.frames, rng)
+        tracker = SignTracker()
+        updates, predicts = [], []
+        for t, data in enumerate(scene):
+            start = time.perf_counter()
+            if t % 4 == 3:
+                tracker.predict()
+                predicts.append(time.perf_counter() - start)
+            else:
+                tracker.update(data)
+                updates.append(time.perf_counter() - start)
+        update_ms = np.array(updates) * 1e3
+        p95 = float(np.percentile(update_ms, 95))
+        print(f"{count:>6} {update_ms.mean():>11.3f} {p95:>8.3f} {np.mean(predicts) * 1e3:>12.3f} "
+              f"{len(tracker):>7} {'ok' if p95 < BUDGET_MS else 'OVER':>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,16 @@
 # main.py
+#   python main.py                    # обычный запуск
+#   python main.py --profile-startup  # + время импорта каждого модуля в логе и logs/startup.jsonl
 import sys
 import os
 import traceback
+
+from utils.startup import StartupProfile
+
+PROFILE_FLAG = '--profile-startup'
+# Профилировщик ставится до остальных импортов, чтобы учесть и их
+startup = StartupProfile(profile_imports=PROFILE_FLAG in sys.argv)
+
 from PyQt6 import QtWidgets
 from utils.logging_config import logger
 
@@ -15,14 +24,15 @@ def main():
 
         from ui.mainwindow import MainApp
 
-        app = QtWidgets.QApplication(sys.argv)
+        app = QtWidgets.QApplication([arg for arg in sys.argv if arg != PROFILE_FLAG])
         logger.info("QApplication created")
 
-        window = MainApp()
+        window = MainApp(startup=startup)
         logger.info("Main window created")
 
         window.show()
-        logger.info("Main window shown")
+        app.processEvents()
+        logger.info(f"Main window shown in {startup.mark('window_shown'):.2f} s")
 
         logger.info("Entering application event loop")
         exit_code = app.exec()
@@ -37,4 +47,4 @@ def main():
 
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
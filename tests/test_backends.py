@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+import utils.backends as backends
+from utils.backends import (SELECTION_FILE, InferenceBackend, TorchBackend, available_backends,
+                            resolve_backend_name, select_backend, weights_cache_root, weights_hash)
+
+
+def fake_backend(backend_name, ms, available=True, quantized=False):
+    """Бэкенд без модели: benchmark возвращает заданное время, созданные экземпляры считаются"""
+
+    class FakeBackend(InferenceBackend):
+        name = backend_name
+        created = 0
+        benchmarked = 0
+
+        def __init__(self, model_path, device='cpu', imgsz=640):
+            type(self).created += 1
+            self.model_path = model_path
+
+        @staticmethod
+        def available():
+            return available
+
+        def benchmark(self, runs=10):
+            type(self).benchmarked += 1
+            return ms
+
+    FakeBackend.quantized = quantized
+    return FakeBackend
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / 'best.pt'
+    path.write_bytes(b'weights' * 100)
+    return str(path)
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    registry = {
+        'torch': fake_backend('torch', 30.0),
+        'onnx': fake_backend('onnx', 10.0),
+        'openvino': fake_backend('openvino', 5.0, available=False),
+        'onnx-int8': fake_backend('onnx-int8', 1.0, quantized=True),
+    }
+    monkeypatch.setattr(backends, 'BACKENDS', registry)
+    return registry
+
+
+def test_available_backends(fakes):
+    # Недоступный рантайм и INT8 в автовыбор не входят
+    assert available_backends('best.pt') == ['torch', 'onnx']
+    assert available_backends('best.onnx') == ['torch']
+    assert available_backends('best.pt', device='cuda:0') == ['torch']
+
+
+def test_selection_is_cached(fakes, weights):
+    assert resolve_backend_name('auto', weights) is None
+
+    backend = select_backend(weights)
+    assert backend.name == 'onnx'
+    assert fakes['torch'].benchmarked == 1 and fakes['onnx'].benchmarked == 1
+
+    path = os.path.join(weights_cache_root(weights), SELECTION_FILE)
+    with open(path, encoding='utf-8') as f:
+        entry = next(iter(json.load(f).values()))
+    assert entry == {'backend': 'onnx', 'timings_ms': {'torch': 30.0, 'onnx': 10.0}}
+
+    # Повторный выбор загружает сохранённый бэкенд без замеров
+    created = fakes['torch'].created
+    assert select_backend(weights).name == 'onnx'
+    assert fakes['onnx'].benchmarked == 1 and fakes['torch'].created == created
+    assert resolve_backend_name('auto', weights) == 'onnx'
+
+    # Выбор привязан к устройству и размеру входа
+    assert resolve_backend_name('auto', weights, imgsz=320) is None
+    assert select_backend(weights, use_cache=False).name == 'onnx'
+    assert fakes['onnx'].benchmarked == 2
+
+
+def test_resolve_backend_name(fakes, weights):
+    assert resolve_backend_name('openvino-int8', weights) == 'openvino-int8'
+    assert resolve_backend_name('auto', 'best.onnx') == 'torch'
+    assert resolve_backend_name('auto', weights, device='cuda') == 'torch'
+
+
+def test_weights_hash_is_memoized(weights):
+    first = weights_hash(weights)
+    stat = os.stat(weights)
+    # Тот же размер и mtime - хэш берётся из памяти без чтения файла
+    with open(weights, 'wb') as f:
+        f.write(b'W' * stat.st_size)
+    os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert weights_hash(weights) == first
+
+    os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert weights_hash(weights) != first
+
+
+def test_default_artifact_path_uses_weights_as_is(weights):
+    assert InferenceBackend.artifact_path('cache', 'best') is None
+    backend = TorchBackend.__new__(TorchBackend)
+    assert backend.prepare(weights, 640) == weights
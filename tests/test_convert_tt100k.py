@@ -0,0 +1,79 @@
+import json
+
+import pytest
+import yaml
+from PIL import Image
+
+from utils.convert_tt100k_to_yolo import image_size, main
+
+
+def make_tt100k(root):
+    imgs = {
+        '1': {'path': 'train/1.jpg', 'objects': [
+            {'category': 'pl40', 'bbox': {'xmin': 10, 'ymin': 10, 'xmax': 30, 'ymax': 30}}]},
+        '2': {'path': 'test/2.jpg', 'objects': [
+            {'category': 'i2', 'bbox': {'xmin': 5, 'ymin': 5, 'xmax': 25, 'ymax': 25}}]},
+    }
+    for split in ('train', 'test'):
+        (root / split).mkdir(parents=True)
+    for entry in imgs.values():
+        Image.new('RGB', (64, 48)).save(root / entry['path'])
+    with open(root / 'annotations.json', 'w', encoding='utf-8') as f:
+        json.dump({'types': ['i2', 'pl40'], 'imgs': imgs}, f)
+
+
+def test_class_only_in_test_split_keeps_ids(tmp_path):
+    make_tt100k(tmp_path / 'data')
+    out = tmp_path / 'out'
+
+    assert main(['--root', str(tmp_path / 'data'), '--out', str(out), '--workers', '1']) == 0
+
+    # i2 есть только в test, но id классов не зависят от выбранных splits
+    assert json.loads((out / 'classes.json').read_text(encoding='utf-8')) == ['i2', 'pl40']
+    data = yaml.safe_load((out / 'data.yaml').read_text(encoding='utf-8'))
+    assert data['names'] == {0: 'i2', 1: 'pl40'}
+    assert (out / 'labels' / 'train' / '1.txt').read_text(encoding='utf-8').split()[0] == '1'
+    assert not (out / 'labels' / 'test').exists()
+
+
+def truncated_jpeg(path, size):
+    Image.new('RGB', (64, 48)).save(path, format='JPEG')
+    data = path.read_bytes()
+    path.write_bytes(data[:size])
+
+
+@pytest.mark.parametrize('size', [3, 5, 20, 21, 100])
+def test_image_size_truncated_jpeg(tmp_path, size):
+    path = tmp_path / 'broken.jpg'
+    truncated_jpeg(path, size)
+    with pytest.raises(ValueError):
+        image_size(str(path))
+
+
+def test_truncated_jpeg_does_not_abort_conversion(tmp_path):
+    make_tt100k(tmp_path / 'data')
+    truncated_jpeg(tmp_path / 'data' / 'train' / '1.jpg', 21)
+    Image.new('RGB', (64, 48)).save(tmp_path / 'data' / 'train' / '3.jpg')
+    ann_path = tmp_path / 'data' / 'annotations.json'
+    ann = json.loads(ann_path.read_text(encoding='utf-8'))
+    ann['imgs']['3'] = {'path': 'train/3.jpg', 'objects': [
+        {'category': 'pl40', 'bbox': {'xmin': 1, 'ymin': 1, 'xmax': 9, 'ymax': 9}}]}
+    ann_path.write_text(json.dumps(ann), encoding='utf-8')
+    out = tmp_path / 'out'
+
+    assert main(['--root', str(tmp_path / 'data'), '--out', str(out), '--workers', '1']) == 0
+
+    assert not (out / 'labels' / 'train' / '1.txt').exists()
+    assert (out / 'labels' / 'train' / '3.txt').exists()
+
+
+def test_warns_when_val_points_at_train(tmp_path, capsys):
+    make_tt100k(tmp_path / 'data')
+    out = tmp_path / 'out'
+
+    main(['--root', str(tmp_path / 'data'), '--out', str(out), '--workers', '1'])
+    assert "no validation split" in capsys.readouterr().out
+
+    main(['--root', str(tmp_path / 'data'), '--out', str(out), '--workers', '1', '--splits', 'train', 'test'])
+    assert "WARNING" not in capsys.readouterr().out
+    assert yaml.safe_load((out / 'data.yaml').read_text(encoding='utf-8'))['val'] == 'images/test'
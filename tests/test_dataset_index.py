@@ -0,0 +1,50 @@
+import numpy as np
+from PIL import Image
+
+from utils.dataset_index import _parse_chunk, parse_label_file
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'label.txt'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_parse_valid_file(tmp_path):
+    data, bad = parse_label_file(write(tmp_path, "3 0.5 0.5 0.1 0.2\n7 0.25 0.75 0.05 0.05\n"))
+    assert bad == 0
+    np.testing.assert_allclose(data[:, 0], [3, 7])
+
+
+def test_parse_empty_file(tmp_path):
+    data, bad = parse_label_file(write(tmp_path, ""))
+    assert data.shape == (0, 5) and bad == 0
+
+
+def test_parse_mixed_field_counts(tmp_path):
+    # 4 + 6 полей = 10: по общему числу похоже на две корректные строки
+    data, bad = parse_label_file(write(tmp_path, "3 0.5 0.5 0.1\n7 0.25 0.75 0.05 0.05 0.9\n"))
+    assert bad == 2
+    assert data.shape == (0, 5)
+
+
+def test_parse_keeps_valid_lines_of_broken_file(tmp_path):
+    data, bad = parse_label_file(write(tmp_path, "3 0.5 0.5 0.1 0.2\n1 0.1 0.2\nx 0.1 0.2 0.3 0.4\n"))
+    assert bad == 2
+    np.testing.assert_allclose(data, [[3, 0.5, 0.5, 0.1, 0.2]])
+
+
+def test_parse_chunk_survives_truncated_image(tmp_path):
+    (tmp_path / 'labels').mkdir()
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'labels' / 'a.txt').write_text("0 0.5 0.5 0.1 0.1\n", encoding='utf-8')
+    (tmp_path / 'labels' / 'b.txt').write_text("1 0.5 0.5 0.1 0.1\n", encoding='utf-8')
+    Image.new('RGB', (64, 48)).save(tmp_path / 'images' / 'a.jpg')
+    data = (tmp_path / 'images' / 'a.jpg').read_bytes()
+    (tmp_path / 'images' / 'b.jpg').write_bytes(data[:21])
+
+    rows, counts, bad, sizes = _parse_chunk(str(tmp_path / 'labels'), str(tmp_path / 'images'),
+                                            [('a.txt', 'a.jpg'), ('b.txt', 'b.jpg')])
+
+    assert counts.tolist() == [1, 1]
+    assert sizes.tolist() == [[64, 48], [0, 0]]
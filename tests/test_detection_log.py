@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.detection_log import DetectionLog, DetectionLogWriter
+
+NAMES = {0: 'pl40', 1: 'i2', 2: 'p11'}
+
+
+def boxes(frame, classes):
+    return np.array([[10.0 * i, frame, 10.0 * i + 5, frame + 5.0, 0.5 + 0.1 * i, c]
+                     for i, c in enumerate(classes)], dtype=np.float32)
+
+
+def write_frames(writer, frames, start=0):
+    """frames: списки классов по кадрам; wall = 1000 + номер кадра"""
+    for offset, classes in enumerate(frames):
+        frame = start + offset
+        writer.append(frame, frame / 25.0, 1000.0 + frame, boxes(frame, classes))
+
+
+def test_round_trip_across_chunk_boundary(tmp_path):
+    path = str(tmp_path / 'session.detlog')
+    writer = DetectionLogWriter(path, NAMES, chunk_rows=4)
+    frames = [[0, 1, 2], [0], [], [1, 1, 2], [2, 0, 0], [1]]
+    write_frames(writer, frames)
+    writer.close()
+
+    log = DetectionLog(path)
+    assert len(log) == 11
+    assert [c['rows'] for c in log.index['chunks']] == [4, 4, 3]
+    # Незаполненный последний чанк сохранён без предвыделенного хвоста
+    assert len(np.load(os.path.join(path, log.index['chunks'][-1]['file']))) == 3
+
+    records = log.query()
+    expected = np.concatenate([boxes(f, c) for f, c in enumerate(frames) if c])
+    assert records['frame'].tolist() == [f for f, c in enumerate(frames) for _ in c]
+    np.testing.assert_allclose(records['x1'], expected[:, 0])
+    np.testing.assert_allclose(records['conf'], expected[:, 4])
+    assert records['cls'].tolist() == expected[:, 5].astype(int).tolist()
+    assert (records['track_id'] == -1).all()
+    assert log.class_counts() == {'pl40': 4, 'i2': 4, 'p11': 3}
+
+
+def test_class_and_time_range_queries(tmp_path):
+    path = str(tmp_path / 'session.detlog')
+    writer = DetectionLogWriter(path, NAMES, chunk_rows=4)
+    # Класс 2 встречается только в последних кадрах
+    write_frames(writer, [[0, 1]] * 6 + [[2, 0]] * 2)
+    writer.close()
+
+    log = DetectionLog(path)
+    records = log.query(['p11'])
+    assert records['frame'].tolist() == [6, 7]
+    # Чанки без класса по индексу не читаются
+    assert log.chunks_read == 1
+
+    log.chunks_read = 0
+    records = log.query(start=1002.0, end=1005.0)
+    assert sorted(set(records['frame'].tolist())) == [2, 3, 4]
+    assert log.chunks_read == 2
+
+    records = log.query(['i2', 0], start=1005.0, by='wall')
+    assert records['frame'].tolist() == [5, 5, 6, 7]
+    records = log.query([1], start=2 / 25.0, end=3 / 25.0, by='pts')
+    assert records['frame'].tolist() == [2]
+    assert len(log.query(min_conf=0.55)) == 8
+
+    with pytest.raises(KeyError):
+        log.query(['unknown'])
+
+
+def test_reopen_after_crash_without_final_flush(tmp_path):
+    path = str(tmp_path / 'session.detlog')
+    writer = DetectionLogWriter(path, NAMES, chunk_rows=8, flush_interval=3600.0)
+    write_frames(writer, [[0, 1]] * 5)
+    writer.flush_index()
+    # Кадры после последнего сброса индекса теряются при аварии: close() не вызывается
+    write_frames(writer, [[2]] * 3, start=5)
+    del writer
+
+    log = DetectionLog(path)
+    assert len(log) == 10
+    assert log.query()['frame'].max() == 4
+    assert log.query(['p11']).size == 0
+
+    # Запись продолжается в новый чанк после уже записанных
+    writer = DetectionLogWriter(path, chunk_rows=8)
+    assert writer.rows == 10
+    write_frames(writer, [[2]] * 3, start=5)
+    writer.close()
+
+    log = DetectionLog(path)
+    assert len(log) == 13
+    assert log.query(['p11'])['frame'].tolist() == [5, 6, 7]
+    assert log.query(start=1004.0)['frame'].tolist() == [4, 4, 5, 6, 7]
+    assert log.names == NAMES
@@ -0,0 +1,211 @@
+import threading
+import time
+
+import pytest
+
+from utils.frame_pipeline import (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_LATEST, BatchSizeTuner,
+                                  BoundedFrameQueue, FramePipeline)
+
+
+class FakeCapture:
+    """Отдаёт count кадров (номера кадров), затем конец видео"""
+
+    def __init__(self, count):
+        self.count = count
+        self.index = 0
+
+    def read(self):
+        if self.index >= self.count:
+            return False, None
+        self.index += 1
+        return True, self.index - 1
+
+
+def test_block_policy_waits_for_space():
+    queue = BoundedFrameQueue('q', maxsize=2, policy=POLICY_BLOCK)
+    assert queue.put(0) and queue.put(1)
+    assert not queue.put(2, timeout=0.05)
+    assert queue.dropped == 0 and len(queue) == 2
+
+    # Место освобождается из другого потока - put дожидается его
+    threading.Timer(0.05, queue.get).start()
+    assert queue.put(2, timeout=2.0)
+    assert [queue.get(), queue.get()] == [1, 2]
+    stats = queue.stats()
+    assert stats['put'] == 3 and stats['get'] == 3 and stats['dropped'] == 0 and stats['max_depth'] == 2
+
+
+def test_drop_oldest_policy_keeps_newest_items():
+    queue = BoundedFrameQueue('q', maxsize=3, policy=POLICY_DROP_OLDEST)
+    for i in range(5):
+        assert queue.put(i, timeout=0)
+    assert queue.dropped == 2
+    assert queue.get_many(3, timeout=0) == [2, 3, 4]
+
+
+def test_latest_policy_keeps_single_frame():
+    queue = BoundedFrameQueue('q', maxsize=3, policy=POLICY_LATEST)
+    for i in range(3):
+        queue.put(i)
+    # Переполнение выбрасывает всю очередь, остаётся только новый кадр
+    queue.put(3)
+    assert queue.dropped == 3 and len(queue) == 1
+    assert queue.get() == 3
+
+
+def test_close_wakes_blocked_put_and_drains():
+    queue = BoundedFrameQueue('q', maxsize=1, policy=POLICY_BLOCK)
+    queue.put(0)
+    result = []
+    t = threading.Thread(target=lambda: result.append(queue.put(1, timeout=5.0)))
+    t.start()
+    time.sleep(0.05)
+    queue.close()
+    t.join(timeout=1.0)
+    assert not t.is_alive() and result == [False]
+
+    assert not queue.put(2)
+    assert not queue.drained()
+    assert queue.get() == 0
+    assert queue.drained() and queue.get(timeout=0) is None
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedFrameQueue('q', policy='lifo')
+
+
+def test_pipeline_renders_every_frame_in_order():
+    rendered = []
+    pipeline = FramePipeline(FakeCapture(50), lambda frames: [f * 10 for f in frames],
+                             lambda index, frame, result: rendered.append((index, frame, result)),
+                             batch_size=4)
+    pipeline.run()
+
+    assert rendered == [(i, i, i * 10) for i in range(50)]
+    stats = pipeline.stats()
+    assert stats['frames_read'] == stats['frames_inferred'] == stats['frames_rendered'] == 50
+    assert all(q['dropped'] == 0 for q in stats['queues'].values())
+    assert not any(t.is_alive() for t in pipeline._threads)
+
+
+def test_pipeline_stop_from_render_shuts_down_stages():
+    capture = FakeCapture(10 ** 6)
+    pipeline = None
+
+    def render(index, frame, result):
+        if index == 5:
+            pipeline.stop()
+
+    pipeline = FramePipeline(capture, lambda frames: frames, render)
+    pipeline.run()
+
+    # run() возвращается только после остановки потоков захвата и инференса
+    assert not any(t.is_alive() for t in pipeline._threads)
+    assert pipeline.capture_queue.closed and pipeline.result_queue.closed
+    assert pipeline.frames_rendered == 6
+    assert capture.index < 10 ** 6
+    assert pipeline.error is None
+
+
+def test_pipeline_inference_error_stops_all_stages():
+    def predict(frames):
+        if frames[0] == 3:
+            raise RuntimeError('model failed')
+        return frames
+
+    rendered = []
+    pipeline = FramePipeline(FakeCapture(10 ** 6), predict, lambda i, f, r: rendered.append(i))
+    pipeline.run()
+
+    assert isinstance(pipeline.error, RuntimeError)
+    # Кадры после ошибки не отрисовываются; успевшие - по порядку
+    assert rendered == list(range(len(rendered))) and len(rendered) <= 3
+    assert not any(t.is_alive() for t in pipeline._threads)
+
+
+def test_live_pipeline_counts_dropped_frames():
+    gate = threading.Event()
+
+    def predict(frames):
+        # Первый кадр задерживается, пока захват не переполнит очередь
+        gate.wait(2.0)
+        return frames
+
+    capture = FakeCapture(200)
+    original_read = capture.read
+
+    def read():
+        if capture.index == 100:
+            gate.set()
+        return original_read()
+
+    capture.read = read
+    pipeline = FramePipeline(capture, predict, lambda i, f, r: None, live=True)
+    assert pipeline.batch_size == 1 and pipeline.capture_queue.policy == POLICY_LATEST
+    pipeline.run()
+
+    queue = pipeline.capture_queue.stats()
+    assert queue['dropped'] > 0
+    assert queue['put'] == 200
+    # Каждый кадр либо отрисован, либо учтён в счётчике потерь
+    assert queue['put'] == queue['get'] + queue['dropped']
+    assert pipeline.frames_rendered == queue['get']
+
+
+def tune(tuner, cost_per_frame, limit=100):
+    """Кормит тюнер замерами cost_per_frame(batch) с, пока он не зафиксирует размер"""
+    sizes = []
+    for _ in range(limit):
+        if tuner.settled:
+            break
+        size = tuner.batch_size
+        sizes.append(size)
+        tuner.record(size, cost_per_frame(size) * size)
+    return sizes
+
+
+def test_tuner_grows_while_throughput_improves():
+    tuner = BatchSizeTuner(max_batch=64, samples=3)
+    # Время на кадр падает до батча 8, дальше не меняется
+    sizes = tune(tuner, lambda size: 0.010 / min(size, 8))
+    assert tuner.settled and tuner.batch_size == 8
+    assert sorted(set(sizes)) == [1, 2, 4, 8, 16]
+    assert tuner.best_cost == pytest.approx(0.010 / 8)
+
+
+def test_tuner_backs_off_on_regression():
+    tuner = BatchSizeTuner(max_batch=64, samples=3)
+    costs = {1: 0.010, 2: 0.006, 4: 0.004, 8: 0.009}
+    tune(tuner, costs.__getitem__)
+    assert tuner.settled and tuner.batch_size == 4
+
+
+def test_tuner_ignores_warmup_and_small_gains():
+    tuner = BatchSizeTuner(max_batch=64, samples=3, min_gain=0.05)
+    timings = iter([
+        0.050, 0.010, 0.011,  # батч 1: первый замер - прогрев, лучший 10 мс/кадр
+        0.500, 0.0195, 0.0196,  # батч 2: 9.75 мс/кадр - выигрыш меньше 5%
+    ])
+    while not tuner.settled:
+        size = tuner.batch_size
+        tuner.record(size, next(timings))
+    assert tuner.batch_size == 1
+    assert tuner.best_cost == pytest.approx(0.010)
+
+
+def test_tuner_respects_max_batch():
+    tuner = BatchSizeTuner(max_batch=6, samples=2)
+    sizes = tune(tuner, lambda size: 0.010 / size)
+    assert max(sizes) == 6 and tuner.batch_size == 6
+    assert BatchSizeTuner(max_batch=1).settled
+
+
+def test_tuner_skips_partial_batches():
+    tuner = BatchSizeTuner(max_batch=8, samples=2)
+    tuner.record(1, 0.01)
+    tuner.record(1, 0.01)
+    assert tuner.batch_size == 2
+    # Хвост видео короче батча не влияет на замеры
+    tuner.record(1, 1.0)
+    assert tuner._costs == []
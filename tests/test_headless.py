@@ -0,0 +1,25 @@
+import os
+
+from utils.headless import output_names
+
+
+def test_unique_names_keep_file_stem():
+    videos = [os.path.join(os.sep, 'v', 'a.mp4'), os.path.join(os.sep, 'v', 'b.mp4')]
+    assert output_names(videos) == {videos[0]: 'a', videos[1]: 'b'}
+
+
+def test_same_name_in_different_dirs():
+    videos = [os.path.join(os.sep, 'v', 'day', 'clip.mp4'), os.path.join(os.sep, 'v', 'night', 'clip.mp4'),
+              os.path.join(os.sep, 'v', 'other.mp4')]
+    names = output_names(videos)
+    assert names[videos[0]] == 'day_clip'
+    assert names[videos[1]] == 'night_clip'
+    assert names[videos[2]] == 'other'
+
+
+def test_same_stem_in_one_dir_gets_hash():
+    videos = [os.path.join(os.sep, 'v', 'clip.mp4'), os.path.join(os.sep, 'v', 'clip.avi')]
+    names = output_names(videos)
+    assert len(set(names.values())) == 2
+    assert names[videos[0]] == 'clip'
+    assert names[videos[1]].startswith('clip_')
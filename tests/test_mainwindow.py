@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('PyQt6.QtWidgets')
+
+from ui.mainwindow import MainApp
+
+
+class FakeThread:
+    def __init__(self):
+        self.waited = False
+
+    def wait(self, timeout=None):
+        self.waited = True
+        return True
+
+
+def fake_app(thread, sender):
+    calls = []
+    return SimpleNamespace(
+        thread=thread,
+        sender=lambda: sender,
+        result_cache=SimpleNamespace(stats=lambda: {}),
+        set_default_image=lambda: calls.append('default_image'),
+        ui=SimpleNamespace(label_5=SimpleNamespace(setText=lambda text: None)),
+        stage_label=SimpleNamespace(setText=lambda text: None),
+        calls=calls,
+    )
+
+
+def test_late_finished_signal_keeps_current_thread():
+    old, current = FakeThread(), FakeThread()
+    app = fake_app(current, sender=old)
+
+    MainApp.video_finished(app)
+
+    assert app.thread is current
+    assert not current.waited
+    assert app.calls == []
+
+
+def test_finished_signal_of_current_thread_releases_it():
+    current = FakeThread()
+    app = fake_app(current, sender=current)
+
+    MainApp.video_finished(app)
+
+    assert app.thread is None
+    assert current.waited
+    assert app.calls == ['default_image']
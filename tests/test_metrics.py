@@ -0,0 +1,75 @@
+import re
+
+import numpy as np
+import pytest
+
+from utils.metrics import BUCKETS, RollingHistogram, StageMetrics, to_prometheus
+
+
+def test_percentiles_over_rolling_window():
+    hist = RollingHistogram(window=100)
+    # Старые медленные замеры вытесняются из окна новыми быстрыми
+    for _ in range(100):
+        hist.record(1.0)
+    values = np.arange(1, 101) / 1000.0
+    for v in values:
+        hist.record(v)
+
+    s = hist.summary()
+    assert s['p50_ms'] == pytest.approx(np.percentile(values, 50) * 1000.0)
+    assert s['p95_ms'] == pytest.approx(np.percentile(values, 95) * 1000.0)
+    assert s['p99_ms'] == pytest.approx(np.percentile(values, 99) * 1000.0)
+    # Среднее и счётчик - за всё время
+    assert s['count'] == 200
+    assert s['mean_ms'] == pytest.approx((100.0 + values.sum()) / 200 * 1000.0)
+
+
+def test_partially_filled_window():
+    hist = RollingHistogram(window=512)
+    assert hist.summary() is None
+    for v in (0.010, 0.020, 0.030):
+        hist.record(v)
+    s = hist.summary()
+    # Незаполненные нулевые ячейки буфера в перцентили не попадают
+    assert s['p50_ms'] == pytest.approx(20.0)
+    assert s['count'] == 3
+
+
+def test_buckets_are_cumulative():
+    hist = RollingHistogram(window=4)
+    for v in (0.0005, 0.001, 0.003, 0.2, 5.0):
+        hist.record(v)
+    buckets = dict(zip(BUCKETS + (float('inf'),), hist.summary()['buckets']))
+    # Граница корзины включается в неё (le - "меньше или равно")
+    assert buckets[0.001] == 2
+    assert buckets[0.005] == 3
+    assert buckets[0.25] == 4
+    assert buckets[2.5] == 4
+    assert buckets[float('inf')] == 5
+
+
+def test_prometheus_text_shape():
+    metrics = StageMetrics(window=64)
+    rng = np.random.default_rng(0)
+    for v in rng.exponential(0.02, 300):
+        metrics.record('inference', v)
+    metrics.record('decode', 0.004)
+    text = to_prometheus(metrics.snapshot())
+
+    assert text.endswith('\n')
+    assert '# TYPE sign_detector_stage_seconds summary' in text
+    assert '# TYPE sign_detector_stage_duration_seconds histogram' in text
+
+    sample = re.compile(r'^[a-z_]+(\{[a-z]+="[^"]*"(,[a-z]+="[^"]*")*\})? \S+$')
+    for line in text.splitlines():
+        assert line.startswith('# ') or sample.match(line), line
+
+    for stage, count in (('inference', 300), ('decode', 1)):
+        buckets = re.findall(rf'_duration_seconds_bucket{{stage="{stage}",le="([^"]+)"}} (\d+)', text)
+        assert [le for le, _ in buckets] == [f"{b:g}" for b in BUCKETS] + ['+Inf']
+        counts = [int(c) for _, c in buckets]
+        assert counts == sorted(counts)
+        assert counts[-1] == count
+        assert f'_duration_seconds_count{{stage="{stage}"}} {count}' in text
+        assert re.search(rf'_duration_seconds_sum{{stage="{stage}"}} [0-9.]+\n', text)
+        assert f'_seconds{{stage="{stage}",quantile="0.95"}}' in text
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import utils.model_manager as model_manager
+from utils.model_manager import ModelManager
+
+
+class FakeBackend:
+    name = 'fake'
+    names = {0: 'pl40'}
+
+    def __init__(self):
+        self.active = 0
+        self.overlaps = 0
+
+    def warmup(self, runs=2):
+        pass
+
+    def predict(self, frames):
+        self.active += 1
+        if self.active > 1:
+            self.overlaps += 1
+        time.sleep(0.005)
+        self.active -= 1
+        return [None] * len(frames)
+
+
+def test_shared_model_serializes_predict(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(model_manager, 'create_backend', lambda *args, **kwargs: backend)
+    manager = ModelManager()
+    try:
+        first = manager.get('best.pt')
+        second = manager.get('best.pt')
+        assert first is second
+        assert first.name == 'fake' and first.names == {0: 'pl40'}
+
+        def run(model):
+            for _ in range(20):
+                model.predict([0])
+
+        threads = [threading.Thread(target=run, args=(first,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert backend.overlaps == 0
+    finally:
+        manager.shutdown(wait=True)
@@ -0,0 +1,92 @@
+from collections import Counter
+
+import utils.multi_stream as multi_stream
+from utils.multi_stream import MultiStreamEngine
+
+
+class FakeCapture:
+    """Файл из count кадров: кадр - пара (источник, номер)"""
+
+    def __init__(self, source, count):
+        self.source = source
+        self.count = count
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.index >= self.count:
+            return False, None
+        self.index += 1
+        return True, (self.source, self.index - 1)
+
+    def release(self):
+        pass
+
+
+class FakeModel:
+    """predict записывает состав каждого батча"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, frames):
+        self.batches.append([source for source, _ in frames])
+        return [index for _, index in frames]
+
+
+def fill(engine, counts):
+    for worker, count in zip(engine.workers, counts):
+        for i in range(count):
+            worker.queue.put(((worker.source, i), 0.0), timeout=0)
+
+
+def test_round_robin_batches_are_fair():
+    # Очереди заполнены заранее, потоки захвата не запускаются
+    engine = MultiStreamEngine(['a', 'b', 'c'], None, None, max_batch=2, queue_size=16)
+    fill(engine, [12, 12, 12])
+
+    served = Counter()
+    order = []
+    for _ in range(9):
+        batch = engine.collect_batch()
+        assert len(batch) == 2
+        order.append([worker.source for worker, _, _ in batch])
+        served.update(worker.source for worker, _, _ in batch)
+        # Ни один источник не опережает другие больше чем на кадр
+        assert max(served.values()) - min(served.values()) <= 1
+
+    # Стартовый источник сдвигается с каждым батчем
+    assert [o[0] for o in order[:3]] == ['a', 'b', 'c']
+    assert served == Counter({'a': 6, 'b': 6, 'c': 6})
+
+
+def test_busy_stream_does_not_starve_others():
+    engine = MultiStreamEngine(['file', 'cam1', 'cam2'], None, None, max_batch=4, queue_size=16)
+    fill(engine, [16, 1, 1])
+
+    sources = [worker.source for worker, _, _ in engine.collect_batch()]
+    # Сначала по кадру от каждого источника, затем добор из загруженного
+    assert sorted(sources[:3]) == ['cam1', 'cam2', 'file']
+    assert sources[3] == 'file'
+    assert [worker.source for worker, _, _ in engine.collect_batch()] == ['file'] * 4
+
+
+def test_run_renders_every_frame_of_each_stream(monkeypatch):
+    counts = {'a': 15, 'b': 7, 'c': 11}
+    monkeypatch.setattr(multi_stream, 'open_video_source',
+                        lambda source, transport='tcp': FakeCapture(source, counts[source]))
+    model = FakeModel()
+    rendered = {source: [] for source in counts}
+    engine = MultiStreamEngine(list(counts), model.predict,
+                               lambda stream_id, frame, result: rendered[frame[0]].append(result),
+                               max_batch=3)
+    engine.run()
+
+    assert engine.error is None
+    assert rendered == {source: list(range(count)) for source, count in counts.items()}
+    assert all(len(batch) <= 3 for batch in model.batches)
+    stats = engine.stats()
+    assert stats['frames_inferred'] == sum(counts.values())
+    assert [s['frames_inferred'] for s in stats['streams']] == list(counts.values())
@@ -0,0 +1,77 @@
+import numpy as np
+
+from utils.overlay import OverlayRenderer, class_color
+
+NAMES = {0: 'pl40', 1: 'pn', 2: 'p11'}
+
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32)
+
+
+def test_box_outline_is_drawn():
+    img = np.zeros((120, 160, 3), dtype=np.uint8)
+    out = OverlayRenderer(line_width=2).draw(img, boxes([20.0, 50.0, 100.0, 110.0, 0.9, 1.0]), NAMES)
+
+    assert out is img
+    color = class_color(1)
+    # Середины левой, правой и нижней сторон - цвет класса; верх закрыт подписью
+    for x, y in ((20, 80), (100, 80), (60, 110)):
+        assert tuple(img[y, x]) == color
+    # Внутри рамки и вне её кадр не тронут
+    assert not img[60:105, 25:95].any()
+    assert not img[:, 110:].any()
+    assert tuple(img[50 - 1, 20]) == color
+
+
+def test_label_sprite_is_clamped_into_image():
+    img = np.zeros((64, 96, 3), dtype=np.uint8)
+    renderer = OverlayRenderer(line_width=2)
+    # Рамка у верхнего края (подпись уходит внутрь) и у правого (подпись обрезается краем)
+    renderer.draw(img, boxes([80.0, 0.0, 95.0, 30.0, 0.55, 0.0]), NAMES)
+
+    sprite = next(iter(renderer._sprites.values()))
+    sh, sw = sprite.shape[:2]
+    assert sw > 96 - 80
+    # Подпись внутри рамки от её верхнего левого угла, обрезанная правым краем кадра
+    np.testing.assert_array_equal(img[:sh, 80:], sprite[:, :96 - 80])
+    assert not img[sh + 1:, :70].any()
+
+
+def test_tracked_box_off_frame_is_clipped():
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    data = boxes([-9.7, 10.0, 20.0, 50.0, 5.0, 0.9, 0.0])
+    OverlayRenderer(line_width=2).draw(img, data, NAMES)
+
+    # Левая сторона за кадром прижата к нулевому столбцу
+    assert tuple(img[40, 0]) == class_color(0)
+    assert tuple(img[40, 20]) == class_color(0)
+    assert not img[40, 3:18].any()
+
+
+def test_box_larger_than_frame():
+    img = np.zeros((120, 160, 3), dtype=np.uint8)
+    OverlayRenderer(line_width=2).draw(img, boxes([-50.0, -50.0, 300.0, 300.0, 0.7, 2.0]), NAMES)
+
+    color = class_color(2)
+    assert tuple(img[60, 0]) == color and tuple(img[60, 159]) == color
+    assert tuple(img[119, 80]) == color
+    assert not img[60, 5:150].any()
+
+
+def test_sprite_cache_hits_on_repeated_label():
+    renderer = OverlayRenderer()
+    data = boxes([10.0, 30.0, 40.0, 60.0, 0.871, 0.0], [60.0, 30.0, 90.0, 60.0, 0.5, 1.0])
+    first = np.zeros((120, 160, 3), dtype=np.uint8)
+    renderer.draw(first, data, NAMES)
+    assert (renderer.sprite_hits, renderer.sprite_misses) == (0, 2)
+
+    second = np.zeros_like(first)
+    renderer.draw(second, data, NAMES)
+    assert (renderer.sprite_hits, renderer.sprite_misses) == (2, 2)
+    np.testing.assert_array_equal(first, second)
+
+    # Та же корзина уверенности - тот же спрайт, другая - новый
+    renderer.draw(second, boxes([10.0, 30.0, 40.0, 60.0, 0.874, 0.0], [10.0, 30.0, 40.0, 60.0, 0.9, 0.0]), NAMES)
+    assert (renderer.sprite_hits, renderer.sprite_misses) == (3, 3)
+    assert renderer.stats()['sprites'] == 3
@@ -0,0 +1,111 @@
+import itertools
+import os
+
+import numpy as np
+import pytest
+
+import utils.result_cache as result_cache
+from utils.detection import boxes_data
+from utils.result_cache import ReplayPredictor, ResultCache
+
+NAMES = {0: 'pl40', 1: 'i2'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() с шагом в секунду: порядок last_used не зависит от разрешения часов"""
+    ticks = itertools.count(1000)
+
+    class Clock:
+        @staticmethod
+        def time():
+            return float(next(ticks))
+
+    monkeypatch.setattr(result_cache, 'time', Clock)
+
+
+def store(cache, key, frames):
+    writer = cache.begin(key, NAMES, 'video.mp4')
+    for index, data in enumerate(frames):
+        writer.append(index, index / 25.0, 1000.0 + index / 25.0, np.asarray(data, dtype=np.float32))
+    cache.commit(key, writer, {'video': 'video.mp4'})
+    return cache.path(key)
+
+
+def box(cls, x=10.0, conf=0.9):
+    return [x, 20.0, x + 30.0, 60.0, conf, cls]
+
+
+def test_manifest_round_trip(tmp_path, clock):
+    cache = ResultCache(str(tmp_path))
+    assert cache.lookup('a') is None
+    store(cache, 'a', [[box(0)]])
+    assert cache.lookup('a') == cache.path('a')
+
+    reopened = ResultCache(str(tmp_path))
+    assert reopened.lookup('a') == cache.path('a')
+    stats = reopened.stats()
+    assert stats['entries'] == 1 and stats['hits'] == 2 and stats['misses'] == 1
+    assert stats['bytes'] == reopened.manifest['entries']['a']['bytes'] > 0
+    assert reopened.manifest['entries']['a']['video'] == 'video.mp4'
+
+
+def test_lru_evicts_least_recently_used(tmp_path, clock):
+    cache = ResultCache(str(tmp_path))
+    store(cache, 'a', [[box(0)]])
+    size = cache.manifest['entries']['a']['bytes']
+    cache.max_bytes = 2 * size + size // 2
+    store(cache, 'b', [[box(0)]])
+    # a использована позже b - вытесняется b
+    cache.lookup('a')
+    store(cache, 'c', [[box(0)]])
+
+    assert set(cache.manifest['entries']) == {'a', 'c'}
+    assert not os.path.exists(cache.path('b'))
+    assert cache.stats()['evictions'] == 1
+
+    store(cache, 'd', [[box(0)]])
+    assert set(cache.manifest['entries']) == {'c', 'd'}
+
+
+def test_missing_entry_directory_is_a_miss(tmp_path, clock):
+    cache = ResultCache(str(tmp_path))
+    path = store(cache, 'a', [[box(0)]])
+    for entry in os.scandir(path):
+        os.remove(entry.path)
+    os.rmdir(path)
+    assert cache.lookup('a') is None
+    assert 'a' not in cache.manifest['entries']
+
+
+def test_changed_video_invalidates_key(tmp_path):
+    video = tmp_path / 'clip.mp4'
+    video.write_bytes(b'\0' * 4096)
+    weights = tmp_path / 'best.pt'
+    weights.write_bytes(b'weights')
+    cache = ResultCache(str(tmp_path / 'cache'))
+
+    key = cache.key(str(video), str(weights), 640, 'onnx')
+    assert cache.key(str(video), str(weights), 640, 'onnx') == key
+
+    # Тот же размер, другое содержимое и mtime
+    video.write_bytes(b'\1' * 4096)
+    os.utime(video, ns=(1, 1))
+    assert cache.key(str(video), str(weights), 640, 'onnx') != key
+    assert cache.key(str(video), str(weights), 320, 'onnx') != key
+
+
+def test_replay_predictor_returns_stored_boxes(tmp_path, clock):
+    cache = ResultCache(str(tmp_path))
+    frames = [[box(0), box(1, x=100.0, conf=0.5)], [], [box(1, x=50.0)]]
+    path = store(cache, 'a', frames)
+
+    replay = ReplayPredictor(path)
+    assert replay.names == NAMES
+    images = [np.zeros((120, 160, 3), dtype=np.uint8)] * 3
+    results = replay.predict(images[:2]) + replay.predict(images[2:])
+
+    for result, expected in zip(results, frames):
+        data = boxes_data(result)
+        np.testing.assert_allclose(data, np.asarray(expected, dtype=np.float32).reshape(-1, 6))
+        assert result.names == NAMES
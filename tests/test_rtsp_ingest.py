@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+import utils.rtsp_ingest as rtsp_ingest
+from utils.rtsp_ingest import RTSPCapture
+
+
+class FakeClock:
+    """time для rtsp_ingest: sleep сдвигает monotonic мгновенно, задержки переподключения не ждём"""
+
+    def __init__(self):
+        self.offset = 0.0
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        with self._lock:
+            return time.monotonic() + self.offset
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.offset += seconds
+        time.sleep(0)
+
+    @staticmethod
+    def perf_counter():
+        return time.perf_counter()
+
+
+class FakeCapture:
+    """Отдаёт frames, затем обрыв (read -> False); hold - вместо обрыва ждать release"""
+
+    def __init__(self, frames=(), opened=True, hold=False):
+        self.frames = list(frames)
+        self.opened = opened
+        self.hold = threading.Event() if hold else None
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def get(self, prop):
+        return 0.0
+
+    def read(self):
+        if self.frames:
+            return True, self.frames.pop(0)
+        if self.hold is not None:
+            self.hold.wait(0.5)
+        return False, None
+
+    def release(self):
+        self.released = True
+        if self.hold is not None:
+            self.hold.set()
+
+
+class Opener:
+    """open_capture: выдаёт заранее заданные захваты и запоминает время каждой попытки"""
+
+    def __init__(self, clock, captures):
+        self.clock = clock
+        self.captures = list(captures)
+        self.times = []
+
+    def __call__(self, url):
+        self.times.append(self.clock.monotonic())
+        if self.captures:
+            return self.captures.pop(0)
+        return FakeCapture(opened=False)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rtsp_ingest, 'time', clock)
+    return clock
+
+
+def read_all(cap):
+    frames = []
+    while True:
+        # Без таймаута: FakeClock сдвигает monotonic на задержки переподключения
+        ok, frame = cap.read()
+        if not ok:
+            return frames
+        frames.append(frame)
+
+
+def test_reconnect_with_exponential_backoff(clock):
+    opener = Opener(clock, [
+        FakeCapture([0]),
+        FakeCapture(opened=False),
+        FakeCapture(opened=False),
+        FakeCapture(opened=False),
+        FakeCapture([1]),
+    ])
+    cap = RTSPCapture('rtsp://camera', backoff=0.5, max_backoff=1.5, max_reconnects=4, open_capture=opener)
+    frames = read_all(cap)
+    cap.release()
+
+    assert frames[-1] == 1
+    delays = [b - a for a, b in zip(opener.times, opener.times[1:])]
+    # 0.5, 1.0, 2.0 -> 1.5 (потолок), 1.5 и подключение; после второго обрыва отсчёт
+    # задержек заново, четыре неудачные попытки и отказ. Ожидание идёт шагами sleep(0.05)
+    assert delays == pytest.approx([0.5, 1.0, 1.5, 1.5] * 2, abs=0.06)
+    stats = cap.stats()
+    assert stats['reconnects'] == 1
+    assert stats['reconnect_attempts'] == 8
+    assert not cap.isOpened()
+
+
+def test_unreachable_stream_is_not_opened(clock):
+    cap = RTSPCapture('rtsp://camera', open_capture=Opener(clock, [FakeCapture(opened=False)]))
+    assert not cap.isOpened()
+    assert cap.read(timeout=0.1) == (False, None)
+
+
+def test_read_returns_newest_frame(clock):
+    source = FakeCapture(range(10), hold=True)
+    cap = RTSPCapture('rtsp://camera', max_reconnects=0, open_capture=Opener(clock, [source]))
+    deadline = time.monotonic() + 5.0
+    while cap.stats()['frames_grabbed'] < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    ok, frame = cap.read(timeout=1.0)
+    assert ok and frame == 9
+    # Свежих кадров больше нет - read ждёт, а не отдаёт старый
+    assert cap.read(timeout=0.1) == (False, None)
+
+    stats = cap.stats()
+    assert stats['frames_grabbed'] == 10
+    assert stats['frames_delivered'] == 1
+    assert stats['stale_dropped'] == 9
+    assert stats['reconnects'] == 0
+
+    cap.release()
+    assert source.released
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from utils.detection import boxes_data, make_result
+from utils.tiling import TiledInference, tile_grid
+
+NAMES = {0: 'pl40', 1: 'i2'}
+
+
+def coded_frame(width, height):
+    """Пиксель хранит свои координаты: по левому верхнему пикселю тайла восстанавливается его смещение"""
+    x = np.arange(width)[None, :].repeat(height, 0)
+    y = np.arange(height)[:, None].repeat(width, 1)
+    return np.stack([x % 256, y % 256, x // 256 + 8 * (y // 256)], axis=2).astype(np.uint8)
+
+
+def origin(image):
+    b, g, r = (int(v) for v in image[0, 0])
+    return b + 256 * (r % 8), g + 256 * (r // 8)
+
+
+class FakeDetector:
+    """
+    Находит знаки signs (x1, y1, x2, y2, cls в координатах кадра), попавшие в изображение,
+    с обрезкой по его краю; уверенность пропорциональна видимой доле рамки.
+    На целом кадре знаки меньше min_full пикселей не видны, как после уменьшения до imgsz.
+    """
+
+    def __init__(self, signs, frame_shape, min_full=0):
+        self.signs = np.asarray(signs, dtype=np.float32)
+        self.frame_shape = frame_shape
+        self.min_full = min_full
+        self.images = 0
+        self.raw = 0
+
+    def __call__(self, images):
+        results = []
+        for image in images:
+            self.images += 1
+            ox, oy = origin(image)
+            h, w = image.shape[:2]
+            full = image.shape == self.frame_shape
+            rows = []
+            for x1, y1, x2, y2, cls in self.signs:
+                if full and min(x2 - x1, y2 - y1) < self.min_full:
+                    continue
+                cx1, cy1 = max(x1, ox), max(y1, oy)
+                cx2, cy2 = min(x2, ox + w), min(y2, oy + h)
+                if cx2 <= cx1 or cy2 <= cy1:
+                    continue
+                visible = (cx2 - cx1) * (cy2 - cy1) / ((x2 - x1) * (y2 - y1))
+                rows.append([cx1 - ox, cy1 - oy, cx2 - ox, cy2 - oy, 0.9 * visible, cls])
+            self.raw += len(rows)
+            data = np.asarray(rows, dtype=np.float32).reshape(-1, 6)
+            results.append(make_result(image, NAMES, data))
+        return results
+
+
+@pytest.mark.parametrize('width, height, tile, overlap', [
+    (1920, 1080, 640, 0.2),
+    (3840, 2160, 640, 0.25),
+    (1000, 700, 512, 0.0),
+    (2000, 500, 640, 0.5),
+])
+def test_tiles_cover_frame_with_overlap(width, height, tile, overlap):
+    tiles = tile_grid(width, height, tile, overlap)
+    covered = np.zeros((height, width), dtype=bool)
+    for x1, y1, x2, y2 in tiles:
+        assert 0 <= x1 < x2 <= width and 0 <= y1 < y2 <= height
+        assert (x2 - x1, y2 - y1) == (min(tile, width), min(tile, height))
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+
+    for axis in (0, 1):
+        starts = sorted({t[axis] for t in tiles})
+        size = min(tile, (width, height)[axis])
+        assert starts[0] == 0 and starts[-1] + size == (width, height)[axis]
+        for a, b in zip(starts, starts[1:]):
+            # Соседние тайлы перекрываются не меньше чем на overlap (с точностью до округления)
+            assert a + size - b >= overlap * tile - 1
+
+
+def test_small_frame_is_not_tiled():
+    assert tile_grid(640, 480, 640) == []
+    with pytest.raises(ValueError):
+        TiledInference(lambda frames: frames, overlap=1.0)
+
+
+def test_boxes_map_back_and_seam_duplicates_merge():
+    frame = coded_frame(1920, 1080)
+    tiles = tile_grid(1920, 1080, 640, 0.2)
+    seam_x = tiles[0][2]
+    signs = [
+        (100, 100, 130, 130, 0),
+        # Через правый край первого тайла: обрезан в нём и целиком во втором
+        (seam_x - 20, 300, seam_x + 20, 340, 1),
+        (1500, 900, 1540, 940, 0),
+        # Крупный знак виден и на целом кадре
+        (800, 200, 900, 300, 1),
+    ]
+    detector = FakeDetector(signs, frame.shape, min_full=50)
+    tiled = TiledInference(detector, tile=640, overlap=0.2)
+    result, = tiled([frame])
+
+    assert detector.images == 1 + len(tiles)
+    # Без слияния рамок было бы больше: обрезанные копии и повтор крупного знака
+    assert detector.raw > len(signs)
+    data = boxes_data(result)
+    data = data[np.lexsort((data[:, 1], data[:, 0]))]
+    expected = np.asarray(sorted(signs), dtype=np.float32)
+    np.testing.assert_allclose(data[:, :4], expected[:, :4])
+    np.testing.assert_array_equal(data[:, 5], expected[:, 4])
+    np.testing.assert_allclose(data[:, 4], 0.9)
+    assert result.names == NAMES
+
+
+def test_guided_runs_only_tiles_near_candidates():
+    frame = coded_frame(1920, 1080)
+    signs = [(100, 100, 200, 200, 0), (130, 230, 150, 250, 1)]
+    detector = FakeDetector(signs, frame.shape, min_full=50)
+    tiled = TiledInference(detector, tile=640, overlap=0.2, guided=True)
+    result, = tiled([frame])
+
+    # Мелкий знак рядом с крупным находится по тайлу вокруг кандидата
+    assert sorted(boxes_data(result)[:, :4].tolist()) == [[100, 100, 200, 200], [130, 230, 150, 250]]
+    stats = tiled.stats()
+    assert 0 < stats['tile_fraction'] < 1
+    grid = tile_grid(1920, 1080, 640, 0.2)
+    assert stats['tiles_per_frame'] == pytest.approx(len(grid) * stats['tile_fraction'])
@@ -0,0 +1,62 @@
+import numpy as np
+
+from utils.tracker import SignTracker
+
+
+def det(x, y=50.0, cls=0, conf=0.9, size=40.0):
+    return [x, y, x + size, y + size, conf, cls]
+
+
+def ids(output):
+    return output[:, 4].astype(int).tolist()
+
+
+def test_tentative_tracks_are_hidden():
+    tracker = SignTracker(min_hits=2)
+    assert len(tracker.update([det(100)])) == 0
+    assert len(tracker.predict()) == 0
+    out = tracker.update([det(102)])
+    assert ids(out) == [1]
+
+
+def test_id_persists_while_box_moves():
+    tracker = SignTracker(min_hits=2)
+    seen = []
+    for step in range(10):
+        out = tracker.update([det(100 + 4 * step), det(400 - 4 * step, cls=1)])
+        if step:
+            seen.append(sorted(ids(out)))
+    assert all(s == [1, 2] for s in seen)
+    # Экстраполяция на кадре без инференса продолжает движение
+    predicted = tracker.predict()
+    moving = predicted[predicted[:, 4] == 1][0]
+    assert moving[0] > 100 + 4 * 9
+    assert tracker.unique_signs() == {0: 1, 1: 1}
+
+
+def test_track_dies_after_max_age():
+    tracker = SignTracker(max_age=3, min_hits=2)
+    tracker.update([det(100)])
+    tracker.update([det(100)])
+    for _ in range(3):
+        tracker.update([])
+    assert len(tracker) == 1
+    tracker.update([])
+    assert len(tracker) == 0 and tracker.deaths == 1
+
+    tracker.update([det(100)])
+    out = tracker.update([det(100)])
+    assert ids(out) == [2]
+
+
+def test_no_matching_across_classes():
+    tracker = SignTracker(min_hits=2)
+    tracker.update([det(100, cls=0)])
+    tracker.update([det(100, cls=0)])
+    out = tracker.update([det(100, cls=3)])
+    # Та же рамка другого класса - новый (пока не подтверждённый) трек
+    assert len(tracker) == 2
+    assert ids(out) == []
+    out = tracker.update([det(100, cls=3)])
+    assert ids(out) == [2]
+    assert np.all(out[:, 6] == 3)
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import pytest
+
+import utils.video_writer as video_writer
+from utils.video_writer import AsyncVideoWriter
+
+
+def frames(count, width=160, height=120):
+    for i in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:, :, 1] = i * 8 % 256
+        yield frame
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(str(path))
+    assert cap.isOpened()
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+def test_mjpg_writes_every_frame(tmp_path):
+    path = tmp_path / 'out' / 'video.avi'
+    writer = AsyncVideoWriter(str(path), 25.0, codec='mjpg', queue_size=4, drop_frames=False)
+    for frame in frames(30):
+        assert writer.write(frame)
+    writer.close()
+
+    assert frame_count(path) == 30
+    stats = writer.stats()
+    assert stats['encoded'] == 30 and stats['dropped'] == 0 and not writer.failed
+
+
+def test_close_drains_queue(tmp_path):
+    path = tmp_path / 'video.avi'
+    writer = AsyncVideoWriter(str(path), 25.0, codec='mjpg', queue_size=64)
+    for frame in frames(50):
+        writer.write(frame)
+    # Кадры ещё в очереди: close() дописывает их до завершения потока
+    writer.close()
+
+    assert not writer._thread.is_alive()
+    assert writer.encoded + writer.dropped == 50
+    assert writer.dropped == 0
+    assert frame_count(path) == 50
+    assert not writer.write(next(frames(1)))
+
+
+def test_x264_without_ffmpeg_falls_back_to_mp4v(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(video_writer.shutil, 'which', lambda name: None)
+    path = tmp_path / 'video.mp4'
+    writer = AsyncVideoWriter(str(path), 25.0, codec='x264', drop_frames=False)
+    assert writer.codec == 'mp4v'
+    assert 'ffmpeg not found' in capsys.readouterr().out
+    for frame in frames(10):
+        writer.write(frame)
+    writer.close()
+
+    assert frame_count(path) == 10
+
+
+def test_unknown_codec_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        AsyncVideoWriter(str(tmp_path / 'video.avi'), 25.0, codec='h265')
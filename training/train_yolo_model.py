@@ -1,17 +1,184 @@
+# Обучение YOLO на датасете из utils.convert_tt100k_to_yolo:
+#   python training/train_yolo_model.py --data TT100K-YOLO/data.yaml --epochs 50 --workers 8 --cache ram
+#   python training/train_yolo_model.py --resume            # продолжить последний прогон
+# Рядом с results.csv пишется throughput.csv: изображений в секунду и время ожидания
+# загрузчика данных по эпохам - видно, упирается обучение в диск/декодирование или в вычисления.
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+
 from ultralytics import YOLO
+from ultralytics.cfg import DEFAULT_CFG
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+THROUGHPUT_FILE = 'throughput.csv'
+# Доля времени эпохи в ожидании батча, начиная с которой обучение считается упёршимся в загрузку
+IO_BOUND_SHARE = 0.3
+
+
+def detect_device():
+    """'0' - первая CUDA GPU, 'mps' на Apple Silicon, иначе 'cpu'"""
+    import torch
+
+    if torch.cuda.is_available():
+        return '0'
+    mps = getattr(torch.backends, 'mps', None)
+    if mps is not None and mps.is_available():
+        return 'mps'
+    return 'cpu'
+
+
+class WorkersTrainer(DetectionTrainer):
+    """DetectionTrainer без принудительного workers=0 на CPU: число воркеров задаёт пользователь"""
+
+    def __init__(self, cfg=DEFAULT_CFG, overrides=None, _callbacks=None):
+        super().__init__(cfg, overrides, _callbacks)
+        if overrides and overrides.get('workers') is not None:
+            self.args.workers = overrides['workers']
+
+
+class ThroughputMonitor:
+    """
+    Колбэки ultralytics, замеряющие эпоху: ожидание загрузчика - время от конца
+    предыдущего батча (или начала эпохи) до выдачи следующего, вычисления - от
+    выдачи батча до конца шага оптимизатора.
+    """
+
+    FIELDS = ('epoch', 'images', 'train_s', 'images_per_s', 'data_wait_s', 'data_wait_share', 'compute_s',
+              'val_s', 'epoch_s', 'bound')
+
+    def __init__(self):
+        self._epoch_start = self._mark = self._batch_start = 0.0
+        self._train_end = None
+        self.data_wait = self.compute = 0.0
+
+    def attach(self, model):
+        model.add_callback('on_train_epoch_start', self.on_train_epoch_start)
+        model.add_callback('on_train_batch_start', self.on_train_batch_start)
+        model.add_callback('on_train_batch_end', self.on_train_batch_end)
+        model.add_callback('on_train_epoch_end', self.on_train_epoch_end)
+        model.add_callback('on_fit_epoch_end', self.on_fit_epoch_end)
 
-def main():
-    model = YOLO("../models/yolov8n.pt")
+    def on_train_epoch_start(self, trainer):
+        self._epoch_start = self._mark = time.perf_counter()
+        self.data_wait = self.compute = 0.0
+
+    def on_train_batch_start(self, trainer):
+        self._batch_start = time.perf_counter()
+        self.data_wait += self._batch_start - self._mark
+
+    def on_train_batch_end(self, trainer):
+        self._mark = time.perf_counter()
+        self.compute += self._mark - self._batch_start
+
+    def on_train_epoch_end(self, trainer):
+        self._train_end = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer):
+        # После обучения ultralytics вызывает этот колбэк ещё раз для финальной валидации
+        if self._train_end is None:
+            return
+        now = time.perf_counter()
+        train_s = self._train_end - self._epoch_start
+        images = len(trainer.train_loader.dataset)
+        share = self.data_wait / train_s if train_s > 0 else 0.0
+        row = {
+            'epoch': trainer.epoch + 1,
+            'images': images,
+            'train_s': round(train_s, 3),
+            'images_per_s': round(images / train_s, 2) if train_s > 0 else 0.0,
+            'data_wait_s': round(self.data_wait, 3),
+            'data_wait_share': round(share, 4),
+            'compute_s': round(self.compute, 3),
+            'val_s': round(now - self._train_end, 3),
+            'epoch_s': round(now - self._epoch_start, 3),
+            'bound': 'io' if share >= IO_BOUND_SHARE else 'compute',
+        }
+        self._train_end = None
+        path = os.path.join(trainer.save_dir, THROUGHPUT_FILE)
+        # При продолжении прогона строки дописываются к уже записанным
+        new_file = not os.path.exists(path)
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
+        print(f"[TRAIN] Epoch {row['epoch']}: {row['images_per_s']} img/s, data wait {share:.0%} "
+              f"({row['data_wait_s']} s of {row['train_s']} s), val {row['val_s']} s -> {row['bound']}-bound")
+
+
+def latest_checkpoint(project):
+    checkpoints = glob.glob(os.path.join(project, '*', 'weights', 'last.pt'))
+    if not checkpoints:
+        raise FileNotFoundError(f"No last.pt under {project} to resume from")
+    return max(checkpoints, key=os.path.getmtime)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Train a YOLO road sign detector')
+    parser.add_argument('--model', default=os.path.join(ROOT, 'models', 'yolov8n.pt'),
+                        help='starting weights or model yaml')
+    parser.add_argument('--data', default=os.path.join(ROOT, 'TT100K-YOLO', 'data.yaml'))
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--device', default='auto', help="'auto', 'cpu', 'mps', '0', '0,1', ...")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='dataloader processes (default: min(8, CPU cores))')
+    parser.add_argument('--cache', default='none', choices=['none', 'ram', 'disk'],
+                        help="cache decoded images: 'ram' or 'disk' (.npy next to images)")
+    parser.add_argument('--fraction', type=float, default=1.0, help='fraction of the train set to use')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--project', default=os.path.join(ROOT, 'training', 'runs'))
+    parser.add_argument('--name', default='train')
+    parser.add_argument('--resume', nargs='?', const='auto', default=None,
+                        help='continue from last.pt (path, or the newest run in --project)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    device = detect_device() if args.device == 'auto' else args.device
+    workers = args.workers if args.workers is not None else min(8, os.cpu_count() or 1)
+    options = {
+        'device': device,
+        'workers': workers,
+        'cache': False if args.cache == 'none' else args.cache,
+    }
+
+    monitor = ThroughputMonitor()
+    if args.resume:
+        checkpoint = latest_checkpoint(args.project) if args.resume == 'auto' else args.resume
+        print(f"[TRAIN] Resuming {checkpoint} on {device}, {workers} workers, cache: {args.cache}")
+        model = YOLO(checkpoint)
+        monitor.attach(model)
+        model.train(resume=checkpoint, trainer=WorkersTrainer, **options)
+        return 0
+
+    print(f"[TRAIN] {args.model} on {args.data}: device {device}, {workers} workers, cache: {args.cache}")
+    model = YOLO(args.model)
+    monitor.attach(model)
     model.train(
-        data="dataset/data.yaml",
-        epochs=50,
-        imgsz=640,
-        batch=16,
-        device=0,
-        workers=0
+        data=args.data,
+        epochs=args.epochs,
+        imgsz=args.imgsz,
+        batch=args.batch,
+        fraction=args.fraction,
+        seed=args.seed,
+        project=args.project,
+        name=args.name,
+        trainer=WorkersTrainer,
+        **options
     )
+    return 0
+
 
 if __name__ == "__main__":
     import multiprocessing
     multiprocessing.freeze_support()  # 👈 важно для Windows
-    main()
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import time
+
+from PyQt6 import QtCore, QtGui
+from PyQt6.QtCore import Qt
+
+# Цвета фона для колонки точности создаются один раз, а не на каждую ячейку
+HIGH_COLOR = QtGui.QColor(0, 128, 0)
+MEDIUM_COLOR = QtGui.QColor(255, 165, 0)
+LOW_COLOR = QtGui.QColor(255, 0, 0)
+
+
+class DetectionStats:
+    __slots__ = ('name', 'best', 'count', 'conf_sum', 'first_seen', 'last_seen')
+
+    def __init__(self, name, now):
+        self.name = name
+        self.best = 0.0
+        self.count = 0
+        self.conf_sum = 0.0
+        self.first_seen = now
+        self.last_seen = now
+
+    @property
+    def mean(self):
+        return self.conf_sum / self.count if self.count else 0.0
+
+
+class DetectionTableModel(QtCore.QAbstractTableModel):
+    """
+    Таблица обнаруженных классов. Строки только добавляются в конец, а при
+    обновлении сигнал dataChanged отправляется лишь для изменившихся строк,
+    поэтому стоимость обновления не зависит от числа уже найденных классов.
+    Сортировку выполняет QSortFilterProxyModel по SORT_ROLE.
+    """
+
+    COLUMNS = ["Class", "Accuracy", "Count", "Mean", "First seen", "Last seen"]
+    CLASS, ACCURACY, COUNT, MEAN, FIRST_SEEN, LAST_SEEN = range(len(COLUMNS))
+    SORT_ROLE = Qt.ItemDataRole.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._row_of = {}
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        stats = self._rows[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.CLASS:
+                return stats.name
+            if column == self.ACCURACY:
+                return f"{stats.best:.3f}"
+            if column == self.COUNT:
+                return str(stats.count)
+            if column == self.MEAN:
+                return f"{stats.mean:.3f}"
+            if column == self.FIRST_SEEN:
+                return time.strftime("%H:%M:%S", time.localtime(stats.first_seen))
+            if column == self.LAST_SEEN:
+                return time.strftime("%H:%M:%S", time.localtime(stats.last_seen))
+
+        elif role == self.SORT_ROLE:
+            return (stats.name, stats.best, stats.count, stats.mean,
+                    stats.first_seen, stats.last_seen)[column]
+
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == self.CLASS:
+                return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+            return Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter
+
+        elif role == Qt.ItemDataRole.BackgroundRole and column == self.ACCURACY:
+            if stats.best > 0.8:
+                return HIGH_COLOR
+            if stats.best > 0.5:
+                return MEDIUM_COLOR
+            return LOW_COLOR
+
+        return None
+
+    def update_detections(self, detections, now=None):
+        """
+        detections: {имя класса: (макс. уверенность, число кадров, сумма уверенностей)}
+        за один такт показа.
+        """
+        now = time.time() if now is None else now
+
+        new_names = [name for name in detections if name not in self._row_of]
+        if new_names:
+            first = len(self._rows)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(new_names) - 1)
+            for name in new_names:
+                self._row_of[name] = len(self._rows)
+                self._rows.append(DetectionStats(name, now))
+            self.endInsertRows()
+
+        for name, (best, count, conf_sum) in detections.items():
+            row = self._row_of[name]
+            stats = self._rows[row]
+            stats.best = max(stats.best, best)
+            stats.count += count
+            stats.conf_sum += conf_sum
+            stats.last_seen = now
+            self.dataChanged.emit(self.index(row, self.ACCURACY), self.index(row, self.LAST_SEEN))
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._row_of = {}
+        self.endResetModel()
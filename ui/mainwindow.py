@@ -1,22 +1,33 @@
 import sys
+import time
 import traceback
 
 from PyQt6 import QtWidgets, QtGui, QtCore
 from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QVBoxLayout, QHBoxLayout, \
-    QLabel, QLineEdit, QPushButton, QMessageBox
+from PyQt6.QtWidgets import QFileDialog, QTableView, QHeaderView, QDialog, QVBoxLayout, QHBoxLayout, \
+    QLabel, QLineEdit, QPushButton, QMessageBox, QComboBox
 import os
 from ui.Ui_MainWindow import Ui_MainWindow
+from ui.detection_table_model import DetectionTableModel
+from ui.stream_grid import StreamGridWidget
 from utils.logging_config import logger
-from utils.video_thread import VideoThread
-import torch
+from utils.frame_pipeline import is_live_source
+from utils.model_manager import ModelManager
+from utils.backends import CACHE_DIR_NAME
+from utils.startup import StartupProfile, cached_device, probe_device, warm_imports
+from utils.result_cache import ResultCache, default_cache_root
+from utils.optimize_model import load_variants
+import threading
+
+# Импортируются в фоне после показа окна: cv2, потоки видео; ultralytics и torch - загрузчик модели
+DEFERRED_MODULES = ('utils.video_thread', 'utils.multi_video_thread')
 
 
 class RTSPDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("RTSP Stream")
-        self.setFixedSize(400, 120)
+        self.setFixedSize(400, 160)
         self.setup_ui()
 
     def setup_ui(self):
@@ -27,6 +38,7 @@ class RTSPDialog(QDialog):
         layout.addWidget(self.label)
 
         self.rtsp_input = QLineEdit()
+        # Несколько ссылок через пробел или ';' - многопоточный режим с сеткой
         self.rtsp_input.setPlaceholderText("rtsp://username:password@ip:port/stream")
         self.rtsp_input.setStyleSheet("""
             QLineEdit {
@@ -40,6 +52,12 @@ class RTSPDialog(QDialog):
         """)
         layout.addWidget(self.rtsp_input)
 
+        # TCP надёжнее через NAT и Wi-Fi, UDP даёт меньшую задержку в локальной сети
+        self.transport_combo = QComboBox()
+        self.transport_combo.addItems(["TCP", "UDP"])
+        self.transport_combo.setStyleSheet("color: white; background-color: #333; font: 9pt 'Roboto';")
+        layout.addWidget(self.transport_combo)
+
         button_layout = QHBoxLayout()
 
         self.ok_button = QPushButton("OK")
@@ -83,6 +101,18 @@ class RTSPDialog(QDialog):
     def get_rtsp_link(self):
         return self.rtsp_input.text().strip()
 
+    def get_rtsp_links(self):
+        return [link for link in self.get_rtsp_link().replace(';', ' ').split() if link]
+
+    def get_transport(self):
+        return self.transport_combo.currentText().lower()
+
+
+
+class ModelLoadNotifier(QtCore.QObject):
+    # Переносит уведомления о загрузке модели и определении устройства из фоновых потоков в GUI-поток
+    loaded = QtCore.pyqtSignal(str, dict)
+    device_ready = QtCore.pyqtSignal(dict)
 
 
 class MainApp(QtWidgets.QMainWindow):
@@ -96,26 +126,35 @@ class MainApp(QtWidgets.QMainWindow):
         return os.path.join(base_path, relative_path)
 
 
-    def __init__(self):
+    def __init__(self, startup=None):
         try:
             logger.info("Initializing MainApp...")
+            self.startup = startup or StartupProfile()
             super().__init__()
             self.ui = Ui_MainWindow()
             self.ui.setupUi(self)
 
             self.thread = None
             self.model_path = self.resource_path("models/best.pt")
+            # Вариант модели из utils.optimize_model: бэкенд и веса, которые реально запускаются
+            self.model_backend = 'auto'
+            self.active_model_path = self.model_path
             self.video_path = None
+            # Больше одного источника - многопоточный режим с общей моделью
+            self.video_sources = []
+            self.rtsp_transport = 'tcp'
             self.save_video = False
 
             self.ui.label_11.setText('Yolov8s')
             self.ui.label_12.setText(os.path.basename(self.model_path))
-            if torch.cuda.is_available():
-                self.ui.label_13.setText("CUDA GPU")
-            else:
-                self.ui.label_13.setText("CPU")
 
-            self.detected_classes = {}
+            # Модель грузится и прогревается в фоне сразу при старте и живёт до закрытия окна
+            self.model_notifier = ModelLoadNotifier()
+            self.model_notifier.loaded.connect(self.model_loaded)
+            self.model_notifier.device_ready.connect(self.device_ready)
+            self.model_manager = ModelManager(on_loaded=self.model_notifier.loaded.emit)
+            # Повторное открытие того же видео с теми же весами - детекции из кэша
+            self.result_cache = ResultCache(default_cache_root(self.model_path))
 
             self.ui.pushButton_5.clicked.connect(self.start_video)  # start
             self.ui.pushButton_4.clicked.connect(self.pause_video)  # pause
@@ -127,33 +166,123 @@ class MainApp(QtWidgets.QMainWindow):
             self._closing = False
 
             self.setup_detection_table()
+            self.setup_variant_selector()
+
+            # p95 самой долгой стадии под счётчиком FPS, полная разбивка - в подсказке
+            self.stage_label = QLabel("")
+            self.stage_label.setStyleSheet("color: rgb(200, 200, 200); font: 8pt 'Roboto';")
+            self.ui.verticalLayout_6.addWidget(self.stage_label)
+
+            self.stream_grid = StreamGridWidget(self.ui.left_screen_2)
+            self.stream_grid.hide()
+            self.stream_grid.resized.connect(self.update_grid_sizes)
+            self.ui.horizontalLayout_10.addWidget(self.stream_grid)
 
             self.update_save_button_icon()
+            self.start_background_loading()
 
         except Exception as e:
             logger.error(f"Error during MainApp initialization: {e}")
             logger.error(traceback.format_exc())
             raise
 
+    def start_background_loading(self):
+        """
+        torch нужен только для torch.cuda.is_available(), поэтому устройство берётся
+        из кэша прошлого запуска; при промахе оно определяется в фоне, а кнопка старта
+        ждёт результата. Тяжёлые модули импортируются в фоне после показа окна.
+        """
+        self.device = None
+        device_cache = os.path.join(os.path.dirname(self.model_path), CACHE_DIR_NAME)
+        probe = cached_device(device_cache)
+        if probe is not None:
+            self.device_ready({**probe, 'cached': True})
+        else:
+            self.ui.label_13.setText("Detecting device...")
+            self.ui.pushButton_5.setEnabled(False)
+        threading.Thread(target=self._background_startup, args=(device_cache, probe is None),
+                         name='startup-loader', daemon=True).start()
+
+    def _background_startup(self, device_cache, need_probe):
+        try:
+            if need_probe:
+                self.model_notifier.device_ready.emit(probe_device(device_cache))
+            timings = warm_imports(DEFERRED_MODULES)
+            logger.info(f"Deferred imports: {timings}")
+        except Exception as e:
+            logger.error(f"Background startup failed: {e}")
+            logger.error(traceback.format_exc())
+            # Без torch приложение всё равно может работать на CPU
+            if need_probe:
+                self.model_notifier.device_ready.emit({'device': 'cpu', 'gpu': None, 'cached': False})
+
+    def device_ready(self, probe):
+        if self.device is not None:
+            return
+        self.device = probe['device']
+        self.ui.label_13.setText("CUDA GPU" if self.device == 'cuda' else "CPU")
+        self.ui.pushButton_5.setEnabled(True)
+        elapsed = self.startup.mark('device_ready', device=self.device, gpu=probe.get('gpu'),
+                                    device_cached=probe['cached'])
+        logger.info(f"Device {self.device} ({'cached' if probe['cached'] else 'probed'}) "
+                    f"at {elapsed:.2f} s after start")
+        self.model_manager.preload(self.active_model_path, self.model_backend, self.device, 640)
+
+    def setup_variant_selector(self):
+        """Выбор INT8/прореженных вариантов весов, если они созданы python -m utils.optimize_model"""
+        self.variant_combo = QComboBox()
+        self.variant_combo.setStyleSheet("color: white; background-color: #333; font: 8pt 'Roboto';")
+        self.variant_combo.addItem("fp32 (auto)", ('auto', self.model_path))
+        for variant in load_variants(self.model_path):
+            if variant['imgsz'] != 640 or variant['name'] == 'torch':
+                continue
+            self.variant_combo.addItem(
+                f"{variant['name']}: mAP {variant['map50_95']:.3f}, {variant['latency_ms']:.0f} ms",
+                (variant['backend'], variant['model_path']))
+        self.variant_combo.setVisible(self.variant_combo.count() > 1)
+        self.variant_combo.currentIndexChanged.connect(self.select_variant)
+        self.ui.verticalLayout_8.addWidget(self.variant_combo)
+
+    def select_variant(self, index):
+        backend, model_path = self.variant_combo.itemData(index)
+        if not os.path.exists(model_path):
+            logger.warning(f"Model variant is missing: {model_path}")
+            return
+        self.model_backend = backend
+        self.active_model_path = model_path
+        self.ui.label_12.setText(os.path.basename(model_path))
+        logger.info(f"Model variant: {self.variant_combo.itemText(index)} ({model_path})")
+        # Применяется со следующего запуска; прогрев начинаем сразу (или по готовности устройства)
+        if self.device is not None:
+            self.model_manager.preload(model_path, backend, self.device, 640)
+
     def setup_detection_table(self):
         try:
             logger.debug("Setting up detection table")
             for i in reversed(range(self.ui.horizontalLayout.count())):
                 self.ui.horizontalLayout.itemAt(i).widget().setParent(None)
 
-            self.detection_table = QTableWidget()
-            self.detection_table.setColumnCount(2)
-            self.detection_table.setHorizontalHeaderLabels(["Class", "Accuracy"])
+            self.detection_model = DetectionTableModel(self)
+            self.detection_proxy = QtCore.QSortFilterProxyModel(self)
+            self.detection_proxy.setSourceModel(self.detection_model)
+            self.detection_proxy.setSortRole(DetectionTableModel.SORT_ROLE)
+            self.detection_proxy.setDynamicSortFilter(True)
+
+            self.detection_table = QTableView()
+            self.detection_table.setModel(self.detection_proxy)
+            self.detection_table.verticalHeader().setVisible(False)
+            self.detection_table.setSortingEnabled(True)
+            self.detection_table.sortByColumn(DetectionTableModel.ACCURACY, Qt.SortOrder.DescendingOrder)
 
             self.detection_table.setStyleSheet("""
-                QTableWidget {
+                QTableView {
                     background-color: #2b2b2b;
                     color: white;
                     border: none;
                     gridline-color: #3d3d3d;
                     font: 9pt "Roboto";
                 }
-                QTableWidget::item {
+                QTableView::item {
                     padding: 5px;
                     border-bottom: 1px solid #3d3d3d;
                 }
@@ -167,8 +296,10 @@ class MainApp(QtWidgets.QMainWindow):
             """)
 
             header = self.detection_table.horizontalHeader()
-            header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
-            header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+            # ResizeToContents пересчитывал бы все строки на каждое обновление
+            header.setDefaultSectionSize(70)
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+            header.setSectionResizeMode(DetectionTableModel.CLASS, QHeaderView.ResizeMode.Stretch)
 
             self.detection_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
 
@@ -218,11 +349,19 @@ class MainApp(QtWidgets.QMainWindow):
 
     def open_video_dialog(self):
         file_filter = "Видео (*.mp4 *.MOV *.avi)"
-        self.video_path, _ = QFileDialog.getOpenFileName(
+        paths, _ = QFileDialog.getOpenFileNames(
             self, "Выберите видео", "", file_filter)
 
-        if self.video_path:
-            self.update_source_status(os.path.basename(self.video_path))
+        if paths:
+            self.set_sources(paths)
+            if len(paths) == 1:
+                self.update_source_status(os.path.basename(paths[0]))
+            else:
+                self.update_source_status(f"{len(paths)} video files")
+
+    def set_sources(self, sources):
+        self.video_sources = list(sources)
+        self.video_path = self.video_sources[0] if self.video_sources else None
 
     def open_rtsp_dialog(self):
         try:
@@ -236,16 +375,21 @@ class MainApp(QtWidgets.QMainWindow):
             """)
 
             if dialog.exec() == QDialog.DialogCode.Accepted:
-                rtsp_link = dialog.get_rtsp_link()
-                if rtsp_link:
-                    if not rtsp_link.startswith('rtsp://'):
+                rtsp_links = dialog.get_rtsp_links()
+                if rtsp_links:
+                    if not all(link.startswith('rtsp://') for link in rtsp_links):
                         QMessageBox.warning(self, "Invalid RTSP Link",
                                             "RTSP link should start with 'rtsp://'")
                         return
 
-                    self.video_path = rtsp_link
-                    self.update_source_status(
-                        f"RTSP Stream: {rtsp_link[:50]}..." if len(rtsp_link) > 50 else f"RTSP Stream: {rtsp_link}")
+                    self.set_sources(rtsp_links)
+                    self.rtsp_transport = dialog.get_transport()
+                    rtsp_link = rtsp_links[0]
+                    if len(rtsp_links) > 1:
+                        self.update_source_status(f"RTSP Streams: {len(rtsp_links)}")
+                    else:
+                        self.update_source_status(
+                            f"RTSP Stream: {rtsp_link[:50]}..." if len(rtsp_link) > 50 else f"RTSP Stream: {rtsp_link}")
 
         except Exception as e:
             logger.error(f"Error in open_video_dialog: {e}")
@@ -272,29 +416,52 @@ class MainApp(QtWidgets.QMainWindow):
             os.makedirs(result_dir, exist_ok=True)
 
             output_path = os.path.join(result_dir, "result.avi")
+            # Текст Prometheus: можно отдавать через textfile collector node_exporter
+            metrics_path = os.path.join(result_dir, "metrics.prom")
+            detection_log = os.path.join(result_dir, f"detections_{time.strftime('%Y%m%d_%H%M%S')}.detlog")
 
             print(f"[APP] Absolute output path: {output_path}")
 
-            self.detected_classes.clear()
-            self.update_detection_table()
+            self.detection_model.clear()
 
             if self.thread:
                 self.thread.stop()
-                self.thread.wait(2000)
+                # Модель общая с новым потоком: ModelManager сериализует predict, а поздний
+                # finished_signal старого потока video_finished отбрасывает
+                if not self.thread.wait(2000):
+                    logger.warning("Previous video thread is still stopping")
                 self.thread = None
 
+            if len(self.video_sources) > 1:
+                self.start_multi_video()
+                return
+            self.show_single_view()
+
+            from utils.video_thread import VideoThread
+
             self.thread = VideoThread(
-                self.model_path,
+                self.active_model_path,
                 self.video_path,
                 output_path,
-                device='cuda',
+                device=self.device,
                 imgsz=640,
-                save_video=self.save_video
+                save_video=self.save_video,
+                batch_size=1 if is_live_source(self.video_path) else 'auto',
+                backend=self.model_backend,
+                model_manager=self.model_manager,
+                rtsp_transport=self.rtsp_transport,
+                metrics_path=metrics_path,
+                detection_log=detection_log,
+                result_cache=self.result_cache
             )
+            self.thread.model_ready.connect(self.update_backend_label)
+            self.thread.set_display_size(self.ui.label.width(), self.ui.label.height())
             self.thread.frame_ready.connect(self.update_frame_from_qimage)
             self.thread.fps_ready.connect(self.update_fps)
             self.thread.finished_signal.connect(self.video_finished)
             self.thread.detection_info_ready.connect(self.update_detection_info)
+            self.thread.display_stats_ready.connect(self.update_display_stats)
+            self.thread.metrics_ready.connect(self.update_stage_metrics)
             self.thread.start()
 
         except Exception as e:
@@ -302,23 +469,115 @@ class MainApp(QtWidgets.QMainWindow):
             logger.error(traceback.format_exc())
             QMessageBox.critical(self, "Error", f"Failed to start video: {str(e)}")
 
+    def start_multi_video(self):
+        self.stream_grid.set_streams(self.video_sources)
+        self.ui.label.hide()
+        self.stream_grid.show()
+
+        from utils.multi_video_thread import MultiVideoThread
+
+        self.thread = MultiVideoThread(
+            self.active_model_path,
+            self.video_sources,
+            device=self.device,
+            imgsz=640,
+            backend=self.model_backend,
+            model_manager=self.model_manager,
+            rtsp_transport=self.rtsp_transport
+        )
+        self.update_grid_sizes()
+        self.thread.model_ready.connect(self.update_backend_label)
+        self.thread.frame_ready.connect(self.update_grid_frame)
+        self.thread.fps_ready.connect(self.update_fps)
+        self.thread.finished_signal.connect(self.video_finished)
+        self.thread.detection_info_ready.connect(self.update_detection_info)
+        self.thread.stream_stats_ready.connect(self.stream_grid.update_stats)
+        # Запись в режиме нескольких потоков не поддерживается: кнопка недоступна до одиночного режима
+        self.ui.pushButton_7.setEnabled(False)
+        self.ui.pushButton_7.setToolTip("Сохранение видео недоступно в режиме нескольких потоков")
+        if self.save_video:
+            logger.warning("Video saving is not supported in multi-stream mode")
+            QMessageBox.information(self, "Recording Unavailable",
+                                    "Video saving is not supported in multi-stream mode. "
+                                    "Streams will be processed without recording.")
+        self.thread.start()
+
+    def show_single_view(self):
+        self.stream_grid.hide()
+        self.stream_grid.clear()
+        self.ui.label.show()
+        self.ui.pushButton_7.setEnabled(True)
+        self.update_save_button_icon()
+
+    def update_grid_sizes(self):
+        if self.thread is None:
+            return
+        from utils.multi_video_thread import MultiVideoThread
+
+        if not isinstance(self.thread, MultiVideoThread):
+            return
+        for stream_id in range(len(self.stream_grid.frames)):
+            self.thread.set_display_size(stream_id, *self.stream_grid.cell_size(stream_id))
+
+    def update_grid_frame(self, stream_id, qimg, slot):
+        thread = self.sender()
+        if thread is None or thread is not self.thread:
+            return
+        try:
+            self.stream_grid.update_frame(stream_id, qimg)
+        except Exception as e:
+            logger.error(f"Error in update_grid_frame: {e}")
+        finally:
+            thread.release_display_buffer(stream_id, slot)
+
+    def model_loaded(self, key, timings):
+        logger.info(f"Model ready ({key}): backend={timings['backend']}, "
+                    f"load {timings['load_ms']:.0f} ms, warm-up {timings['warmup_ms']:.0f} ms")
+        self.update_backend_label(timings['backend'])
+        self.startup.mark('model_ready', backend=timings['backend'])
+        self.write_startup_report()
+
+    def write_startup_report(self):
+        report = self.startup.write()
+        if report is None:
+            return
+        marks = ", ".join(f"{k} {v:.2f} s" for k, v in report['marks_s'].items())
+        logger.info(f"Startup: {marks}")
+        for entry in report.get('top_imports', []):
+            logger.info(f"Import {entry['module']}: {entry['cumulative_ms']:.1f} ms "
+                        f"(self {entry['self_ms']:.1f} ms, {entry['thread']})")
+
+    def update_backend_label(self, backend_name):
+        device_name = "CUDA GPU" if self.device == 'cuda' else "CPU"
+        self.ui.label_13.setText(f"{device_name} ({backend_name})")
+
     def handle_thread_error(self, error_message):
         """Обрабатывает ошибки из потока"""
         logger.error(f"Thread error: {error_message}")
         QMessageBox.critical(self, "Processing Error", error_message)
 
-    def update_frame_from_qimage(self, qimg):
+    def update_frame_from_qimage(self, qimg, slot):
+        thread = self.sender()
+        # Кадры остановленного потока не трогаем: его буферы могли быть освобождены
+        if thread is None or thread is not self.thread:
+            return
         try:
-            qimg_copy = QtGui.QImage(qimg)
-            pixmap = QtGui.QPixmap.fromImage(qimg_copy)
-            scaled = pixmap.scaled(
-                self.ui.label.width(), self.ui.label.height(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.ui.label.setPixmap(scaled)
+            # Кадр уже отмасштабирован в рабочем потоке, здесь только загрузка в pixmap
+            self.ui.label.setPixmap(QtGui.QPixmap.fromImage(qimg))
         except Exception as e:
             logger.error(f"Error in update_frame_from_qimage: {e}")
+        finally:
+            thread.release_display_buffer(slot)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Ячейки сетки отслеживаются через StreamGridWidget.resized
+        if self.thread is None:
+            return
+        from utils.video_thread import VideoThread
+
+        if isinstance(self.thread, VideoThread):
+            self.thread.set_display_size(self.ui.label.width(), self.ui.label.height())
 
     def update_fps(self, fps):
             try:
@@ -326,51 +585,37 @@ class MainApp(QtWidgets.QMainWindow):
             except Exception:
                 pass
 
-    def update_detection_info(self, detections_dict):
+    def update_display_stats(self, stats):
         try:
-            updated = False
-
-            for class_name, confidence in detections_dict.items():
-                if class_name in self.detected_classes:
-                    if confidence > self.detected_classes[class_name]:
-                        self.detected_classes[class_name] = confidence
-                        updated = True
-                else:
-                    self.detected_classes[class_name] = confidence
-                    updated = True
-
-            if updated:
-                self.update_detection_table()
-
-        except Exception as e:
-            print(f"Error updating detection info: {e}")
+            tooltip = (f"Processed: {stats['frames_processed']}, "
+                       f"displayed: {stats['frames_displayed']}")
+            ingest = stats.get('ingest')
+            if ingest:
+                tooltip += (f"\nReconnects: {ingest['reconnects']}, "
+                            f"capture latency: {ingest['latency_ms']:.0f} ms, "
+                            f"max gap: {ingest['max_gap_ms']:.0f} ms")
+            self.ui.label_5.setToolTip(tooltip)
+        except Exception:
+            pass
 
-    def update_detection_table(self):
+    def update_stage_metrics(self, metrics):
         try:
-            sorted_classes = sorted(self.detected_classes.items(),
-                                    key=lambda x: x[1], reverse=True)
-
-            self.detection_table.setRowCount(len(sorted_classes))
-
-            for row, (class_name, confidence) in enumerate(sorted_classes):
-                class_item = QTableWidgetItem(class_name)
-                class_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                self.detection_table.setItem(row, 0, class_item)
-
-                accuracy_item = QTableWidgetItem(f"{confidence:.3f}")
-                accuracy_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-
-                if confidence > 0.8:
-                    accuracy_item.setBackground(QtGui.QColor(0, 128, 0))
-                elif confidence > 0.5:
-                    accuracy_item.setBackground(QtGui.QColor(255, 165, 0))
-                else:
-                    accuracy_item.setBackground(QtGui.QColor(255, 0, 0))
-
-                self.detection_table.setItem(row, 1, accuracy_item)
+            stages = metrics['stages']
+            bottleneck = metrics['bottleneck']
+            if bottleneck:
+                self.stage_label.setText(f"Bottleneck: {bottleneck} "
+                                         f"(p95 {stages[bottleneck]['p95_ms']:.1f} ms)")
+            self.stage_label.setToolTip("\n".join(
+                f"{name}: p50 {s['p50_ms']:.1f} / p95 {s['p95_ms']:.1f} / p99 {s['p99_ms']:.1f} ms"
+                for name, s in stages.items()))
+        except Exception:
+            pass
 
+    def update_detection_info(self, detections_dict):
+        try:
+            self.detection_model.update_detections(detections_dict)
         except Exception as e:
-            print(f"Error updating detection table: {e}")
+            print(f"Error updating detection info: {e}")
 
     def pause_video(self):
         if self.thread:
@@ -397,16 +642,24 @@ class MainApp(QtWidgets.QMainWindow):
             self.set_default_image()
 
     def video_finished(self):
+        # Поздний сигнал потока, который не успел остановиться до запуска нового:
+        # текущий поток не трогаем, иначе Stop потеряет его
+        sender = self.sender()
+        if sender is not None and sender is not self.thread:
+            return
         if self.thread:
             self.thread.wait(1000)
             self.thread = None
+        logger.info(f"Result cache: {self.result_cache.stats()}")
         self.set_default_image()
         try:
             self.ui.label_5.setText("FPS: 0.0")
+            self.stage_label.setText("")
         except Exception:
             pass
 
     def set_default_image(self):
+        self.show_single_view()
         try:
             self.ui.label.clear()
             default_pixmap = QtGui.QPixmap(self.resource_path("ui/src/images/image.png"))
@@ -437,4 +690,7 @@ class MainApp(QtWidgets.QMainWindow):
                 logger.error(f"Error during thread shutdown: {e}")
             finally:
                 self.thread = None
+        self.model_manager.shutdown(wait=False)
+        # Модель так и не загрузилась - отчёт о запуске пишется с тем, что успели отметить
+        self.write_startup_report()
         logger.info("Safe shutdown completed")
\ No newline at end of file
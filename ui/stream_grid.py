@@ -0,0 +1,72 @@
+import math
+import os
+
+from PyQt6 import QtGui, QtWidgets
+from PyQt6.QtCore import Qt, pyqtSignal
+
+
+class StreamGridWidget(QtWidgets.QWidget):
+    """Сетка ceil(sqrt(N)) x ... ячеек: кадр источника и строка с FPS и задержкой"""
+
+    # Размер ячеек изменился - рабочему потоку нужно новое разрешение для масштабирования
+    resized = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grid = QtWidgets.QGridLayout(self)
+        self.grid.setContentsMargins(0, 0, 0, 0)
+        self.grid.setSpacing(4)
+        self.frames = []
+        self.captions = []
+        self.names = []
+
+    def set_streams(self, sources):
+        self.clear()
+        columns = max(1, math.ceil(math.sqrt(len(sources))))
+        for i, source in enumerate(sources):
+            name = os.path.basename(str(source)) or str(source)
+
+            frame = QtWidgets.QLabel()
+            frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            frame.setMinimumSize(160, 90)
+            frame.setSizePolicy(QtWidgets.QSizePolicy.Policy.Ignored, QtWidgets.QSizePolicy.Policy.Ignored)
+            frame.setStyleSheet("background-color: #1e1e1e;")
+
+            caption = QtWidgets.QLabel(name)
+            caption.setStyleSheet("color: white; font: 8pt 'Roboto';")
+
+            cell = QtWidgets.QVBoxLayout()
+            cell.setSpacing(0)
+            cell.addWidget(frame, 1)
+            cell.addWidget(caption)
+            self.grid.addLayout(cell, i // columns, i % columns)
+
+            self.frames.append(frame)
+            self.captions.append(caption)
+            self.names.append(name)
+
+    def clear(self):
+        while self.grid.count():
+            cell = self.grid.takeAt(0).layout()
+            while cell is not None and cell.count():
+                widget = cell.takeAt(0).widget()
+                if widget is not None:
+                    widget.setParent(None)
+        self.frames, self.captions, self.names = [], [], []
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resized.emit()
+
+    def cell_size(self, stream_id):
+        frame = self.frames[stream_id]
+        return frame.width(), frame.height()
+
+    def update_frame(self, stream_id, qimg):
+        if 0 <= stream_id < len(self.frames):
+            self.frames[stream_id].setPixmap(QtGui.QPixmap.fromImage(qimg))
+
+    def update_stats(self, stats):
+        for i, s in enumerate(stats.get('streams', [])[:len(self.captions)]):
+            self.captions[i].setText(f"{self.names[i]}  |  FPS: {s['fps']:.1f}  |  "
+                                     f"latency: {s['latency_ms']:.0f} ms")
@@ -0,0 +1,285 @@
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import time
+
+import numpy as np
+
+# Экспортированные модели кладутся в <папка весов>/.cache/<хэш весов>/imgsz<N>/
+CACHE_DIR_NAME = '.cache'
+SELECTION_FILE = 'backend_selection.json'
+
+
+# Хэши весов по (путь, размер, mtime): веса читаются целиком один раз за процесс
+_weights_hashes = {}
+
+
+def weights_hash(model_path, chunk_size=1 << 20):
+    stat = os.stat(model_path)
+    key = (os.path.abspath(model_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _weights_hashes:
+        h = hashlib.sha256()
+        with open(model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                h.update(chunk)
+        _weights_hashes[key] = h.hexdigest()[:16]
+    return _weights_hashes[key]
+
+
+def weights_cache_root(model_path):
+    """<папка весов>/.cache/<хэш весов>: экспорты, выбор бэкенда, варианты модели"""
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), CACHE_DIR_NAME, weights_hash(model_path))
+
+
+def cache_dir(model_path, imgsz):
+    return os.path.join(weights_cache_root(model_path), f"imgsz{imgsz}")
+
+
+def export_model(model_path, export_format, target, imgsz, **kwargs):
+    """Экспорт весов ultralytics в export_format с переносом результата в target"""
+    from ultralytics import YOLO
+
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    # Экспорт пишет результат рядом с весами, поэтому экспортируем копию в папке кэша
+    local_weights = os.path.join(directory, os.path.basename(model_path))
+    shutil.copy2(model_path, local_weights)
+    try:
+        print(f"[BACKEND] Exporting {model_path} to {export_format} (imgsz={imgsz})...")
+        start = time.perf_counter()
+        exported = YOLO(local_weights).export(format=export_format, imgsz=imgsz, verbose=False, **kwargs)
+        print(f"[BACKEND] Export finished in {time.perf_counter() - start:.1f} s: {exported}")
+    finally:
+        if os.path.exists(local_weights):
+            os.remove(local_weights)
+
+    if os.path.abspath(str(exported)) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        shutil.move(str(exported), target)
+    return target
+
+
+class InferenceBackend:
+    """Обёртка над YOLO: predict(frames) -> список ultralytics Results"""
+
+    name = None
+    export_format = None
+    # Пороги NMS ultralytics по умолчанию; явно, так как входят в ключ кэша результатов
+    conf = 0.25
+    iou = 0.7
+    # INT8-модели нужна калибровка на датасете: их создаёт только python -m utils.optimize_model
+    quantized = False
+
+    def __init__(self, model_path, device='cpu', imgsz=640):
+        from ultralytics import YOLO
+
+        self.source_path = model_path
+        self.device = device
+        self.imgsz = imgsz
+        self.model_path = self.prepare(model_path, imgsz)
+        self.model = YOLO(self.model_path, task='detect')
+
+    @staticmethod
+    def available():
+        return True
+
+    @staticmethod
+    def artifact_path(directory, stem):
+        """Путь экспортированной модели в папке кэша; None - веса используются как есть"""
+        return None
+
+    def prepare(self, model_path, imgsz):
+        """Однократный экспорт весов в формат бэкенда с кэшированием по хэшу"""
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        target = self.artifact_path(cache_dir(model_path, imgsz), stem)
+        if target is None:
+            return model_path
+        if os.path.exists(target):
+            return target
+        if self.quantized:
+            raise FileNotFoundError(f"No {self.name} model for {model_path} at imgsz {imgsz}; "
+                                    f"create it with python -m utils.optimize_model")
+        return export_model(model_path, self.export_format, target, imgsz, dynamic=True, half=False)
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, frames):
+        return self.model.predict(frames, verbose=False, imgsz=self.imgsz, device=self.device,
+                                  conf=self.conf, iou=self.iou)
+
+    def warmup(self, runs=2, batch=1):
+        dummy = [np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)] * batch
+        for _ in range(runs):
+            self.predict(dummy)
+
+    def benchmark(self, runs=10):
+        """Среднее время инференса одного кадра, мс"""
+        self.warmup()
+        frame = [np.random.randint(0, 255, (self.imgsz, self.imgsz, 3), dtype=np.uint8)]
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.predict(frame)
+        return (time.perf_counter() - start) / runs * 1000.0
+
+
+class TorchBackend(InferenceBackend):
+    name = 'torch'
+
+
+class OnnxBackend(InferenceBackend):
+    name = 'onnx'
+    export_format = 'onnx'
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec('onnxruntime') is not None
+
+    @staticmethod
+    def artifact_path(directory, stem):
+        return os.path.join(directory, f"{stem}.onnx")
+
+
+class OpenVINOBackend(InferenceBackend):
+    name = 'openvino'
+    export_format = 'openvino'
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec('openvino') is not None
+
+    @staticmethod
+    def artifact_path(directory, stem):
+        return os.path.join(directory, f"{stem}_openvino_model")
+
+    def predict(self, frames):
+        # OpenVINO выполняется только на CPU-устройстве ultralytics
+        return self.model.predict(frames, verbose=False, imgsz=self.imgsz, device='cpu',
+                                  conf=self.conf, iou=self.iou)
+
+
+class OnnxInt8Backend(OnnxBackend):
+    name = 'onnx-int8'
+    quantized = True
+
+    @staticmethod
+    def artifact_path(directory, stem):
+        return os.path.join(directory, f"{stem}_int8.onnx")
+
+
+class OpenVINOInt8Backend(OpenVINOBackend):
+    name = 'openvino-int8'
+    quantized = True
+
+    @staticmethod
+    def artifact_path(directory, stem):
+        return os.path.join(directory, f"{stem}_int8_openvino_model")
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+    OnnxInt8Backend.name: OnnxInt8Backend,
+    OpenVINOInt8Backend.name: OpenVINOInt8Backend,
+}
+
+
+def available_backends(model_path, device='cpu'):
+    # Экспортировать можно только исходные веса PyTorch
+    if not str(model_path).endswith('.pt'):
+        return ['torch']
+    # INT8 меняет точность, поэтому в автовыбор не входит - только явный выбор варианта
+    names = [name for name, cls in BACKENDS.items() if cls.available() and not cls.quantized]
+    # На GPU экспорт для CPU не даёт выигрыша, используем PyTorch
+    if str(device).startswith('cuda'):
+        return ['torch']
+    return names
+
+
+def _selection_key(model_path, device, imgsz):
+    return f"{weights_hash(model_path)}|{platform.machine()}|{os.cpu_count()}|{device}|{imgsz}"
+
+
+def _load_selection(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def select_backend(model_path, device='cpu', imgsz=640, candidates=None, use_cache=True):
+    """
+    Замеряет доступные бэкенды и возвращает самый быстрый (уже загруженный).
+    Результат замера сохраняется, повторный запуск на той же машине замер пропускает.
+    """
+    candidates = [c for c in (candidates or available_backends(model_path, device)) if c in BACKENDS]
+    if len(candidates) == 1:
+        return create_backend(candidates[0], model_path, device, imgsz)
+
+    selection_path = os.path.join(weights_cache_root(model_path), SELECTION_FILE)
+    key = _selection_key(model_path, device, imgsz)
+    selection = _load_selection(selection_path)
+
+    if use_cache and key in selection and selection[key]['backend'] in candidates:
+        name = selection[key]['backend']
+        print(f"[BACKEND] Using cached selection: {name}")
+        try:
+            return create_backend(name, model_path, device, imgsz)
+        except Exception as e:
+            print(f"[BACKEND] Cached backend {name} failed to load: {e}")
+
+    timings = {}
+    best = None
+    for name in candidates:
+        try:
+            backend = create_backend(name, model_path, device, imgsz)
+            timings[name] = backend.benchmark()
+            print(f"[BACKEND] {name}: {timings[name]:.1f} ms/frame")
+        except Exception as e:
+            print(f"[BACKEND] {name} unavailable: {e}")
+            continue
+        if best is None or timings[name] < timings[best.name]:
+            best = backend
+
+    if best is None:
+        raise RuntimeError("No inference backend could be loaded")
+
+    selection[key] = {'backend': best.name, 'timings_ms': timings}
+    try:
+        os.makedirs(os.path.dirname(selection_path), exist_ok=True)
+        with open(selection_path, 'w', encoding='utf-8') as f:
+            json.dump(selection, f, indent=2)
+    except OSError as e:
+        print(f"[BACKEND] Cannot save backend selection: {e}")
+
+    print(f"[BACKEND] Selected backend: {best.name}")
+    return best
+
+
+def resolve_backend_name(name, model_path, device='cpu', imgsz=640):
+    """Имя бэкенда без загрузки модели; для 'auto' - только из сохранённого замера, иначе None"""
+    if name != 'auto':
+        return name
+    candidates = available_backends(model_path, device)
+    if len(candidates) == 1:
+        return candidates[0]
+    selection_path = os.path.join(weights_cache_root(model_path), SELECTION_FILE)
+    entry = _load_selection(selection_path).get(_selection_key(model_path, device, imgsz))
+    if entry and entry['backend'] in candidates:
+        return entry['backend']
+    return None
+
+
+def create_backend(name, model_path, device='cpu', imgsz=640):
+    if name == 'auto':
+        return select_backend(model_path, device, imgsz)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+    return BACKENDS[name](model_path, device=device, imgsz=imgsz)
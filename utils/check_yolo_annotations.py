@@ -1,16 +1,33 @@
-import os
+# Классы в разметке и проверка её целостности по индексу utils.dataset_index:
+#   python -m utils.check_yolo_annotations TT100K-YOLO
+import argparse
+import sys
 
-labels_dir = r"D:\Myprojects\Python\For_GitHub\Road_Sign_Recognition\TT100K-YOLO\labels\train"
+import numpy as np
 
-classes = set()
+from utils.dataset_index import DEFAULT_DATASET, DatasetIndex
 
-for file_name in os.listdir(labels_dir):
-    if file_name.endswith(".txt"):
-        with open(os.path.join(labels_dir, file_name), "r") as f:
-            for line in f:
-                if line.strip():
-                    cls_id = int(line.split()[0])
-                    classes.add(cls_id)
 
-print(f"Всего уникальных классов: {len(classes)}")
-print(f"Список классов: {sorted(classes)}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.check_yolo_annotations',
+                                     description='List classes used in YOLO labels and check label integrity')
+    parser.add_argument('dataset', nargs='?', default=DEFAULT_DATASET, help='dataset root with images/ and labels/')
+    parser.add_argument('--workers', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    index = DatasetIndex.build(args.dataset, workers=args.workers)
+    classes = np.unique(index.cls).tolist()
+    print(f"Всего уникальных классов: {len(classes)}")
+    print(f"Список классов: {classes}")
+
+    report = index.check()
+    # Списки *_files дублируют счётчики; изображения без разметки - допустимый фон
+    problems = {key: value for key, value in report.items()
+                if value and not key.endswith('_files') and key != 'unlabeled_images'}
+    for key, value in problems.items():
+        print(f"[CHECK] {key}: {value if isinstance(value, int) else len(value)}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,52 +1,329 @@
-import os
+# Конвертация TT100K в формат YOLO:
+#   python -m utils.convert_tt100k_to_yolo --root data --out TT100K-YOLO --workers 8
+# annotations.json читается потоково, размеры изображений - из заголовков файлов,
+# изображения не копируются, а связываются жёсткой ссылкой (или reflink). Повторный
+# запуск пропускает уже готовые изображения, поэтому прерванную конвертацию можно продолжить.
+import argparse
+import errno
 import json
-from PIL import Image
+import os
+import shutil
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CLASS_MAP_FILE = 'classes.json'
+DATA_YAML = 'data.yaml'
+# ioctl FICLONE из linux/fs.h: копия-ссылка на те же блоки (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+class JsonStream:
+    """
+    Потоковый разбор JSON-объектов верхнего уровня: ключи перебираются по одному,
+    значения декодируются по одному, в памяти только текущий кусок файла.
+    """
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON, got {found!r}")
+        self.pos += 1
 
-# пути
-root = "data"
-ann_path = os.path.join(root, "annotations.json")
-img_dir = os.path.join(root, "train")
-out_dir = "TT100K-YOLO"
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # Число на границе куска могло оборваться - дочитываем и разбираем заново
+            if end == len(self.buf) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
 
-# создаём папки
-os.makedirs(os.path.join(out_dir, "images/train"), exist_ok=True)
-os.makedirs(os.path.join(out_dir, "labels/train"), exist_ok=True)
+    def keys(self):
+        """Ключи текущего объекта; значение каждого ключа вызывающий обязан прочитать сам"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '}}' in JSON, got {char!r}")
 
-# читаем json
-data = json.load(open(ann_path))
-imgs = data["imgs"]
 
-# создаём список категорий
-categories = sorted({obj["category"] for v in imgs.values() for obj in v.get("objects", [])})
-cat2id = {c: i for i, c in enumerate(categories)}
+def iter_annotations(path):
+    """(id, запись) из раздела imgs в annotations.json; остальные разделы пропускаются"""
+    with open(path, encoding='utf-8') as f:
+        stream = JsonStream(f)
+        for key in stream.keys():
+            if key != 'imgs':
+                stream.value()
+                continue
+            for img_id in stream.keys():
+                yield img_id, stream.value()
 
-for img_id, v in imgs.items():
-    path = os.path.join(root, v["path"])
-    if not os.path.exists(path):
-        continue
 
-    # открываем изображение для размера
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError(f"Truncated image header: {f.name}")
+    return data
+
+
+def image_size(path):
+    """
+    (ширина, высота) из заголовка JPEG/PNG без декодирования пикселей; прочее - через PIL.
+    Обрезанный или битый заголовок - ValueError.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(24)
+        if head[:8] == b'\x89PNG\r\n\x1a\n':
+            if len(head) < 24:
+                raise ValueError(f"Truncated image header: {path}")
+            return struct.unpack('>II', head[16:24])
+        if head[:2] == b'\xff\xd8':
+            f.seek(2)
+            while True:
+                byte = f.read(1)
+                if not byte:
+                    break
+                if byte != b'\xff':
+                    continue
+                marker = f.read(1)
+                while marker == b'\xff':
+                    marker = f.read(1)
+                code = marker[0] if marker else 0
+                # Маркеры без длины: RSTn, SOI, EOI, TEM
+                if 0xD0 <= code <= 0xD9 or code == 0x01:
+                    continue
+                length = struct.unpack('>H', _read_exact(f, 2))[0]
+                # SOF0..SOF15, кроме DHT (C4), JPG (C8) и DAC (CC)
+                if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack('>xHH', _read_exact(f, 5))
+                    return w, h
+                f.seek(length - 2, os.SEEK_CUR)
+            raise ValueError(f"No SOF marker in JPEG: {path}")
+
+    from PIL import Image
     with Image.open(path) as im:
-        w, h = im.size
-
-    label_lines = []
-    for obj in v.get("objects", []):
-        bbox = obj["bbox"]
-        x_center = (bbox["xmin"] + bbox["xmax"]) / 2 / w
-        y_center = (bbox["ymin"] + bbox["ymax"]) / 2 / h
-        bw = (bbox["xmax"] - bbox["xmin"]) / w
-        bh = (bbox["ymax"] - bbox["ymin"]) / h
-        cls_id = cat2id[obj["category"]]
-        label_lines.append(f"{cls_id} {x_center} {y_center} {bw} {bh}")
-
-    # сохраняем label
-    if label_lines:
-        base_name = os.path.basename(v["path"])
-        img_out = os.path.join(out_dir, "images/train", base_name)
-        lbl_out = os.path.join(out_dir, "labels/train", base_name.replace(".jpg", ".txt"))
-
-        os.system(f'copy "{path}" "{img_out}"')
-        with open(lbl_out, "w") as f:
-            f.write("\n".join(label_lines))
-
-print("✅ Конвертация завершена!")
+        return im.size
+
+
+def link_file(src, dst, mode='hardlink'):
+    """Жёсткая ссылка, иначе reflink, иначе копия; возвращает использованный способ"""
+    if mode == 'hardlink':
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError as e:
+            # Другой диск или ФС без ссылок - пробуем дальше
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES):
+                raise
+    if mode in ('hardlink', 'reflink') and fcntl is not None:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return 'reflink'
+        except OSError:
+            os.remove(dst)
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def convert_image(task):
+    """Изображение и его разметка YOLO; уже готовые по mtime пропускаются"""
+    src, img_out, lbl_out, objects, stamp, link_mode = task
+    if not os.path.exists(src):
+        return 'missing'
+    try:
+        up_to_date = (os.path.getmtime(lbl_out) >= stamp and
+                      os.path.getsize(img_out) == os.path.getsize(src))
+    except OSError:
+        up_to_date = False
+    if up_to_date:
+        return 'skipped'
+
+    try:
+        w, h = image_size(src)
+    except (OSError, ValueError, SyntaxError) as e:
+        # Одно битое изображение не должно обрывать всю конвертацию
+        print(f"[CONVERT] Skipping {src}: {e}")
+        return 'corrupt'
+    lines = []
+    for cls_id, xmin, ymin, xmax, ymax in objects:
+        lines.append(f"{cls_id} {(xmin + xmax) / 2 / w:.6f} {(ymin + ymax) / 2 / h:.6f} "
+                     f"{(xmax - xmin) / w:.6f} {(ymax - ymin) / h:.6f}")
+
+    if os.path.lexists(img_out):
+        os.remove(img_out)
+    method = link_file(src, img_out, link_mode)
+    # Разметка пишется последней и атомарно: её mtime - признак готового изображения
+    tmp_path = lbl_out + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, lbl_out)
+    return method
+
+
+def load_class_map(out_dir):
+    try:
+        with open(os.path.join(out_dir, CLASS_MAP_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_class_map(out_dir, categories):
+    tmp_path = os.path.join(out_dir, CLASS_MAP_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(categories, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(out_dir, CLASS_MAP_FILE))
+
+
+def write_data_yaml(out_dir, categories, train_split, val_split):
+    import yaml
+
+    data = {
+        'path': os.path.abspath(out_dir),
+        'train': f"images/{train_split}",
+        'val': f"images/{val_split}",
+        'nc': len(categories),
+        'names': dict(enumerate(categories)),
+    }
+    with open(os.path.join(out_dir, DATA_YAML), 'w', encoding='utf-8') as f:
+        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+
+
+def collect_tasks(ann_path, root, out_dir, splits):
+    """
+    Проход по аннотациям: компактные задания (без полигонов и эллипсов) и набор классов.
+    Классы собираются по всем изображениям, а не только по выбранным splits: иначе
+    id зависели бы от --splits и расходились с нумерацией, на которой обучена модель.
+    """
+    entries = []
+    categories = set()
+    for _, entry in iter_annotations(ann_path):
+        split = entry['path'].replace('\\', '/').split('/')[0]
+        objects = entry.get('objects') or []
+        categories.update(obj['category'] for obj in objects)
+        # Изображения без знаков в датасет не попадают
+        if split not in splits or not objects:
+            continue
+        boxes = []
+        for obj in objects:
+            bbox = obj['bbox']
+            boxes.append((obj['category'], bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax']))
+        base_name = os.path.basename(entry['path'])
+        entries.append((os.path.join(root, entry['path']),
+                        os.path.join(out_dir, 'images', split, base_name),
+                        os.path.join(out_dir, 'labels', split, os.path.splitext(base_name)[0] + '.txt'),
+                        boxes))
+    return entries, categories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.convert_tt100k_to_yolo',
+                                     description='Convert TT100K annotations to a YOLO dataset')
+    parser.add_argument('--root', default='data', help='TT100K root with annotations.json and split folders')
+    parser.add_argument('--annotations', default=None, help='default: <root>/annotations.json')
+    parser.add_argument('--out', default='TT100K-YOLO', help='output dataset directory')
+    parser.add_argument('--splits', nargs='+', default=['train'], help='TT100K folders to convert')
+    parser.add_argument('--val-split', default=None, help="split used as 'val' in data.yaml "
+                                                          "(default: 'test' if converted, else the first split)")
+    parser.add_argument('--workers', type=int, default=0, help='label writer processes (0 = all cores)')
+    parser.add_argument('--link', default='hardlink', choices=['hardlink', 'reflink', 'copy'],
+                        help='how images are placed into the dataset; falls back to copying')
+    parser.add_argument('--force', action='store_true', help='rewrite images and labels that look up to date')
+    args = parser.parse_args(argv)
+
+    ann_path = args.annotations or os.path.join(args.root, 'annotations.json')
+    train_split = 'train' if 'train' in args.splits else args.splits[0]
+    val_split = args.val_split or ('test' if 'test' in args.splits else train_split)
+    for split in args.splits:
+        os.makedirs(os.path.join(args.out, 'images', split), exist_ok=True)
+        os.makedirs(os.path.join(args.out, 'labels', split), exist_ok=True)
+
+    start = time.perf_counter()
+    entries, categories = collect_tasks(ann_path, args.root, args.out, set(args.splits))
+    print(f"[CONVERT] {len(entries)} annotated images, {len(categories)} classes "
+          f"({time.perf_counter() - start:.1f} s to scan {ann_path})")
+
+    # id существующих классов не меняются между запусками, новые дописываются в конец
+    class_map = load_class_map(args.out)
+    if class_map is None:
+        class_map = sorted(categories)
+    else:
+        added = sorted(categories - set(class_map))
+        if added:
+            print(f"[CONVERT] New classes appended to {CLASS_MAP_FILE}: {added}")
+        class_map += added
+    cat2id = {c: i for i, c in enumerate(class_map)}
+    save_class_map(args.out, class_map)
+    write_data_yaml(args.out, class_map, train_split, val_split)
+    if val_split == train_split:
+        print(f"[CONVERT] WARNING: no validation split, 'val' in {DATA_YAML} points at '{train_split}' - "
+              f"validation metrics will be optimistic; convert test too: --splits train test")
+    elif val_split not in args.splits and not os.path.isdir(os.path.join(args.out, 'images', val_split)):
+        print(f"[CONVERT] WARNING: val split '{val_split}' was not converted; add it to --splits")
+
+    # Разметка старше annotations.json считается устаревшей
+    stamp = float('inf') if args.force else os.path.getmtime(ann_path)
+    tasks = [(src, img_out, lbl_out, [(cat2id[c], *box) for c, *box in boxes], stamp, args.link)
+             for src, img_out, lbl_out, boxes in entries]
+
+    counts = {}
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for status in pool.map(convert_image, tasks, chunksize=max(1, min(256, len(tasks) // (workers * 4)))):
+            counts[status] = counts.get(status, 0) + 1
+
+    print(f"[CONVERT] Done in {time.perf_counter() - start:.1f} s: {counts}")
+    print(f"[CONVERT] Dataset: {os.path.join(args.out, DATA_YAML)}, class map: {os.path.join(args.out, CLASS_MAP_FILE)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
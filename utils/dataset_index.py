@@ -0,0 +1,336 @@
+# Индекс разметки YOLO-датасета: все labels/*.txt разбираются один раз (параллельно)
+# в столбцы NumPy и кэшируются в <датасет>/.label_index.npz. При повторном запуске
+# заново читаются только файлы с изменившимся mtime.
+#   python -m utils.dataset_index TT100K-YOLO --check --hist --sizes
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.convert_tt100k_to_yolo import CLASS_MAP_FILE, DATA_YAML, image_size
+
+LABEL_DIR = 'labels'
+IMAGE_DIR = 'images'
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+INDEX_FILE = '.label_index.npz'
+# Выход utils.convert_tt100k_to_yolo; CLI запускаются из корня репозитория (python -m utils.*)
+DEFAULT_DATASET = 'TT100K-YOLO'
+INDEX_VERSION = 1
+# Границы гистограммы размеров рамок, пиксели (сторона квадрата той же площади)
+SIZE_BINS = (0, 8, 16, 32, 64, 96, 128, 256, 512, 100000)
+
+
+def scan_tree(root, exts):
+    """{относительный путь: mtime} всех файлов с расширением из exts"""
+    found = {}
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                if entry.is_dir():
+                    stack.append(rel)
+                elif entry.name.lower().endswith(exts):
+                    found[rel] = entry.stat().st_mtime
+    return found
+
+
+def parse_label_file(path):
+    """Строки 'cls xc yc w h' массивом (N, 5) и число строк другого формата"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    lines = [parts for parts in map(str.split, text.splitlines()) if parts]
+    # Общее число полей 5*N не гарантирует по 5 в каждой строке (строки из 4 и 6 полей)
+    if all(len(parts) == 5 for parts in lines):
+        try:
+            return np.array(lines, dtype=np.float32).reshape(-1, 5), 0
+        except ValueError:
+            pass
+    # Медленный путь только для файлов с ошибками: сегментация, мусор, пустые поля
+    rows, bad = [], 0
+    for parts in lines:
+        try:
+            if len(parts) != 5:
+                raise ValueError
+            rows.append([float(v) for v in parts])
+        except ValueError:
+            bad += 1
+    return np.array(rows, dtype=np.float32).reshape(-1, 5), bad
+
+
+def _parse_chunk(label_root, image_root, items):
+    """Разбор пачки файлов в воркере; результат - плоские массивы, а не объекты на файл"""
+    rows, counts, bad, sizes = [], [], [], []
+    for label_rel, image_rel in items:
+        data, n_bad = parse_label_file(os.path.join(label_root, label_rel))
+        rows.append(data)
+        counts.append(len(data))
+        bad.append(n_bad)
+        size = (0, 0)
+        if image_rel:
+            try:
+                size = image_size(os.path.join(image_root, image_rel))
+            except (OSError, ValueError, SyntaxError):
+                pass
+        sizes.append(size)
+    return (np.concatenate(rows) if rows else np.empty((0, 5), np.float32),
+            np.array(counts, np.int64), np.array(bad, np.int32), np.array(sizes, np.int32).reshape(-1, 2))
+
+
+def load_names(root):
+    """Имена классов из classes.json конвертера или data.yaml; {} если их нет"""
+    try:
+        with open(os.path.join(root, CLASS_MAP_FILE), encoding='utf-8') as f:
+            return dict(enumerate(json.load(f)))
+    except FileNotFoundError:
+        pass
+    try:
+        import yaml
+        with open(os.path.join(root, DATA_YAML), encoding='utf-8') as f:
+            names = yaml.safe_load(f).get('names') or {}
+    except (FileNotFoundError, ImportError):
+        return {}
+    return dict(enumerate(names)) if isinstance(names, list) else {int(k): v for k, v in names.items()}
+
+
+class DatasetIndex:
+    """
+    Столбцовый индекс разметки.
+
+    По файлам разметки (F): files, mtimes, images (путь изображения или ''),
+    image_mtimes, image_wh (0, если размер неизвестен), bad_lines.
+    По рамкам (N): file_id, cls, bbox (xc, yc, w, h в долях кадра).
+    """
+
+    FILE_FIELDS = ('files', 'mtimes', 'images', 'image_mtimes', 'image_wh', 'bad_lines')
+    BOX_FIELDS = ('file_id', 'cls', 'bbox')
+
+    def __init__(self, root, arrays, unlabeled_images=(), names=None):
+        self.root = root
+        for name in self.FILE_FIELDS + self.BOX_FIELDS:
+            setattr(self, name, arrays[name])
+        self.unlabeled_images = list(unlabeled_images)
+        self.names = names or {}
+
+    @classmethod
+    def build(cls, root, workers=0, rebuild=False, chunk_files=512):
+        start = time.perf_counter()
+        label_root = os.path.join(root, LABEL_DIR)
+        image_root = os.path.join(root, IMAGE_DIR)
+        labels = scan_tree(label_root, ('.txt',))
+        images = scan_tree(image_root, IMAGE_EXTS)
+        # Изображение ищется по имени без расширения в том же подкаталоге, без exists на каждый файл
+        by_stem = {os.path.splitext(rel)[0]: rel for rel in images}
+
+        files = sorted(labels)
+        image_of = [by_stem.get(os.path.splitext(rel)[0], '') for rel in files]
+        labeled = set(image_of)
+        unlabeled = sorted(rel for rel in images if rel not in labeled)
+
+        old = None if rebuild else cls._load_cache(os.path.join(root, INDEX_FILE))
+        old_pos = {} if old is None else {rel: i for i, rel in enumerate(old['files'].tolist())}
+
+        # Файл берётся из кэша, если не изменились ни разметка, ни её изображение
+        reuse, todo = {}, []
+        for i, rel in enumerate(files):
+            j = old_pos.get(rel)
+            image_mtime = images.get(image_of[i], 0.0)
+            if (j is not None and old['mtimes'][j] == labels[rel] and old['images'][j] == image_of[i]
+                    and old['image_mtimes'][j] == image_mtime):
+                reuse[i] = j
+            else:
+                todo.append(i)
+
+        bad_lines = np.zeros(len(files), np.int32)
+        image_wh = np.zeros((len(files), 2), np.int32)
+        file_parts, cls_parts, bbox_parts = [], [], []
+        if reuse:
+            # Рамки неизменившихся файлов переносятся из кэша целиком, без цикла по файлам
+            new_ids = np.full(len(old['files']), -1, np.int32)
+            new_ids[list(reuse.values())] = list(reuse.keys())
+            kept = new_ids[old['file_id']] >= 0
+            file_parts.append(new_ids[old['file_id'][kept]])
+            cls_parts.append(old['cls'][kept])
+            bbox_parts.append(old['bbox'][kept])
+            src = np.array(list(reuse.values()))
+            dst = np.array(list(reuse.keys()))
+            bad_lines[dst], image_wh[dst] = old['bad_lines'][src], old['image_wh'][src]
+
+        if todo:
+            chunks = [todo[k:k + chunk_files] for k in range(0, len(todo), chunk_files)]
+            jobs = [[(files[i], image_of[i]) for i in chunk] for chunk in chunks]
+            workers = min(workers or os.cpu_count() or 1, len(chunks))
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    outputs = list(pool.map(_parse_chunk, [label_root] * len(jobs), [image_root] * len(jobs), jobs))
+            else:
+                outputs = [_parse_chunk(label_root, image_root, job) for job in jobs]
+            for chunk, (rows, counts, bad, sizes) in zip(chunks, outputs):
+                ids = np.array(chunk, np.int32)
+                file_parts.append(np.repeat(ids, counts))
+                cls_parts.append(rows[:, 0].astype(np.int32))
+                bbox_parts.append(rows[:, 1:5])
+                bad_lines[ids], image_wh[ids] = bad, sizes
+
+        file_id = np.concatenate(file_parts) if file_parts else np.empty(0, np.int32)
+        order = np.argsort(file_id, kind='stable')
+        boxes_cls = np.concatenate(cls_parts)[order] if cls_parts else np.empty(0, np.int32)
+        boxes_bbox = np.concatenate(bbox_parts)[order] if bbox_parts else np.empty((0, 4), np.float32)
+
+        arrays = {
+            'files': np.array(files, dtype=str),
+            'mtimes': np.array([labels[rel] for rel in files], np.float64),
+            'images': np.array(image_of, dtype=str),
+            'image_mtimes': np.array([images.get(rel, 0.0) for rel in image_of], np.float64),
+            'image_wh': image_wh,
+            'bad_lines': bad_lines,
+            'file_id': file_id[order].astype(np.int32),
+            'cls': boxes_cls.astype(np.int32),
+            'bbox': np.ascontiguousarray(boxes_bbox, dtype=np.float32),
+        }
+        index = cls(root, arrays, unlabeled, load_names(root))
+        if todo or old is None or len(old['files']) != len(files):
+            index.save()
+        print(f"[INDEX] {len(files)} label files, {len(file_id)} boxes: {len(reuse)} from cache, "
+              f"{len(todo)} parsed in {time.perf_counter() - start:.2f} s")
+        return index
+
+    @classmethod
+    def _load_cache(cls, path):
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != INDEX_VERSION:
+                    return None
+                return {name: data[name] for name in cls.FILE_FIELDS + cls.BOX_FIELDS}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, version=INDEX_VERSION,
+                     **{name: getattr(self, name) for name in self.FILE_FIELDS + self.BOX_FIELDS})
+        os.replace(tmp_path, path)
+
+    def class_name(self, cls_id):
+        return self.names.get(int(cls_id), str(int(cls_id)))
+
+    def class_histogram(self):
+        """{класс: (рамок, изображений)} по убыванию числа рамок"""
+        valid = self.cls >= 0
+        boxes = np.bincount(self.cls[valid], minlength=1)
+        # Пары (класс, файл) без повторов - число изображений с классом
+        pairs = np.unique(self.cls[valid].astype(np.int64) * len(self.files) + self.file_id[valid])
+        images = np.bincount(pairs // max(1, len(self.files)), minlength=len(boxes))
+        order = np.argsort(-boxes, kind='stable')
+        return {self.class_name(c): (int(boxes[c]), int(images[c])) for c in order if boxes[c]}
+
+    def box_pixels(self):
+        """Ширина и высота рамок в пикселях; NaN, где размер изображения неизвестен"""
+        wh = self.image_wh[self.file_id].astype(np.float32)
+        wh[wh == 0] = np.nan
+        return self.bbox[:, 2:4] * wh
+
+    def size_distribution(self, cls_id=None, bins=SIZE_BINS):
+        """Гистограмма размера рамок (корень из площади в пикселях) по бинам bins"""
+        pixels = self.box_pixels()
+        if cls_id is not None:
+            pixels = pixels[self.cls == cls_id]
+        side = np.sqrt(pixels[:, 0] * pixels[:, 1])
+        counts, _ = np.histogram(side[~np.isnan(side)], bins=bins)
+        return {f"{lo}-{hi}": int(n) for lo, hi, n in zip(bins[:-1], bins[1:], counts)}
+
+    def samples(self, cls_id, count=1, seed=None):
+        """Случайные (путь к изображению, xc, yc, w, h) рамок класса"""
+        rows = np.flatnonzero((self.cls == cls_id) & (self.images[self.file_id] != ''))
+        if not len(rows):
+            return []
+        rng = np.random.default_rng(seed)
+        picked = rng.choice(rows, size=min(count, len(rows)), replace=False)
+        return [(os.path.join(self.root, IMAGE_DIR, self.images[self.file_id[r]]), *self.bbox[r].tolist())
+                for r in picked]
+
+    def check(self):
+        """Проблемы разметки: выход за кадр, неизвестные классы, битые строки, сироты"""
+        xc, yc, w, h = self.bbox.T
+        out_of_range = ((w <= 0) | (h <= 0) | (xc - w / 2 < -1e-6) | (yc - h / 2 < -1e-6) |
+                        (xc + w / 2 > 1 + 1e-6) | (yc + h / 2 > 1 + 1e-6))
+        bad_class = self.cls < 0
+        if self.names:
+            bad_class |= self.cls >= len(self.names)
+
+        def files_of(mask):
+            return sorted(set(self.files[self.file_id[mask]].tolist()))
+
+        counts = np.bincount(self.file_id, minlength=len(self.files))
+        return {
+            'out_of_range_boxes': int(out_of_range.sum()),
+            'out_of_range_files': files_of(out_of_range),
+            'invalid_class_boxes': int(bad_class.sum()),
+            'invalid_class_files': files_of(bad_class),
+            'malformed_lines': int(self.bad_lines.sum()),
+            'malformed_files': self.files[self.bad_lines > 0].tolist(),
+            'empty_label_files': self.files[(counts == 0) & (self.bad_lines == 0)].tolist(),
+            'orphan_labels': self.files[self.images == ''].tolist(),
+            'unlabeled_images': self.unlabeled_images,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.dataset_index',
+                                     description='Index YOLO labels and report dataset statistics')
+    parser.add_argument('dataset', nargs='?', default=DEFAULT_DATASET, help='dataset root with images/ and labels/')
+    parser.add_argument('--workers', type=int, default=0, help='parser processes (0 = all cores)')
+    parser.add_argument('--rebuild', action='store_true', help='ignore the cached index')
+    parser.add_argument('--hist', action='store_true', help='boxes and images per class')
+    parser.add_argument('--sizes', action='store_true', help='box size distribution in pixels')
+    parser.add_argument('--check', action='store_true', help='integrity checks; exit code 1 on problems')
+    parser.add_argument('--samples', metavar='CLASS', help='print sample boxes of a class (name or id)')
+    parser.add_argument('--count', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=10, help='file names listed per problem')
+    args = parser.parse_args(argv)
+
+    index = DatasetIndex.build(args.dataset, workers=args.workers, rebuild=args.rebuild)
+    print(f"[INDEX] Classes in use: {len(np.unique(index.cls))}, "
+          f"unlabeled images: {len(index.unlabeled_images)}")
+
+    if args.hist:
+        for name, (boxes, images) in index.class_histogram().items():
+            print(f"{name:>12} {boxes:>8} boxes {images:>8} images")
+    if args.sizes:
+        print(json.dumps(index.size_distribution()))
+    if args.samples is not None:
+        by_name = {v: k for k, v in index.names.items()}
+        cls_id = by_name[args.samples] if args.samples in by_name else int(args.samples)
+        for sample in index.samples(cls_id, args.count):
+            print(sample)
+
+    status = 0
+    if args.check:
+        report = index.check()
+        for count_key, files_key in (('out_of_range_boxes', 'out_of_range_files'),
+                                     ('invalid_class_boxes', 'invalid_class_files'),
+                                     ('malformed_lines', 'malformed_files')):
+            files = report[files_key]
+            print(f"[CHECK] {count_key}: {report[count_key]} in {len(files)} files {files[:args.limit]}")
+        for key in ('empty_label_files', 'orphan_labels', 'unlabeled_images'):
+            print(f"[CHECK] {key}: {len(report[key])} {report[key][:args.limit]}")
+        # Изображения без разметки - допустимые фоновые кадры, ошибкой не считаются
+        problems = ('out_of_range_boxes', 'invalid_class_boxes', 'malformed_lines')
+        if any(report[key] for key in problems) or report['orphan_labels']:
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# Общая логика обработки результатов YOLO без зависимостей от Qt
+import numpy as np
+
+
+class ClassConfidences:
+    """
+    Максимальная уверенность по каждому классу на кадре в виде двух массивов:
+    class_ids (int64) и confidences (float32) одинаковой длины, классы уникальны.
+    """
+
+    __slots__ = ('class_ids', 'confidences', 'names')
+
+    def __init__(self, class_ids, confidences, names):
+        self.class_ids = class_ids
+        self.confidences = confidences
+        self.names = names
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), names or {})
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def items(self):
+        for class_id, confidence in zip(self.class_ids.tolist(), self.confidences.tolist()):
+            yield self.names[class_id], confidence
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def _to_numpy(tensor):
+    if hasattr(tensor, 'cpu'):
+        tensor = tensor.cpu()
+    if hasattr(tensor, 'numpy'):
+        return tensor.numpy()
+    return np.asarray(tensor)
+
+
+def class_max_confidences(class_ids, confidences, names):
+    """Векторная свёртка: максимум уверенности по каждому классу"""
+    if len(class_ids) == 0:
+        return ClassConfidences.empty(names)
+    ids, inverse = np.unique(class_ids, return_inverse=True)
+    maxima = np.full(len(ids), -np.inf, dtype=np.float32)
+    np.maximum.at(maxima, inverse, confidences)
+    return ClassConfidences(ids, maxima, names)
+
+
+def extract_detection_info(result):
+    """Максимальная уверенность по каждому классу на кадре (ClassConfidences)"""
+    try:
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return ClassConfidences.empty(result.names)
+
+        # Одна передача на хост: data = [x1, y1, x2, y2, (track_id), conf, cls]
+        data = _to_numpy(boxes.data)
+        class_ids = data[:, -1].astype(np.int64)
+        confidences = data[:, -2].astype(np.float32)
+        return class_max_confidences(class_ids, confidences, result.names)
+
+    except Exception as e:
+        print(f"Error extracting detection info: {e}")
+        return ClassConfidences.empty()
+
+
+def result_to_records(result):
+    """Все рамки кадра в виде списка словарей для сохранения в JSON"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+
+    data = _to_numpy(boxes.data)
+    xyxy = data[:, :4]
+    cls = data[:, -1].astype(int)
+    conf = data[:, -2]
+
+    records = [
+        {
+            'class_id': int(c),
+            'class_name': result.names[int(c)],
+            'confidence': round(float(p), 4),
+            'box': [round(float(v), 1) for v in box],
+        }
+        for box, c, p in zip(xyxy, cls, conf)
+    ]
+    # С трекингом data содержит 7 столбцов: x1, y1, x2, y2, track_id, conf, cls
+    if data.shape[1] == 7:
+        for record, track_id in zip(records, data[:, 4]):
+            record['track_id'] = int(track_id)
+    return records
+
+
+def boxes_data(result):
+    """Рамки кадра массивом (N, 6): x1, y1, x2, y2, conf, cls (без track id)"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty((0, 6), dtype=np.float32)
+    data = _to_numpy(boxes.data)
+    return np.concatenate([data[:, :4], data[:, -2:]], axis=1).astype(np.float32)
+
+
+def make_result(frame, names, data):
+    """Новый ultralytics Results для кадра frame с рамками data (N, 6)"""
+    import torch
+    from ultralytics.engine.results import Results
+
+    return Results(frame, path='', names=names, boxes=torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32)))
+
+
+def box_iou(a, b):
+    """Матрица IoU (len(a), len(b)) для рамок в формате x1, y1, x2, y2"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def box_ios(a, b):
+    """Матрица пересечение / площадь меньшей рамки: обрезанная копия рамки даёт ~1"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (np.minimum(area_a[:, None], area_b[None, :]) + 1e-9)
+
+
+def nms(data, iou_threshold=0.5, overlap=box_iou):
+    """
+    Подавление немаксимумов по классам для массива (N, 6); возвращает оставшиеся строки.
+    overlap - мера перекрытия (box_iou или box_ios)
+    """
+    if len(data) == 0:
+        return data
+    # Сдвигаем рамки разных классов, чтобы они никогда не перекрывались
+    offset = data[:, 5:6] * (float(data[:, :4].max()) + 1.0)
+    boxes = data[:, :4] + offset
+    order = np.argsort(-data[:, 4])
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        if len(order) == 1:
+            break
+        ious = overlap(boxes[i:i + 1], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+    return data[keep]
@@ -0,0 +1,264 @@
+# Журнал детекций: по строке на рамку в NumPy structured-массивах, разбитых на
+# чанки фиксированного размера (memmap .npy), плюс index.json с диапазоном времени
+# и набором классов каждого чанка. Запрос:
+#   python -m utils.detection_log result/session.detlog --class pl80 --start 10:00 --end 10:05
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ('frame', np.int64),     # индекс кадра в источнике
+    ('pts', np.float64),     # время кадра от начала источника, с
+    ('wall', np.float64),    # unix-время кадра, с
+    ('x1', np.float32), ('y1', np.float32), ('x2', np.float32), ('y2', np.float32),
+    ('conf', np.float32),
+    ('cls', np.int32),
+    ('track_id', np.int32),  # -1 без трекинга
+])
+
+INDEX_FILE = 'index.json'
+TIME_FIELDS = ('wall', 'pts')
+
+
+def _chunk_name(number):
+    return f"chunk_{number:05d}.npy"
+
+
+class DetectionLogWriter:
+    """
+    Дозапись детекций в каталог журнала. Строки пишутся прямо в memmap текущего
+    чанка; заполненный чанк закрывается, и его метаданные попадают в индекс.
+    Индекс (включая число строк в открытом чанке) сбрасывается на диск не реже
+    раза в flush_interval секунд, так что после аварии теряется не больше этого.
+
+    Время в журнале должно не убывать: на этом основан поиск по диапазону внутри чанка.
+    """
+
+    def __init__(self, path, names=None, source=None, chunk_rows=65536, flush_interval=2.0):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        os.makedirs(path, exist_ok=True)
+
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+        else:
+            self.index = {'version': 1, 'chunk_rows': chunk_rows, 'names': {}, 'sources': [], 'chunks': []}
+        if names:
+            self.index['names'].update({str(k): v for k, v in dict(names).items()})
+        if source is not None:
+            self.index['sources'].append({'source': str(source), 'started': time.time()})
+
+        self._chunk = None
+        self._meta = None
+        self._classes = set()
+        self._last_flush = time.monotonic()
+        self.rows = sum(c['rows'] for c in self.index['chunks'])
+        self.frames = 0
+
+    def set_names(self, names):
+        self.index['names'].update({str(k): v for k, v in dict(names).items()})
+
+    def _open_chunk(self):
+        number = len(self.index['chunks'])
+        self._chunk = np.lib.format.open_memmap(os.path.join(self.path, _chunk_name(number)), mode='w+',
+                                                dtype=RECORD_DTYPE, shape=(self.chunk_rows,))
+        self._meta = {'file': _chunk_name(number), 'rows': 0, 'classes': [],
+                      'wall': [None, None], 'pts': [None, None]}
+        self._classes = set()
+        self.index['chunks'].append(self._meta)
+
+    def _seal_chunk(self):
+        self._chunk.flush()
+        self._chunk = None
+        self._meta = None
+        self.flush_index()
+
+    def append(self, frame, pts, wall, data):
+        """data: (N, 6) x1, y1, x2, y2, conf, cls или (N, 7) с track_id перед conf"""
+        self.frames += 1
+        n = len(data)
+        if n:
+            data = np.asarray(data)
+            records = np.empty(n, dtype=RECORD_DTYPE)
+            records['frame'] = frame
+            records['pts'] = pts
+            records['wall'] = wall
+            records['x1'], records['y1'], records['x2'], records['y2'] = data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+            records['conf'] = data[:, -2]
+            records['cls'] = data[:, -1]
+            records['track_id'] = data[:, 4] if data.shape[1] == 7 else -1
+            self._write(records)
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush_index()
+
+    def _write(self, records):
+        while len(records):
+            if self._chunk is None:
+                self._open_chunk()
+            meta = self._meta
+            start = meta['rows']
+            take = min(len(records), self.chunk_rows - start)
+            part = records[:take]
+            self._chunk[start:start + take] = part
+
+            meta['rows'] = start + take
+            for field in TIME_FIELDS:
+                lo, hi = float(part[field][0]), float(part[field][-1])
+                meta[field][0] = lo if meta[field][0] is None else meta[field][0]
+                meta[field][1] = hi
+            new_classes = set(np.unique(part['cls']).tolist()) - self._classes
+            if new_classes:
+                self._classes |= new_classes
+                meta['classes'] = sorted(self._classes)
+            self.rows += take
+
+            records = records[take:]
+            if meta['rows'] >= self.chunk_rows:
+                self._seal_chunk()
+
+    def flush_index(self):
+        self._last_flush = time.monotonic()
+        if self._chunk is not None:
+            self._chunk.flush()
+        tmp_path = os.path.join(self.path, INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, os.path.join(self.path, INDEX_FILE))
+
+    def close(self):
+        if self._chunk is not None:
+            # Незаполненный последний чанк перезаписываем без предвыделенного хвоста
+            rows = np.array(self._chunk[:self._meta['rows']])
+            self._chunk = None
+            np.save(os.path.join(self.path, self._meta['file']), rows)
+            self._meta = None
+        self.flush_index()
+
+    def size_bytes(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+
+
+class DetectionLog:
+    """Чтение журнала: чанки отбираются по индексу, внутри чанка - бинарный поиск по времени"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.names = {int(k): v for k, v in self.index['names'].items()}
+        self.chunks_read = 0
+
+    def __len__(self):
+        return sum(c['rows'] for c in self.index['chunks'])
+
+    def class_ids(self, classes):
+        by_name = {v: k for k, v in self.names.items()}
+        ids = []
+        for c in classes:
+            if isinstance(c, str) and c in by_name:
+                ids.append(by_name[c])
+            elif isinstance(c, str) and c.lstrip('-').isdigit():
+                ids.append(int(c))
+            elif isinstance(c, (int, np.integer)):
+                ids.append(int(c))
+            else:
+                raise KeyError(f"Unknown class: {c}")
+        return ids
+
+    def _load(self, meta):
+        self.chunks_read += 1
+        chunk = np.load(os.path.join(self.path, meta['file']), mmap_mode='r')
+        return chunk[:meta['rows']]
+
+    def query(self, classes=None, start=None, end=None, by='wall', min_conf=None):
+        """Рамки классов classes (имена или id) со временем by в [start, end)"""
+        if by not in TIME_FIELDS:
+            raise ValueError(f"Unknown time field: {by}")
+        ids = None if classes is None else np.array(self.class_ids(classes))
+        parts = []
+        for meta in self.index['chunks']:
+            if not meta['rows']:
+                continue
+            lo, hi = meta[by]
+            if (start is not None and hi < start) or (end is not None and lo >= end):
+                continue
+            if ids is not None and not np.isin(meta['classes'], ids).any():
+                continue
+
+            chunk = self._load(meta)
+            times = chunk[by]
+            first = np.searchsorted(times, start, side='left') if start is not None else 0
+            last = np.searchsorted(times, end, side='left') if end is not None else len(chunk)
+            rows = chunk[first:last]
+            mask = np.ones(len(rows), dtype=bool)
+            if ids is not None:
+                mask &= np.isin(rows['cls'], ids)
+            if min_conf is not None:
+                mask &= rows['conf'] >= min_conf
+            parts.append(np.array(rows[mask]))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+
+    def class_counts(self, records=None):
+        records = self.query() if records is None else records
+        ids, counts = np.unique(records['cls'], return_counts=True)
+        return {self.names.get(i, str(i)): int(n) for i, n in zip(ids.tolist(), counts.tolist())}
+
+
+def parse_time(text, reference):
+    """'HH:MM[:SS]' в день reference (unix-время), ISO-дата или число секунд"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        pass
+    clock = datetime.time.fromisoformat(text)
+    day = datetime.datetime.fromtimestamp(reference).date()
+    return datetime.datetime.combine(day, clock).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.detection_log',
+                                     description='Query a detection log by class and time range')
+    parser.add_argument('log', help='path to a .detlog directory')
+    parser.add_argument('--class', dest='classes', action='append', help='class name or id; repeatable')
+    parser.add_argument('--start', help="'HH:MM[:SS]', ISO datetime or seconds")
+    parser.add_argument('--end')
+    parser.add_argument('--by', default='wall', choices=TIME_FIELDS,
+                        help="'wall' - clock time, 'pts' - seconds from the start of the video")
+    parser.add_argument('--min-conf', type=float, default=None)
+    parser.add_argument('--limit', type=int, default=20, help='records to print (0 = only summary)')
+    args = parser.parse_args(argv)
+
+    log = DetectionLog(args.log)
+    chunks = [c for c in log.index['chunks'] if c['rows']]
+    reference = chunks[0]['wall'][0] if chunks else time.time()
+    start = parse_time(args.start, reference) if args.start else None
+    end = parse_time(args.end, reference) if args.end else None
+
+    t0 = time.perf_counter()
+    records = log.query(args.classes, start, end, by=args.by, min_conf=args.min_conf)
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    print(f"{len(records)} detections, {log.chunks_read}/{len(chunks)} chunks read, {elapsed:.1f} ms")
+    print(json.dumps(log.class_counts(records), ensure_ascii=False))
+    for r in records[:args.limit]:
+        stamp = datetime.datetime.fromtimestamp(r['wall']).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        track = f" id:{r['track_id']}" if r['track_id'] >= 0 else ''
+        print(f"{stamp}  frame {r['frame']:>7}  {log.names.get(int(r['cls']), r['cls'])}{track} "
+              f"{r['conf']:.2f}  [{r['x1']:.0f}, {r['y1']:.0f}, {r['x2']:.0f}, {r['y2']:.0f}]")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
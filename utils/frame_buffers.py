@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+
+
+class FrameBufferRing:
+    """
+    Кольцо заранее выделенных буферов кадров для передачи в GUI без копирования.
+
+    Рабочий поток берёт свободный буфер через acquire(), рисует в него кадр и
+    передаёт номер слота вместе с QImage поверх этого буфера. GUI-поток после
+    отрисовки возвращает слот через release(). Пока слот не возвращён, буфер не
+    перезаписывается. Если свободных слотов нет, GUI не успевает и кадр для показа
+    пропускается (обработка при этом не останавливается).
+    """
+
+    def __init__(self, slots=3):
+        self._buffers = [None] * slots
+        self._owned = [False] * slots
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.dropped = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            for slot, owned in enumerate(self._owned):
+                if owned:
+                    continue
+                buf = self._buffers[slot]
+                # Перевыделяем только при смене размера окна или кадра
+                if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+                    buf = np.empty(shape, dtype=dtype)
+                    self._buffers[slot] = buf
+                self._owned[slot] = True
+                self.acquired += 1
+                return slot, buf
+            self.dropped += 1
+            return None, None
+
+    def release(self, slot):
+        with self._lock:
+            if 0 <= slot < len(self._owned):
+                self._owned[slot] = False
+
+    def in_use(self):
+        with self._lock:
+            return sum(self._owned)
+
+    def stats(self):
+        return {'slots': len(self._owned), 'in_use': self.in_use(),
+                'acquired': self.acquired, 'dropped': self.dropped}
@@ -0,0 +1,328 @@
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+# Политики переполнения очереди
+POLICY_BLOCK = 'block'              # ждать свободного места (файлы, без потерь)
+POLICY_DROP_OLDEST = 'drop_oldest'  # выбросить самый старый кадр
+POLICY_LATEST = 'latest'            # оставить только самый свежий кадр
+
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_LATEST)
+
+
+def is_live_source(video_path):
+    if isinstance(video_path, int):
+        return True
+    return str(video_path).startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
+
+
+class BoundedFrameQueue:
+    """Ограниченная очередь между стадиями конвейера со счётчиками глубины"""
+
+    def __init__(self, name, maxsize=2, policy=POLICY_BLOCK):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item, timeout=0.1):
+        """Возвращает False, если очередь закрыта или истёк таймаут в режиме block"""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == POLICY_BLOCK:
+                    self._cond.wait_for(lambda: self._closed or len(self._items) < self.maxsize, timeout)
+                    if self._closed or len(self._items) >= self.maxsize:
+                        return False
+                elif self.policy == POLICY_LATEST:
+                    self.dropped += len(self._items)
+                    self._items.clear()
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=0.1):
+        """Возвращает None, если очередь пуста (по таймауту) или закрыта и опустошена"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait_for(lambda: self._closed or self._items, timeout)
+                if not self._items:
+                    return None
+            item = self._items.popleft()
+            self.get_count += 1
+            self._cond.notify_all()
+            return item
+
+    def get_many(self, n, timeout=0.1):
+        """Ждёт до n элементов (или закрытия очереди) и возвращает их списком по порядку"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or len(self._items) >= n, timeout)
+            batch = []
+            while self._items and len(batch) < n:
+                batch.append(self._items.popleft())
+            self.get_count += len(batch)
+            if batch:
+                self._cond.notify_all()
+            return batch
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def drained(self):
+        with self._cond:
+            return self._closed and not self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'capacity': self.maxsize,
+                'policy': self.policy,
+                'put': self.put_count,
+                'get': self.get_count,
+                'dropped': self.dropped,
+            }
+
+
+def default_batch_size(max_batch=16):
+    """Стартовый размер батча для офлайн-режима по числу ядер"""
+    cores = os.cpu_count() or 1
+    return max(1, min(max_batch, cores // 2))
+
+
+class BatchSizeTuner:
+    """
+    Подбирает размер батча по замерам: удваивает его, пока время на кадр
+    уменьшается хотя бы на min_gain, и фиксирует лучший найденный.
+    """
+
+    def __init__(self, max_batch, samples=3, min_gain=0.05):
+        self.max_batch = max(1, max_batch)
+        self.samples = samples
+        self.min_gain = min_gain
+        self.batch_size = 1
+        self.best_size = 1
+        self.best_cost = None
+        self.settled = self.max_batch == 1
+        self._costs = []
+
+    def record(self, frames, elapsed):
+        if self.settled or frames != self.batch_size:
+            return
+        self._costs.append(elapsed / frames)
+        if len(self._costs) < self.samples:
+            return
+
+        # Первый замер каждого размера отбрасываем как прогрев
+        cost = min(self._costs[1:]) if len(self._costs) > 1 else self._costs[0]
+        self._costs = []
+        if self.best_cost is None or cost < self.best_cost * (1.0 - self.min_gain):
+            self.best_cost = cost
+            self.best_size = self.batch_size
+            if self.batch_size < self.max_batch:
+                self.batch_size = min(self.max_batch, self.batch_size * 2)
+                return
+        self.batch_size = self.best_size
+        self.settled = True
+        print(f"[PIPELINE] Batch size tuned: {self.batch_size} "
+              f"({self.best_cost * 1000:.1f} ms/frame)")
+
+
+class FramePipeline:
+    """
+    Конвейер из трёх стадий: захват -> инференс -> отрисовка/кодирование.
+    Стадии захвата и инференса работают в своих потоках, отрисовка выполняется
+    в потоке, вызвавшем run(). Qt здесь не используется.
+
+    cap     - объект с методом read() -> (ret, frame), как cv2.VideoCapture
+    predict - predict(frames) -> список результатов той же длины
+    render  - render(index, frame, result), вызывается строго по порядку кадров
+
+    batch_size - число кадров на один вызов predict (только для файлов);
+                 'auto' - подбор по числу ядер и замерам BatchSizeTuner
+    metrics    - StageMetrics для стадий decode, predict и latency (захват -> отрисовка)
+    """
+
+    def __init__(self, cap, predict, render, live=False, policy=None, queue_size=2, batch_size=1,
+                 metrics=None):
+        if policy is None:
+            policy = POLICY_LATEST if live else POLICY_BLOCK
+        self.cap = cap
+        self.predict = predict
+        self.render = render
+        self.live = live
+        self.metrics = metrics
+
+        # Батчинг увеличивает задержку, поэтому для живых источников он отключён
+        if live:
+            batch_size = 1
+        if batch_size == 'auto':
+            self.tuner = BatchSizeTuner(default_batch_size())
+            max_batch = self.tuner.max_batch
+        else:
+            self.tuner = None
+            max_batch = max(1, int(batch_size))
+        self.batch_size = max_batch if self.tuner is None else self.tuner.batch_size
+        # Читаем вперёд на два батча, чтобы инференс не ждал декодер
+        queue_size = max(queue_size, 2 * max_batch)
+
+        self.capture_queue = BoundedFrameQueue('capture', queue_size, policy)
+        # Результаты инференса никогда не выбрасываются: отрисовка дешевле инференса
+        self.result_queue = BoundedFrameQueue('inference', queue_size, POLICY_BLOCK)
+
+        self.paused = False
+        self.running = True
+        self.error = None
+        self.frames_read = 0
+        self.frames_inferred = 0
+        self.frames_rendered = 0
+        self.last_latency = 0.0
+        self._threads = []
+
+    def stop(self):
+        self.running = False
+        self.capture_queue.close()
+        self.result_queue.close()
+
+    def stats(self):
+        return {
+            'frames_read': self.frames_read,
+            'frames_inferred': self.frames_inferred,
+            'frames_rendered': self.frames_rendered,
+            'batch_size': self.batch_size,
+            'last_latency_ms': self.last_latency * 1000.0,
+            'queues': {
+                self.capture_queue.name: self.capture_queue.stats(),
+                self.result_queue.name: self.result_queue.stats(),
+            },
+        }
+
+    def _fail(self, stage, e):
+        print(f"[PIPELINE] {stage} error: {e}")
+        traceback.print_exc()
+        if self.error is None:
+            self.error = e
+        self.stop()
+
+    def _put(self, queue, item):
+        while self.running:
+            if queue.put(item):
+                return True
+            if queue.closed:
+                return False
+        return False
+
+    def _capture_loop(self):
+        try:
+            index = 0
+            while self.running:
+                if self.paused and not self.live:
+                    time.sleep(0.1)
+                    continue
+
+                start = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    print("[PIPELINE] End of video or cannot read frame")
+                    break
+                self.frames_read += 1
+                if self.metrics is not None:
+                    self.metrics.record('decode', time.perf_counter() - start)
+
+                # Живой источник продолжаем вычитывать на паузе, чтобы не копить задержку
+                if self.paused:
+                    continue
+
+                if not self._put(self.capture_queue, (index, frame, time.perf_counter())):
+                    break
+                index += 1
+        except Exception as e:
+            self._fail('Capture', e)
+        finally:
+            self.capture_queue.close()
+
+    def _inference_loop(self):
+        try:
+            while self.running:
+                if self.tuner is not None:
+                    self.batch_size = self.tuner.batch_size
+                batch = self.capture_queue.get_many(self.batch_size)
+                if not batch:
+                    if self.capture_queue.drained():
+                        break
+                    continue
+
+                start = time.perf_counter()
+                results = self.predict([frame for _, frame, _ in batch])
+                elapsed = time.perf_counter() - start
+                if self.tuner is not None:
+                    self.tuner.record(len(batch), elapsed)
+                if self.metrics is not None:
+                    # Время батча делится поровну между его кадрами
+                    self.metrics.record('predict', elapsed / len(batch))
+                self.frames_inferred += len(batch)
+
+                # Один поток инференса и FIFO-очереди сохраняют порядок кадров
+                for (index, frame, t_capture), result in zip(batch, results):
+                    if not self._put(self.result_queue, (index, frame, result, t_capture)):
+                        return
+        except Exception as e:
+            self._fail('Inference', e)
+        finally:
+            self.result_queue.close()
+
+    def run(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='pipeline-capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='pipeline-inference', daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+        try:
+            while self.running:
+                item = self.result_queue.get()
+                if item is None:
+                    if self.result_queue.drained():
+                        break
+                    continue
+
+                index, frame, result, t_capture = item
+                self.render(index, frame, result)
+                self.frames_rendered += 1
+                self.last_latency = time.perf_counter() - t_capture
+                if self.metrics is not None:
+                    self.metrics.record('latency', self.last_latency)
+        except Exception as e:
+            self._fail('Render', e)
+        finally:
+            self.stop()
+            for t in self._threads:
+                t.join(timeout=2.0)
@@ -0,0 +1,287 @@
+# Пакетная обработка видео без GUI:
+#   python -m utils.headless "videos/*.mp4" --output-dir result --workers 4
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from utils.backends import BACKENDS, create_backend, select_backend
+from utils.detection import extract_detection_info, result_to_records
+from utils.detection_log import DetectionLogWriter
+from utils.frame_pipeline import FramePipeline
+from utils.inference_scheduler import InferenceScheduler, parse_roi
+from utils.metrics import StageMetrics
+from utils.overlay import OVERLAY_FRAME, OVERLAY_MODES, OverlayRenderer, result_data
+from utils.tracker import SignTracker
+from utils.video_writer import CODECS, EXTENSIONS, AsyncVideoWriter
+
+# Модель загружается один раз на процесс-воркер в _init_worker
+_model = None
+
+
+def expand_inputs(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        if not matches:
+            print(f"[HEADLESS] No files match: {pattern}")
+        paths.extend(matches)
+
+    # Сохраняем порядок, убираем дубликаты
+    return list(dict.fromkeys(os.path.abspath(p) for p in paths))
+
+
+def output_names(videos):
+    """
+    Имена результатов для каждого видео: имя файла без расширения, а при совпадении
+    имён из разных папок - путь относительно общей папки (a/clip.mp4 -> a_clip).
+    """
+    stems = [os.path.splitext(os.path.basename(v))[0] for v in videos]
+    root = os.path.commonpath([os.path.dirname(v) for v in videos]) if videos else ''
+    names, used = {}, set()
+    for video, stem in zip(videos, stems):
+        name = stem
+        if stems.count(stem) > 1:
+            name = os.path.relpath(os.path.splitext(video)[0], root).replace(os.sep, '_')
+        # clip.mp4 и clip.avi в одной папке, a_b/c и a/b_c: различаем хэшем пути
+        if name in used:
+            name = f"{name}_{hashlib.sha1(video.encode('utf-8')).hexdigest()[:8]}"
+        used.add(name)
+        names[video] = name
+    return names
+
+
+def _init_worker(model_path, device, imgsz, threads, backend):
+    global _model
+
+    # Ограничиваем потоки, чтобы воркеры не конкурировали за одни и те же ядра
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    _model = create_backend(backend, model_path, device=device, imgsz=imgsz)
+    print(f"[HEADLESS] Worker {os.getpid()} loaded model {model_path} "
+          f"({_model.name}, {threads} threads)")
+
+
+def _predict(frames):
+    return _model.predict(frames)
+
+
+def process_video(video_path, output_dir, save_video=True, batch_size='auto', scheduler_options=None,
+                  codec='xvid', overlay=OVERLAY_FRAME, detection_log=False, name=None):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video file: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+
+    name = name or os.path.splitext(os.path.basename(video_path))[0]
+    video_out_path = os.path.join(output_dir, f"{name}_result{EXTENSIONS[codec]}")
+    detections_path = os.path.join(output_dir, f"{name}_detections.jsonl")
+
+    metrics = StageMetrics()
+    # Офлайн-обработка: кадры не теряем, запись ждёт кодировщик
+    out = (AsyncVideoWriter(video_out_path, fps, codec=codec, drop_frames=False, metrics=metrics)
+           if save_video else None)
+
+    renderer = OverlayRenderer()
+    log_path = os.path.join(output_dir, f"{name}.detlog") if detection_log else None
+    log = DetectionLogWriter(log_path, names=_model.names, source=video_path) if log_path else None
+    start_wall = time.time()
+    class_max = {}
+    boxes_total = 0
+    scheduler_options = dict(scheduler_options or {})
+    tracker = SignTracker() if scheduler_options.pop('tracking', False) else None
+    scheduler = InferenceScheduler(_predict, tracker=tracker, **scheduler_options)
+
+    with open(detections_path, 'w', encoding='utf-8') as det_file:
+        def render(index, frame, result):
+            nonlocal boxes_total
+            metrics.record_speed(getattr(result, 'speed', None))
+            if log is not None:
+                pts = index / fps
+                log.append(index, pts, start_wall + pts, result_data(result))
+            records = result_to_records(result)
+            boxes_total += len(records)
+            det_file.write(json.dumps({'frame': index, 'detections': records}) + '\n')
+
+            for class_name, confidence in extract_detection_info(result).items():
+                if confidence > class_max.get(class_name, 0.0):
+                    class_max[class_name] = confidence
+
+            if out is not None:
+                # С overlay='none' пишутся исходные кадры, рамки есть в detections.jsonl
+                if overlay == OVERLAY_FRAME:
+                    with metrics.stage('plot'):
+                        renderer.draw(frame, result_data(result), result.names)
+                with metrics.stage('write'):
+                    out.write(frame)
+
+        start = time.perf_counter()
+        pipeline = FramePipeline(cap, scheduler, render, live=False, batch_size=batch_size,
+                                 metrics=metrics)
+        try:
+            pipeline.run()
+        finally:
+            cap.release()
+            if out is not None:
+                out.close()
+            if log is not None:
+                log.close()
+        elapsed = time.perf_counter() - start
+
+    if pipeline.error is not None:
+        raise RuntimeError(f"Pipeline failed on {video_path}: {pipeline.error}")
+
+    scheduler_path = None
+    if not scheduler.passthrough:
+        scheduler_path = os.path.join(output_dir, f"{name}_scheduler.json")
+        scheduler.save_report(scheduler_path)
+
+    return {
+        'video': video_path,
+        'frames': pipeline.frames_rendered,
+        'boxes': boxes_total,
+        'seconds': round(elapsed, 2),
+        'fps': round(pipeline.frames_rendered / elapsed, 2) if elapsed > 0 else 0.0,
+        'batch_size': pipeline.batch_size,
+        'classes': class_max,
+        'video_output': video_out_path if out is not None else None,
+        'writer': out.stats() if out is not None else None,
+        'detections_output': detections_path,
+        'detection_log': log_path,
+        'scheduler_report': scheduler_path,
+        'unique_signs': tracker.unique_signs(_model.names) if tracker is not None else None,
+        'stages': metrics.snapshot(),
+    }
+
+
+def _process_video_safe(video_path, output_dir, save_video, batch_size, scheduler_options, codec, overlay,
+                        detection_log, name):
+    try:
+        return process_video(video_path, output_dir, save_video, batch_size, scheduler_options, codec,
+                             overlay, detection_log, name)
+    except Exception as e:
+        traceback.print_exc()
+        return {'video': video_path, 'error': str(e)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m utils.headless',
+        description='Road sign detection on video files without GUI')
+    parser.add_argument('inputs', nargs='+', help='video files or glob patterns')
+    parser.add_argument('--model', default='models/best.pt', help='path to YOLO weights')
+    parser.add_argument('--output-dir', default='result', help='directory for annotated videos and detections')
+    parser.add_argument('--device', default='cpu', help="inference device: 'cpu', 'cuda', '0', ...")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--backend', default='auto', choices=['auto', *BACKENDS],
+                        help='inference backend (auto = fastest available on this host)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of worker processes (0 = auto)')
+    parser.add_argument('--batch-size', default='auto',
+                        help="frames per predict call or 'auto'")
+    parser.add_argument('--frame-skip', type=int, default=1,
+                        help='run inference on every k-th frame, propagate boxes in between')
+    parser.add_argument('--target-fps', type=float, default=None,
+                        help='adjust frame skip automatically to reach this FPS')
+    parser.add_argument('--max-skip', type=int, default=8)
+    parser.add_argument('--roi', action='append', default=None,
+                        help="region of interest 'x1,y1,x2,y2' in frame fractions or 'default'; repeatable")
+    parser.add_argument('--tile', type=int, default=None,
+                        help='sliced inference: run the frame plus overlapping TILE x TILE crops in one batch')
+    parser.add_argument('--tile-overlap', type=float, default=0.2, help='tile overlap fraction')
+    parser.add_argument('--tile-guided', action='store_true',
+                        help='tile only around candidates found by the downscaled full-frame pass')
+    parser.add_argument('--track', action='store_true',
+                        help='track signs across frames and report unique signs per video')
+    parser.add_argument('--codec', default='xvid', choices=list(CODECS),
+                        help='codec of the annotated video (x264 requires ffmpeg)')
+    parser.add_argument('--overlay', default=OVERLAY_FRAME, choices=list(OVERLAY_MODES),
+                        help="'none' records raw frames; boxes are still in <name>_detections.jsonl")
+    parser.add_argument('--detection-log', action='store_true',
+                        help='also write a binary <name>.detlog indexed by class and time')
+    parser.add_argument('--no-video', action='store_true',
+                        help='write only per-frame detections, skip annotated video')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    videos = expand_inputs(args.inputs)
+    if not videos:
+        print("[HEADLESS] Nothing to process")
+        return 1
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or min(len(videos), max(1, cores // 4))
+    workers = max(1, min(workers, len(videos)))
+    threads = max(1, cores // workers)
+    batch_size = args.batch_size if args.batch_size == 'auto' else int(args.batch_size)
+    scheduler_options = {
+        'frame_skip': args.frame_skip,
+        'target_fps': args.target_fps,
+        'max_skip': args.max_skip,
+        'rois': [roi for text in args.roi for roi in parse_roi(text)] if args.roi else None,
+        'tiling': ({'tile': args.tile, 'overlap': args.tile_overlap, 'guided': args.tile_guided}
+                   if args.tile else None),
+        'tracking': args.track,
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    names = output_names(videos)
+
+    # Экспорт и замер выполняем один раз в главном процессе, воркеры берут готовый выбор
+    backend = args.backend
+    if backend == 'auto':
+        backend = select_backend(args.model, args.device, args.imgsz).name
+    print(f"[HEADLESS] {len(videos)} video(s), {workers} worker(s) x {threads} thread(s)")
+
+    summary = []
+    start = time.perf_counter()
+    # spawn: воркеры не наследуют состояние torch/OpenMP главного процесса после замера
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(args.model, args.device, args.imgsz, threads, backend)) as pool:
+        futures = {
+            pool.submit(_process_video_safe, video, args.output_dir, not args.no_video, batch_size,
+                        scheduler_options, args.codec, args.overlay, args.detection_log,
+                        names[video]): video
+            for video in videos
+        }
+        for future in as_completed(futures):
+            report = future.result()
+            summary.append(report)
+            if 'error' in report:
+                print(f"[HEADLESS] FAILED {report['video']}: {report['error']}")
+            else:
+                print(f"[HEADLESS] Done {report['video']}: {report['frames']} frames, "
+                      f"{report['fps']} FPS, {report['boxes']} boxes")
+
+    elapsed = time.perf_counter() - start
+    summary.sort(key=lambda r: videos.index(r['video']))
+    summary_path = os.path.join(args.output_dir, 'summary.json')
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({'seconds': round(elapsed, 2), 'videos': summary}, f, indent=2, ensure_ascii=False)
+
+    print(f"[HEADLESS] Finished in {elapsed:.1f} s, summary: {summary_path}")
+    return 1 if any('error' in r for r in summary) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import json
+import math
+import time
+
+import numpy as np
+
+from utils.detection import box_iou, boxes_data, make_result, nms
+from utils.tiling import TiledInference
+
+# Зоны, где обычно находятся знаки: правая половина кадра и верхняя полоса.
+# Координаты нормированные: x1, y1, x2, y2
+DEFAULT_ROIS = [(0.5, 0.0, 1.0, 1.0), (0.0, 0.0, 1.0, 0.4)]
+
+
+def parse_roi(text):
+    """'default' или 'x1,y1,x2,y2' в долях кадра"""
+    if text == 'default':
+        return list(DEFAULT_ROIS)
+    x1, y1, x2, y2 = (float(v) for v in text.split(','))
+    if not (0.0 <= x1 < x2 <= 1.0 and 0.0 <= y1 < y2 <= 1.0):
+        raise ValueError(f"Invalid ROI: {text}")
+    return [(x1, y1, x2, y2)]
+
+
+def detection_agreement(a, b, iou_threshold=0.5):
+    """F1 совпадения двух наборов рамок (N, 6) одного класса с IoU >= порога"""
+    if len(a) == 0 and len(b) == 0:
+        return 1.0
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    ious = box_iou(a[:, :4], b[:, :4])
+    ious[a[:, 5][:, None] != b[:, 5][None, :]] = 0.0
+    matched = 0
+    # Жадное сопоставление по убыванию IoU
+    while True:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        if ious[i, j] < iou_threshold:
+            break
+        matched += 1
+        ious[i, :] = 0.0
+        ious[:, j] = 0.0
+    return 2.0 * matched / (len(a) + len(b))
+
+
+class InferenceScheduler:
+    """
+    Обёртка над predict(frames) для стадии инференса FramePipeline.
+
+    frame_skip - инференс на каждом k-м кадре, на остальных рамки переносятся
+                 с последнего обработанного кадра;
+    target_fps - если задан, k подбирается автоматически по замеренной задержке;
+    rois       - инференс только по нормированным зонам кадра, зоны идут одним батчем,
+                 рамки собираются в координатах полного кадра с NMS между зонами;
+    tiling     - параметры TiledInference (tile, overlap, guided): кадр и его тайлы
+                 без уменьшения одним батчем, для мелких знаков на кадрах 2048x2048.
+
+    Для отчёта точность/скорость при каждом настоящем инференсе после пропусков
+    перенесённые рамки сравниваются со свежими (F1 при IoU >= 0.5).
+    """
+
+    def __init__(self, predict, frame_skip=1, target_fps=None, max_skip=8, rois=None, nms_iou=0.5,
+                 tracker=None, stable_skip=3, tiling=None):
+        if rois and tiling:
+            raise ValueError("ROIs and tiling cannot be combined")
+        self.predict = predict
+        self.frame_skip = max(1, int(frame_skip))
+        self.target_fps = target_fps
+        self.max_skip = max(1, int(max_skip))
+        self.rois = list(rois) if rois else None
+        self.nms_iou = nms_iou
+        self.tiler = TiledInference(predict, **tiling) if tiling else None
+        # С трекером пропущенные кадры получают экстраполированные рамки с id треков,
+        # а пока треки стабильны, инференс выполняется не чаще раза в stable_skip кадров
+        self.tracker = tracker
+        self.stable_skip = max(1, int(stable_skip))
+
+        self._last = None
+        self._names = {}
+        self._since = 0
+        self._latency = None
+        self._per_k = {}
+
+    @property
+    def passthrough(self):
+        return (self.frame_skip == 1 and self.target_fps is None and self.rois is None
+                and self.tracker is None and self.tiler is None)
+
+    def __call__(self, frames):
+        if self.passthrough:
+            return self.predict(frames)
+
+        start = time.perf_counter()
+        k = self.frame_skip
+        if self.tracker is not None and self.tracker.stable:
+            k = max(k, self.stable_skip)
+
+        # Решаем заранее, какие кадры батча идут в модель
+        infer_idx = []
+        since = self._since
+        has_last = self._last is not None
+        for i in range(len(frames)):
+            if not has_last or since >= k - 1:
+                infer_idx.append(i)
+                since = 0
+                has_last = True
+            else:
+                since += 1
+
+        inferred = self._infer([frames[i] for i in infer_idx]) if infer_idx else []
+        by_index = dict(zip(infer_idx, inferred))
+
+        results = []
+        stats = self._per_k.setdefault(k, {'frames': 0, 'inferred': 0, 'seconds': 0.0,
+                                          'agreement_sum': 0.0, 'agreement_count': 0})
+        for i, frame in enumerate(frames):
+            if i in by_index:
+                result = by_index[i]
+                data = boxes_data(result)
+                if self._since > 0 and self._last is not None:
+                    stats['agreement_sum'] += detection_agreement(self._last, data)
+                    stats['agreement_count'] += 1
+                self._names = result.names
+                self._since = 0
+                if self.tracker is not None:
+                    result = make_result(frame, self._names, self.tracker.update(data))
+                    data = boxes_data(result)
+                self._last = data
+            else:
+                if self.tracker is not None:
+                    result = make_result(frame, self._names, self.tracker.predict())
+                    self._last = boxes_data(result)
+                else:
+                    result = make_result(frame, self._names, self._last)
+                self._since += 1
+            results.append(result)
+
+        elapsed = time.perf_counter() - start
+        stats['frames'] += len(frames)
+        stats['inferred'] += len(infer_idx)
+        stats['seconds'] += elapsed
+
+        if infer_idx:
+            self._adapt(elapsed / len(infer_idx))
+        return results
+
+    def _infer(self, frames):
+        if self.tiler is not None:
+            return self.tiler(frames)
+        if self.rois is None:
+            return self.predict(frames)
+
+        crops, offsets = [], []
+        for frame in frames:
+            h, w = frame.shape[:2]
+            for x1, y1, x2, y2 in self.rois:
+                px1, py1, px2, py2 = int(x1 * w), int(y1 * h), int(x2 * w), int(y2 * h)
+                crops.append(frame[py1:py2, px1:px2])
+                offsets.append((px1, py1))
+
+        crop_results = self.predict(crops)
+
+        results = []
+        per_frame = len(self.rois)
+        for n, frame in enumerate(frames):
+            parts = []
+            for crop_result, (dx, dy) in zip(crop_results[n * per_frame:(n + 1) * per_frame],
+                                             offsets[n * per_frame:(n + 1) * per_frame]):
+                data = boxes_data(crop_result)
+                data[:, [0, 2]] += dx
+                data[:, [1, 3]] += dy
+                parts.append(data)
+            merged = nms(np.concatenate(parts), self.nms_iou)
+            results.append(make_result(frame, crop_results[n * per_frame].names, merged))
+        return results
+
+    def _adapt(self, latency):
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if not self.target_fps:
+            return
+        k = min(self.max_skip, max(1, math.ceil(self._latency * self.target_fps)))
+        if k != self.frame_skip:
+            print(f"[SCHEDULER] Frame skip {self.frame_skip} -> {k} "
+                  f"(latency {self._latency * 1000:.1f} ms, target {self.target_fps} FPS)")
+            self.frame_skip = k
+
+    def report(self):
+        per_k = []
+        for k, s in sorted(self._per_k.items()):
+            per_k.append({
+                'frame_skip': k,
+                'frames': s['frames'],
+                'inferred': s['inferred'],
+                'fps': s['frames'] / s['seconds'] if s['seconds'] else 0.0,
+                'mean_inference_ms': s['seconds'] / s['inferred'] * 1000.0 if s['inferred'] else 0.0,
+                'agreement': (s['agreement_sum'] / s['agreement_count']
+                              if s['agreement_count'] else None),
+            })
+        return {
+            'target_fps': self.target_fps,
+            'rois': self.rois,
+            'tiling': self.tiler.stats() if self.tiler is not None else None,
+            'current_frame_skip': self.frame_skip,
+            'tracking': self.tracker is not None,
+            'per_frame_skip': per_k,
+        }
+
+    def save_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
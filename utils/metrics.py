@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Порядок стадий горячего пути кадра - в нём же они выводятся и экспортируются
+STAGES = ('decode', 'preprocess', 'inference', 'nms', 'predict', 'plot', 'convert', 'emit', 'write',
+          'encode', 'latency')
+
+# Верхние границы корзин гистограммы Prometheus, секунды (+Inf добавляется при экспорте)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class RollingHistogram:
+    """
+    Последние window замеров в кольцевом буфере; перцентили считаются по запросу.
+    Счётчики корзин BUCKETS, count и total накапливаются за всё время, как в Prometheus.
+    """
+
+    def __init__(self, window=512):
+        self._values = np.zeros(window, dtype=np.float64)
+        self._buckets = np.zeros(len(BUCKETS) + 1, dtype=np.int64)
+        self._index = 0
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        # Замеры приходят из нескольких потоков (захват, инференс, запись)
+        with self._lock:
+            self._values[self._index] = seconds
+            self._index = (self._index + 1) % len(self._values)
+            self._buckets[np.searchsorted(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def summary(self):
+        with self._lock:
+            window = self._values[:min(self.count, len(self._values))].copy()
+            count, total = self.count, self.total
+            buckets = np.cumsum(self._buckets)
+        if not len(window):
+            return None
+        p50, p95, p99 = np.percentile(window, (50, 95, 99)) * 1000.0
+        return {
+            'count': count,
+            'mean_ms': total / count * 1000.0,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            # Накопленные счётчики для границ BUCKETS и +Inf
+            'buckets': buckets.tolist(),
+        }
+
+
+class StageMetrics:
+    """
+    Задержки стадий обработки кадра на монотонном таймере perf_counter.
+
+        with metrics.stage('plot'):
+            annotated = renderer.draw(frame, data, names)
+
+    или metrics.record('decode', seconds), если время уже измерено.
+    """
+
+    def __init__(self, window=512):
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        hist = self._histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(name, RollingHistogram(self.window))
+        return hist
+
+    def record(self, name, seconds):
+        self.histogram(name).record(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record_speed(self, speed):
+        """Разбивка ultralytics Results.speed (мс на кадр) на preprocess/inference/nms"""
+        for key, name in (('preprocess', 'preprocess'), ('inference', 'inference'), ('postprocess', 'nms')):
+            value = speed.get(key) if speed else None
+            if value is not None:
+                self.record(name, value / 1000.0)
+
+    def snapshot(self):
+        order = {name: i for i, name in enumerate(STAGES)}
+        names = sorted(self._histograms, key=lambda n: (order.get(n, len(order)), n))
+        stages = {}
+        for name in names:
+            summary = self._histograms[name].summary()
+            if summary is not None:
+                stages[name] = summary
+        return stages
+
+    def bottleneck(self, snapshot=None):
+        """Самая долгая по p95 стадия, не считая сводных predict и latency"""
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        candidates = {k: v for k, v in snapshot.items() if k not in ('predict', 'latency')}
+        if not candidates:
+            return None
+        return max(candidates, key=lambda k: candidates[k]['p95_ms'])
+
+
+def to_prometheus(snapshot, prefix='sign_detector_stage'):
+    lines = [
+        f"# HELP {prefix}_seconds Per-stage frame processing latency (rolling window)",
+        f"# TYPE {prefix}_seconds summary",
+    ]
+    for name, s in snapshot.items():
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+            lines.append(f'{prefix}_seconds{{stage="{name}",quantile="{quantile}"}} {s[key] / 1000.0:.6f}')
+        lines.append(f'{prefix}_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines.append(f'{prefix}_seconds_sum{{stage="{name}"}} {s["mean_ms"] * s["count"] / 1000.0:.6f}')
+
+    # Гистограмма за всё время: по ней Prometheus агрегирует перцентили между запусками
+    lines += [
+        f"# HELP {prefix}_duration_seconds Per-stage frame processing latency",
+        f"# TYPE {prefix}_duration_seconds histogram",
+    ]
+    for name, s in snapshot.items():
+        if 'buckets' not in s:
+            continue
+        for le, count in zip([f"{b:g}" for b in BUCKETS] + ['+Inf'], s['buckets']):
+            lines.append(f'{prefix}_duration_seconds_bucket{{stage="{name}",le="{le}"}} {count}')
+        lines.append(f'{prefix}_duration_seconds_sum{{stage="{name}"}} {s["mean_ms"] * s["count"] / 1000.0:.6f}')
+        lines.append(f'{prefix}_duration_seconds_count{{stage="{name}"}} {s["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path, snapshot):
+    """Атомарная запись: .prom - текст Prometheus (для node_exporter textfile), иначе JSON"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if path.endswith('.prom'):
+            f.write(to_prometheus(snapshot))
+        else:
+            json.dump({'timestamp': time.time(), 'stages': snapshot}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class MetricsServer:
+    """Локальный HTTP-эндпоинт: /metrics - текст Prometheus, /metrics.json - JSON"""
+
+    def __init__(self, metrics, port=9464, host='127.0.0.1'):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                snapshot = metrics.snapshot()
+                if handler.path == '/metrics':
+                    body = to_prometheus(snapshot).encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4'
+                elif handler.path == '/metrics.json':
+                    body = json.dumps({'timestamp': time.time(), 'stages': snapshot}).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    handler.send_error(404)
+                    return
+                handler.send_response(200)
+                handler.send_header('Content-Type', content_type)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+        self._thread.start()
+        print(f"[METRICS] Serving on http://{host}:{self.server.server_address[1]}/metrics")
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
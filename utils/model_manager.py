@@ -0,0 +1,123 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.backends import create_backend
+
+
+class SharedModel:
+    """
+    Модель из пула: один экземпляр YOLO достаётся нескольким потокам видео (новый
+    поток может стартовать, пока старый ещё дорабатывает), а predictor ultralytics
+    не потокобезопасен - вызовы predict сериализуются.
+    """
+
+    def __init__(self, model):
+        self._model = model
+        self._lock = threading.Lock()
+
+    def predict(self, frames):
+        with self._lock:
+            return self._model.predict(frames)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class ModelManager:
+    """
+    Фоновая загрузка и прогрев моделей. Загруженные модели остаются в памяти
+    между запусками/остановками видео и сменой источника.
+
+    on_loaded(key, timings) вызывается из потока загрузчика после прогрева.
+    get() возвращает SharedModel: predict общей модели не выполняется одновременно.
+    """
+
+    def __init__(self, max_workers=1, on_loaded=None, warmup_runs=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='model-loader')
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.on_loaded = on_loaded
+        self.warmup_runs = warmup_runs
+        self.timings = {}
+
+    @staticmethod
+    def key(model_path, backend='auto', device='cpu', imgsz=640):
+        return f"{model_path}|{backend}|{device}|{imgsz}"
+
+    def preload(self, model_path, backend='auto', device='cpu', imgsz=640):
+        """Запускает загрузку в фоне (если ещё не запущена) и возвращает Future"""
+        key = self.key(model_path, backend, device, imgsz)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(self._load, key, model_path, backend, device, imgsz)
+                self._futures[key] = future
+            return future
+
+    def get(self, model_path, backend='auto', device='cpu', imgsz=640, timeout=None):
+        """Блокирует до готовности модели; не вызывать из GUI-потока"""
+        key = self.key(model_path, backend, device, imgsz)
+        future = self.preload(model_path, backend, device, imgsz)
+        try:
+            return future.result(timeout)
+        except Exception:
+            # Неудачную загрузку забываем, чтобы следующий запуск повторил попытку
+            with self._lock:
+                if future.done() and self._futures.get(key) is future:
+                    del self._futures[key]
+            raise
+
+    def is_ready(self, model_path, backend='auto', device='cpu', imgsz=640):
+        key = self.key(model_path, backend, device, imgsz)
+        with self._lock:
+            future = self._futures.get(key)
+        return future is not None and future.done() and future.exception() is None
+
+    def evict(self, model_path, backend='auto', device='cpu', imgsz=640):
+        key = self.key(model_path, backend, device, imgsz)
+        with self._lock:
+            self._futures.pop(key, None)
+            self.timings.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'resident': [k for k, f in self._futures.items() if f.done() and f.exception() is None],
+                'loading': [k for k, f in self._futures.items() if not f.done()],
+                'timings': dict(self.timings),
+            }
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _load(self, key, model_path, backend, device, imgsz):
+        try:
+            start = time.perf_counter()
+            model = create_backend(backend, model_path, device=device, imgsz=imgsz)
+            loaded = time.perf_counter()
+            if self.warmup_runs:
+                model.warmup(runs=self.warmup_runs)
+            warmed = time.perf_counter()
+        except Exception as e:
+            print(f"[MODEL] Failed to load {key}: {e}")
+            traceback.print_exc()
+            raise
+
+        timings = {
+            'backend': model.name,
+            'load_ms': (loaded - start) * 1000.0,
+            'warmup_ms': (warmed - loaded) * 1000.0,
+        }
+        with self._lock:
+            self.timings[key] = timings
+        print(f"[MODEL] Ready {key}: {model.name}, load {timings['load_ms']:.0f} ms, "
+              f"warm-up {timings['warmup_ms']:.0f} ms")
+
+        if self.on_loaded:
+            try:
+                self.on_loaded(key, timings)
+            except Exception as e:
+                print(f"[MODEL] on_loaded callback error: {e}")
+        return SharedModel(model)
@@ -0,0 +1,212 @@
+import threading
+import time
+import traceback
+
+from utils.frame_pipeline import POLICY_BLOCK, POLICY_LATEST, BoundedFrameQueue, is_live_source
+from utils.rtsp_ingest import open_video_source
+
+
+class StreamWorker:
+    """
+    Поток захвата одного источника. Кадры кладутся в собственную очередь потока:
+    для живых источников хранится только самый свежий, файлы читаются без потерь.
+    """
+
+    def __init__(self, stream_id, source, on_frame=None, queue_size=2, rtsp_transport='tcp'):
+        self.stream_id = stream_id
+        self.source = source
+        self.live = is_live_source(source)
+        self.on_frame = on_frame
+        self.rtsp_transport = rtsp_transport
+        self.queue = BoundedFrameQueue(f"stream-{stream_id}", 1 if self.live else queue_size,
+                                       POLICY_LATEST if self.live else POLICY_BLOCK)
+        self.cap = None
+        self.paused = False
+        self.running = True
+        self.error = None
+
+        self.frames_read = 0
+        self.frames_inferred = 0
+        self.latency_ema = None
+        self._fps_start = None
+
+        self._thread = threading.Thread(target=self._run, name=f"stream-{stream_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        self.queue.close()
+        if self.cap is not None and hasattr(self.cap, 'stop'):
+            self.cap.stop()
+
+    def join(self, timeout=2.0):
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self.cap = open_video_source(self.source, self.rtsp_transport)
+            if not self.cap.isOpened():
+                raise RuntimeError(f"Cannot open video source: {self.source}")
+
+            while self.running:
+                if self.paused and not self.live:
+                    time.sleep(0.1)
+                    continue
+
+                ret, frame = self.cap.read()
+                if not ret:
+                    print(f"[STREAM {self.stream_id}] End of video or cannot read frame")
+                    break
+                self.frames_read += 1
+                if self.paused:
+                    continue
+
+                while self.running and not self.queue.put((frame, time.perf_counter())):
+                    if self.queue.closed:
+                        return
+                if self.on_frame is not None:
+                    self.on_frame()
+        except Exception as e:
+            print(f"[STREAM {self.stream_id}] Capture error: {e}")
+            traceback.print_exc()
+            self.error = e
+        finally:
+            self.queue.close()
+            if self.on_frame is not None:
+                self.on_frame()
+            if self.cap is not None:
+                self.cap.release()
+
+    def record(self, latency, now):
+        if self._fps_start is None:
+            self._fps_start = now
+        self.frames_inferred += 1
+        self.latency_ema = latency if self.latency_ema is None else 0.9 * self.latency_ema + 0.1 * latency
+
+    def stats(self, now=None):
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._fps_start if self._fps_start is not None else 0.0
+        return {
+            'source': str(self.source),
+            'frames_read': self.frames_read,
+            'frames_inferred': self.frames_inferred,
+            'dropped': self.queue.dropped,
+            'fps': (self.frames_inferred - 1) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': self.latency_ema * 1000.0 if self.latency_ema is not None else 0.0,
+            'finished': self.queue.drained(),
+        }
+
+
+class MultiStreamEngine:
+    """
+    N источников на одну модель: каждый источник читается своим StreamWorker,
+    а единственный цикл инференса (в потоке, вызвавшем run()) собирает из их очередей
+    общий батч.
+
+    Батч набирается по кругу, не больше одного кадра от источника за проход,
+    а стартовый источник сдвигается с каждым батчем - так при max_batch < N
+    ни один поток не голодает, а быстрый файл не вытесняет камеры.
+
+    predict - predict(frames) -> список результатов той же длины
+    render  - render(stream_id, frame, result), вызывается в потоке run()
+    """
+
+    def __init__(self, sources, predict, render, max_batch=None, queue_size=2, rtsp_transport='tcp'):
+        self.predict = predict
+        self.render = render
+        self.max_batch = max(1, int(max_batch or len(sources)))
+        self._wakeup = threading.Event()
+        self.workers = [StreamWorker(i, source, on_frame=self._wakeup.set, queue_size=queue_size,
+                                     rtsp_transport=rtsp_transport)
+                        for i, source in enumerate(sources)]
+
+        self.running = True
+        self.error = None
+        self.batches = 0
+        self.frames_inferred = 0
+        self.inference_seconds = 0.0
+        self._next = 0
+
+    @property
+    def paused(self):
+        return any(w.paused for w in self.workers)
+
+    @paused.setter
+    def paused(self, value):
+        for w in self.workers:
+            w.paused = value
+
+    def stop(self):
+        self.running = False
+        for w in self.workers:
+            w.stop()
+        self._wakeup.set()
+
+    def collect_batch(self):
+        """Кадры по кругу, начиная с источника self._next: [(worker, frame, t_capture)]"""
+        n = len(self.workers)
+        batch = []
+        start = self._next
+        progress = True
+        while progress and len(batch) < self.max_batch:
+            progress = False
+            for offset in range(n):
+                worker = self.workers[(start + offset) % n]
+                item = worker.queue.get(timeout=0)
+                if item is None:
+                    continue
+                batch.append((worker, item[0], item[1]))
+                progress = True
+                if len(batch) >= self.max_batch:
+                    break
+        self._next = (start + 1) % n
+        return batch
+
+    def stats(self):
+        now = time.perf_counter()
+        return {
+            'batches': self.batches,
+            'frames_inferred': self.frames_inferred,
+            'mean_batch': self.frames_inferred / self.batches if self.batches else 0.0,
+            'inference_ms_per_frame': (self.inference_seconds / self.frames_inferred * 1000.0
+                                       if self.frames_inferred else 0.0),
+            'streams': [w.stats(now) for w in self.workers],
+        }
+
+    def run(self):
+        for w in self.workers:
+            w.start()
+        try:
+            while self.running:
+                # Сбрасываем флаг до опроса очередей, чтобы не пропустить кадр,
+                # пришедший между опросом и ожиданием
+                self._wakeup.clear()
+                batch = self.collect_batch()
+                if not batch:
+                    if all(w.queue.drained() for w in self.workers):
+                        break
+                    self._wakeup.wait(0.1)
+                    continue
+
+                start = time.perf_counter()
+                results = self.predict([frame for _, frame, _ in batch])
+                now = time.perf_counter()
+                self.inference_seconds += now - start
+                self.batches += 1
+                self.frames_inferred += len(batch)
+
+                for (worker, frame, t_capture), result in zip(batch, results):
+                    self.render(worker.stream_id, frame, result)
+                    done = time.perf_counter()
+                    worker.record(done - t_capture, done)
+        except Exception as e:
+            print(f"[MULTI] Inference error: {e}")
+            traceback.print_exc()
+            self.error = e
+        finally:
+            self.stop()
+            for w in self.workers:
+                w.join()
@@ -0,0 +1,177 @@
+import time
+import traceback
+
+import cv2
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from utils.backends import create_backend
+from utils.detection import extract_detection_info
+from utils.frame_buffers import FrameBufferRing
+from utils.multi_stream import MultiStreamEngine
+from utils.overlay import OverlayRenderer, result_data
+from utils.presentation import PresentationScheduler
+
+
+class StreamView:
+    """Состояние показа одного источника в сетке: буферы, такт показа, размер ячейки"""
+
+    def __init__(self, display_fps):
+        self.buffers = FrameBufferRing(slots=2)
+        self.presenter = PresentationScheduler(display_fps)
+        self.display_size = None
+
+
+class MultiVideoThread(QThread):
+    """
+    Многопоточный режим: N источников, одна модель из ModelManager и общий
+    межпотоковый батч (MultiStreamEngine). Кадры отдаются в сетку по номеру источника.
+    Запись видео в этом режиме не поддерживается.
+    """
+
+    # (номер источника, QImage поверх буфера, слот буфера)
+    frame_ready = pyqtSignal(int, QImage, int)
+    fps_ready = pyqtSignal(float)
+    finished_signal = pyqtSignal()
+    detection_info_ready = pyqtSignal(dict)
+    model_ready = pyqtSignal(str)
+    stream_stats_ready = pyqtSignal(dict)
+
+    def __init__(self, model_path, sources, device='cpu', imgsz=640, backend='torch',
+                 model_manager=None, display_fps=15.0, max_batch=None, rtsp_transport='tcp',
+                 stats_interval=1.0):
+        super().__init__()
+        self.model_path = model_path
+        self.sources = list(sources)
+        self.device = device
+        self.imgsz = imgsz
+        self.backend = backend
+        self.model_manager = model_manager
+        self.max_batch = max_batch
+        self.rtsp_transport = rtsp_transport
+        self.stats_interval = stats_interval
+
+        self.views = [StreamView(display_fps) for _ in self.sources]
+        # Рамки рисуются только в уменьшенный буфер ячейки сетки, полный кадр не трогаем
+        self.renderer = OverlayRenderer()
+        self.engine = None
+        self.model = None
+        self.is_paused = False
+        self.running = True
+        self._last_stats = 0.0
+
+    def load_model(self):
+        start = time.perf_counter()
+        if self.model_manager is not None:
+            model = None
+            while model is None:
+                if not self.running:
+                    return None
+                try:
+                    model = self.model_manager.get(self.model_path, self.backend, self.device,
+                                                   self.imgsz, timeout=0.1)
+                except TimeoutError:
+                    continue
+        else:
+            model = create_backend(self.backend, self.model_path, device=self.device, imgsz=self.imgsz)
+        print(f"[MULTI] Inference backend: {model.name}, ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return model
+
+    def run(self):
+        try:
+            self.model = self.load_model()
+            if self.model is None:
+                return
+            self.model_ready.emit(self.model.name)
+
+            self.engine = MultiStreamEngine(self.sources, self.model.predict, self.render_frame,
+                                            max_batch=self.max_batch, rtsp_transport=self.rtsp_transport)
+            self.engine.paused = self.is_paused
+            if not self.running:
+                self.engine.stop()
+            print(f"[MULTI] {len(self.sources)} streams, max batch {self.engine.max_batch}")
+
+            self.engine.run()
+
+            for view in self.views:
+                detections = view.presenter.take_detections()
+                if detections:
+                    self.detection_info_ready.emit(detections)
+            self.stream_stats_ready.emit(self.engine.stats())
+            print(f"[MULTI] Engine stats: {self.engine.stats()}")
+        except Exception as e:
+            print(f"[MULTI] Exception in run: {e}")
+            with open("video_thread_error.log", "a", encoding="utf-8") as f:
+                f.write("Exception in MultiVideoThread.run:\n")
+                traceback.print_exc(file=f)
+        finally:
+            try:
+                self.finished_signal.emit()
+            except Exception as e:
+                print(f"[MULTI] Error emitting finished signal: {e}")
+
+    def render_frame(self, stream_id, frame, result):
+        view = self.views[stream_id]
+        if not view.presenter.frame_processed(extract_detection_info(result)):
+            return
+
+        # Рисуем рамки только для кадров, которые действительно будут показаны
+        try:
+            if self.emit_display_frame(stream_id, view, frame, result_data(result), result.names):
+                view.presenter.mark_displayed()
+        except Exception as e:
+            print(f"[MULTI] Image conversion error: {e}")
+
+        detections = view.presenter.take_detections()
+        if detections:
+            self.detection_info_ready.emit(detections)
+
+        now = time.perf_counter()
+        if now - self._last_stats >= self.stats_interval:
+            self._last_stats = now
+            stats = self.engine.stats()
+            self.fps_ready.emit(sum(s['fps'] for s in stats['streams']))
+            self.stream_stats_ready.emit(stats)
+
+    def set_display_size(self, stream_id, width, height):
+        if 0 <= stream_id < len(self.views):
+            self.views[stream_id].display_size = (max(1, width), max(1, height))
+
+    def emit_display_frame(self, stream_id, view, frame, data, names):
+        h, w = frame.shape[:2]
+        th, tw = h, w
+        if view.display_size is not None:
+            scale = min(view.display_size[0] / w, view.display_size[1] / h)
+            th, tw = max(1, int(h * scale)), max(1, int(w * scale))
+
+        slot, buf = view.buffers.acquire((th, tw, 3))
+        if slot is None:
+            return False
+        if (th, tw) == (h, w):
+            buf[...] = frame
+        else:
+            interpolation = cv2.INTER_AREA if tw < w else cv2.INTER_LINEAR
+            cv2.resize(frame, (tw, th), dst=buf, interpolation=interpolation)
+        self.renderer.draw(buf, data, names, scale=tw / w)
+
+        qimg = QImage(buf.data, tw, th, buf.strides[0], QImage.Format.Format_BGR888)
+        self.frame_ready.emit(stream_id, qimg, slot)
+        return True
+
+    def release_display_buffer(self, stream_id, slot):
+        self.views[stream_id].buffers.release(slot)
+
+    def toggle_pause(self):
+        self.is_paused = not self.is_paused
+        if self.engine:
+            self.engine.paused = self.is_paused
+
+    def stop(self):
+        self.running = False
+        if self.engine:
+            self.engine.stop()
+        self.msleep(100)
+
+    def set_save_video(self, save_video):
+        if save_video:
+            print("[MULTI] Video saving is not supported in multi-stream mode")
@@ -0,0 +1,273 @@
+# Варианты обученных весов для CPU: INT8 (ONNX Runtime / OpenVINO) и прореженные,
+# с таблицей mAP50-95 / задержка на валидации TT100K-YOLO:
+#   python -m utils.optimize_model models/best.pt --data TT100K-YOLO/data.yaml
+# Варианты регистрируются в <папка весов>/.cache/<хэш>/variants.json, откуда их берёт приложение.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from utils.backends import BACKENDS, create_backend, export_model, weights_cache_root
+from utils.dataset_index import IMAGE_EXTS, scan_tree
+
+VARIANTS_FILE = 'variants.json'
+DEFAULT_VARIANTS = ('torch', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8', 'pruned30')
+
+
+def load_variants(model_path):
+    """Записи variants.json для весов model_path; [] если оптимизация не запускалась"""
+    try:
+        with open(os.path.join(weights_cache_root(model_path), VARIANTS_FILE), encoding='utf-8') as f:
+            return json.load(f)['variants']
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def load_data_yaml(path):
+    """data.yaml ultralytics: (корень датасета, словарь с абсолютными путями train/val)"""
+    import yaml
+
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    root = data.get('path') or os.path.dirname(os.path.abspath(path))
+    if not os.path.isabs(root):
+        root = os.path.join(os.path.dirname(os.path.abspath(path)), root)
+    for split in ('train', 'val'):
+        if isinstance(data.get(split), str) and not os.path.isabs(data[split]):
+            data[split] = os.path.join(root, data[split])
+    data['path'] = root
+    return data
+
+
+def list_images(entry):
+    """Изображения split-а: каталог или .txt со списком путей"""
+    if entry.endswith('.txt'):
+        base = os.path.dirname(entry)
+        with open(entry, encoding='utf-8') as f:
+            return [os.path.join(base, line.strip()) for line in f if line.strip()]
+    return [os.path.join(entry, rel) for rel in sorted(scan_tree(entry, IMAGE_EXTS))]
+
+
+def write_subset_yaml(data, images, path, split_name):
+    """data.yaml, где train и val - список images (калибровка, сокращённая валидация)"""
+    import yaml
+
+    list_path = os.path.splitext(path)[0] + '.txt'
+    with open(list_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(os.path.abspath(p) for p in images) + "\n")
+    subset = {'path': data['path'], 'train': list_path, 'val': list_path, 'names': data['names']}
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(subset, f, allow_unicode=True, sort_keys=False)
+    print(f"[OPTIMIZE] {split_name}: {len(images)} images -> {path}")
+    return path
+
+
+def letterbox(image, size):
+    """Как в ultralytics: вписать с сохранением пропорций, поля 114, RGB CHW float32 0..1"""
+    import cv2
+
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = round(h * scale), round(w * scale)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return np.ascontiguousarray(canvas[:, :, ::-1].transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+
+
+def head_nodes(onnx_path):
+    """
+    Узлы декодирования рамок в голове Detect (последний /model.N/), кроме свёрток.
+    Квантование конкатенации координат и сигмоид классов заметно режет mAP, а по
+    времени они почти ничего не стоят - оставляем их в fp32.
+    """
+    import re
+
+    import onnx
+
+    graph = onnx.load(onnx_path, load_external_data=False).graph
+    index = {n.name: int(m.group(1)) for n in graph.node if (m := re.match(r'/model\.(\d+)/', n.name))}
+    if not index:
+        return []
+    head = max(index.values())
+    return [n.name for n in graph.node if index.get(n.name) == head and n.op_type != 'Conv']
+
+
+def quantize_onnx(model_path, calib_images, imgsz, target):
+    """Статическое INT8-квантование ONNX Runtime (QDQ, веса по каналам) с калибровкой на calib_images"""
+    import cv2
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    source = create_backend('onnx', model_path, imgsz=imgsz).model_path
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.paths = iter(calib_images)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {self.input_name: letterbox(image, imgsz)}
+            return None
+
+    input_name = onnx.load(source, load_external_data=False).graph.input[0].name
+    start = time.perf_counter()
+    quantize_static(source, target, Reader(input_name), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+                    nodes_to_exclude=head_nodes(source))
+    print(f"[OPTIMIZE] ONNX INT8 in {time.perf_counter() - start:.1f} s: {target}")
+    return target
+
+
+def quantize_openvino(model_path, calib_yaml, imgsz, target):
+    """Post-training INT8 OpenVINO (NNCF) через экспорт ultralytics, калибровка - calib_yaml"""
+    return export_model(model_path, 'openvino', target, imgsz, int8=True, data=calib_yaml, dynamic=False)
+
+
+def prune_weights(model_path, amount, target):
+    """
+    Глобальное L1-прореживание весов свёрток: amount самых малых по модулю весов
+    обнуляются. Плотные CPU-рантаймы от нулей не ускоряются, выигрыш - в сжатии
+    весов и в сочетании с INT8; цена в точности видна в таблице.
+    """
+    import torch
+    from torch.nn.utils import prune
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    convs = [(m, 'weight') for m in model.model.modules() if isinstance(m, torch.nn.Conv2d)]
+    prune.global_unstructured(convs, pruning_method=prune.L1Unstructured, amount=amount)
+    for module, name in convs:
+        prune.remove(module, name)
+    zeros = sum(int((m.weight == 0).sum()) for m, _ in convs)
+    total = sum(m.weight.numel() for m, _ in convs)
+    model.save(target)
+    print(f"[OPTIMIZE] Pruned {zeros / total:.0%} of conv weights: {target}")
+    return target
+
+
+def evaluate(backend, model_path, artifact, val_yaml, imgsz, runs):
+    """mAP на валидации (ultralytics val) и задержка кадра через тот же бэкенд, что в приложении"""
+    from ultralytics import YOLO
+
+    metrics = YOLO(artifact, task='detect').val(data=val_yaml, imgsz=imgsz, batch=1, device='cpu',
+                                                plots=False, verbose=False)
+    latency = create_backend(backend, model_path, device='cpu', imgsz=imgsz).benchmark(runs)
+    return float(metrics.box.map), float(metrics.box.map50), latency
+
+
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path)
+
+
+def write_report(rows, path):
+    base = rows[0]
+    lines = [
+        "| variant | backend | mAP50-95 | ΔmAP50-95 | mAP50 | latency, ms | speedup | size, MB |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for row in rows:
+        lines.append(f"| {row['name']} | {row['backend']} | {row['map50_95']:.4f} | "
+                     f"{row['map50_95'] - base['map50_95']:+.4f} | {row['map50']:.4f} | "
+                     f"{row['latency_ms']:.1f} | {row['speedup']:.2f}x | {row['size_mb']:.1f} |")
+    table = "\n".join(lines) + "\n"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(table)
+    with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.optimize_model',
+                                     description='Build INT8 / pruned variants of YOLO weights and compare them')
+    parser.add_argument('model', nargs='?', default='models/best.pt')
+    parser.add_argument('--data', default='TT100K-YOLO/data.yaml', help='dataset for calibration and validation')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--variants', nargs='+', default=list(DEFAULT_VARIANTS),
+                        help="backends (torch, onnx, onnx-int8, openvino, openvino-int8) and pruned<percent>")
+    parser.add_argument('--calib-images', type=int, default=300, help='calibration images drawn from train')
+    parser.add_argument('--val-images', type=int, default=0, help='validate on a random subset (0 = full val)')
+    parser.add_argument('--runs', type=int, default=30, help='timed predictions per variant')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', default='result/model_variants.md')
+    args = parser.parse_args(argv)
+
+    data = load_data_yaml(args.data)
+    work_dir = os.path.join(weights_cache_root(args.model), f"imgsz{args.imgsz}")
+    os.makedirs(work_dir, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+
+    train_images = list_images(data['train'])
+    calib = [train_images[i] for i in rng.choice(len(train_images), min(args.calib_images, len(train_images)),
+                                                  replace=False)]
+    calib_yaml = write_subset_yaml(data, calib, os.path.join(work_dir, 'calib.yaml'), 'Calibration')
+    val_yaml = os.path.abspath(args.data)
+    if args.val_images:
+        val_images = list_images(data['val'])
+        picked = rng.choice(len(val_images), min(args.val_images, len(val_images)), replace=False)
+        val_yaml = write_subset_yaml(data, [val_images[i] for i in sorted(picked)],
+                                     os.path.join(work_dir, 'val_subset.yaml'), 'Validation')
+
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    rows = []
+    for variant in args.variants:
+        try:
+            if variant.startswith('pruned'):
+                amount = int(variant[len('pruned'):] or 30) / 100.0
+                weights = os.path.join(weights_cache_root(args.model), f"{stem}_{variant}.pt")
+                prune_weights(args.model, amount, weights)
+                backend, artifact = 'torch', weights
+            elif variant in BACKENDS:
+                cls = BACKENDS[variant]
+                if not cls.available():
+                    print(f"[OPTIMIZE] Skipping {variant}: runtime is not installed")
+                    continue
+                weights, backend = args.model, variant
+                artifact = cls.artifact_path(work_dir, stem) or args.model
+                if variant == 'onnx-int8':
+                    quantize_onnx(args.model, calib, args.imgsz, artifact)
+                elif variant == 'openvino-int8':
+                    quantize_openvino(args.model, calib_yaml, args.imgsz, artifact)
+                elif cls.export_format:
+                    artifact = create_backend(variant, args.model, imgsz=args.imgsz).model_path
+            else:
+                print(f"[OPTIMIZE] Unknown variant: {variant}")
+                continue
+
+            map50_95, map50, latency = evaluate(backend, weights, artifact, val_yaml, args.imgsz, args.runs)
+        except Exception as e:
+            print(f"[OPTIMIZE] {variant} failed: {e}")
+            continue
+        rows.append({'name': variant, 'backend': backend, 'model_path': os.path.abspath(weights),
+                     'artifact': os.path.abspath(artifact), 'imgsz': args.imgsz, 'map50_95': map50_95,
+                     'map50': map50, 'latency_ms': latency, 'size_mb': path_size(artifact) / 1e6})
+        print(f"[OPTIMIZE] {variant}: mAP50-95 {map50_95:.4f}, {latency:.1f} ms/frame")
+
+    if not rows:
+        print("[OPTIMIZE] No variants were built")
+        return 1
+    base = next((r for r in rows if r['name'] == 'torch'), rows[0])
+    for row in rows:
+        row['speedup'] = base['latency_ms'] / row['latency_ms'] if row['latency_ms'] else 0.0
+    rows.sort(key=lambda r: r is not base)
+
+    print(write_report(rows, args.report))
+    manifest_path = os.path.join(weights_cache_root(args.model), VARIANTS_FILE)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'created': time.time(), 'data': os.path.abspath(args.data), 'variants': rows}, f, indent=2)
+    print(f"[OPTIMIZE] Report: {args.report}, variants: {manifest_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import colorsys
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from utils.detection import _to_numpy
+
+OVERLAY_FRAME = 'frame'  # рамки рисуются прямо в кадр, в запись идёт размеченное видео
+OVERLAY_NONE = 'none'    # в запись идут исходные кадры + детекции рядом в .jsonl
+OVERLAY_MODES = (OVERLAY_FRAME, OVERLAY_NONE)
+
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def class_color(class_id):
+    """Стабильный BGR-цвет класса: оттенки по золотому сечению хорошо различимы"""
+    r, g, b = colorsys.hsv_to_rgb((class_id * 0.618033988749895) % 1.0, 0.85, 0.95)
+    return int(b * 255), int(g * 255), int(r * 255)
+
+
+def result_data(result):
+    """Рамки Results одной передачей на хост: (N, 6) или (N, 7) с track id"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty((0, 6), dtype=np.float32)
+    return _to_numpy(boxes.data)
+
+
+class OverlayRenderer:
+    """
+    Замена Results.plot(): рамки и подписи рисуются на месте в переданный кадр,
+    без копии изображения.
+
+    Подпись ("класс 0.87", с трекингом "id:5 класс 0.87") рендерится один раз
+    в спрайт и затем только копируется в кадр. Спрайты кешируются по классу,
+    корзине уверенности (conf_step) и track id, кеш ограничен max_sprites (LRU).
+    Названия классов TT100K - ASCII-коды, шрифт Hershey не-ASCII символы не рисует.
+    """
+
+    def __init__(self, conf_step=0.01, max_sprites=2048, line_width=None):
+        self.conf_step = conf_step
+        self.max_sprites = max_sprites
+        self.line_width = line_width
+        self._sprites = OrderedDict()
+        self._colors = {}
+        self._styles = {}
+        self.sprite_hits = 0
+        self.sprite_misses = 0
+
+    def _style(self, shape):
+        style = self._styles.get(shape)
+        if style is None:
+            # Толщина линий и размер шрифта от размера кадра, как в ultralytics
+            lw = self.line_width or max(round(sum(shape) / 2 * 0.003), 2)
+            style = (lw, lw / 3, max(lw - 1, 1))
+            self._styles[shape] = style
+        return style
+
+    def _color(self, class_id):
+        color = self._colors.get(class_id)
+        if color is None:
+            color = self._colors[class_id] = class_color(class_id)
+        return color
+
+    def _sprite(self, class_id, bucket, track_id, names, style):
+        key = (class_id, bucket, track_id, style)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.sprite_hits += 1
+            return sprite
+
+        self.sprite_misses += 1
+        name = str(names.get(class_id, class_id) if isinstance(names, dict) else names[class_id])
+        text = f"{name} {bucket * self.conf_step:.2f}"
+        if track_id is not None:
+            text = f"id:{track_id} {text}"
+        text = text.encode('ascii', 'replace').decode('ascii')
+
+        _, font_scale, thickness = style
+        (tw, th), baseline = cv2.getTextSize(text, _FONT, font_scale, thickness)
+        pad = max(1, thickness)
+        color = self._color(class_id)
+        sprite = np.empty((th + baseline + 2 * pad, tw + 2 * pad, 3), dtype=np.uint8)
+        sprite[...] = color
+        # Белый текст на тёмном фоне, чёрный на светлом
+        text_color = (0, 0, 0) if 0.114 * color[0] + 0.587 * color[1] + 0.299 * color[2] > 150 else (255, 255, 255)
+        cv2.putText(sprite, text, (pad, th + pad), _FONT, font_scale, text_color, thickness, cv2.LINE_AA)
+
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, img, data, names, scale=1.0):
+        """
+        Рисует рамки data (N, 6) или (N, 7) в img на месте и возвращает img.
+        scale - масштаб координат, если img уменьшен относительно исходного кадра.
+        """
+        if len(data) == 0:
+            return img
+        h, w = img.shape[:2]
+        style = self._style((h, w))
+        lw = style[0]
+
+        boxes = np.rint(data[:, :4] * scale).astype(np.int32)
+        # Рамки трекера экстраполируются и могут выходить за кадр
+        boxes[:, 0::2] = np.clip(boxes[:, 0::2], 0, w - 1)
+        boxes[:, 1::2] = np.clip(boxes[:, 1::2], 0, h - 1)
+        class_ids = data[:, -1].astype(np.int64).tolist()
+        buckets = np.rint(data[:, -2] / self.conf_step).astype(np.int64).tolist()
+        track_ids = data[:, 4].astype(np.int64).tolist() if data.shape[1] == 7 else [None] * len(data)
+
+        for (x1, y1, x2, y2), class_id, bucket, track_id in zip(boxes.tolist(), class_ids, buckets, track_ids):
+            cv2.rectangle(img, (x1, y1), (x2, y2), self._color(class_id), lw, cv2.LINE_AA)
+
+            sprite = self._sprite(class_id, bucket, track_id, names, style)
+            sh, sw = sprite.shape[:2]
+            # Подпись над рамкой, а если сверху нет места - внутри рамки
+            top = y1 - sh if y1 - sh >= 0 else y1
+            top, x1 = min(max(top, 0), h - 1), min(max(x1, 0), w - 1)
+            bottom, right = min(top + sh, h), min(x1 + sw, w)
+            img[top:bottom, x1:right] = sprite[:bottom - top, :right - x1]
+        return img
+
+    def draw_result(self, img, result, scale=1.0):
+        return self.draw(img, result_data(result), result.names, scale)
+
+    def stats(self):
+        return {
+            'sprites': len(self._sprites),
+            'sprite_hits': self.sprite_hits,
+            'sprite_misses': self.sprite_misses,
+        }
@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+
+
+def _grow(array, size, fill):
+    grown = np.full(size, fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class PresentationScheduler:
+    """
+    Ограничивает частоту обновления GUI частотой экрана независимо от скорости обработки.
+
+    Рабочий поток сообщает о каждом обработанном кадре через frame_processed().
+    Метод возвращает True, только когда наступил очередной такт показа: тогда
+    показывается текущий (самый свежий) кадр, а детекции, накопленные между
+    тактами, отдаются одним пакетом через take_detections().
+    """
+
+    def __init__(self, display_fps=30.0, clock=time.perf_counter):
+        self.interval = 1.0 / display_fps if display_fps else 0.0
+        self.clock = clock
+        self.frames_processed = 0
+        self.frames_displayed = 0
+        # Плотный вектор максимумов по id класса, -1 - класс не встречался
+        self._pending = np.full(0, -1.0, dtype=np.float32)
+        # Число кадров с классом и сумма уверенностей за такт (для среднего в таблице)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._sums = np.zeros(0, dtype=np.float64)
+        self._names = {}
+        self._last_tick = None
+        self._tick_frames = 0
+        self._processing_fps = 0.0
+
+    def frame_processed(self, detections=None):
+        self.frames_processed += 1
+        self._tick_frames += 1
+        if detections:
+            self._merge(detections)
+
+        now = self.clock()
+        if self._last_tick is not None and now - self._last_tick < self.interval:
+            return False
+
+        if self._last_tick is not None:
+            self._processing_fps = self._tick_frames / (now - self._last_tick + 1e-6)
+        self._last_tick = now
+        self._tick_frames = 0
+        return True
+
+    def _merge(self, detections):
+        ids = detections.class_ids
+        size = int(ids.max()) + 1
+        if size > len(self._pending):
+            capacity = max(size, 2 * len(self._pending))
+            self._pending = _grow(self._pending, capacity, -1.0)
+            self._counts = _grow(self._counts, capacity, 0)
+            self._sums = _grow(self._sums, capacity, 0.0)
+        # id классов в ClassConfidences уникальны, поэтому обычное присваивание корректно
+        self._pending[ids] = np.maximum(self._pending[ids], detections.confidences)
+        self._counts[ids] += 1
+        self._sums[ids] += detections.confidences
+        self._names = detections.names
+
+    def mark_displayed(self):
+        self.frames_displayed += 1
+
+    def take_detections(self):
+        """Накопленное с прошлого такта: {имя класса: (макс. conf, число кадров, сумма conf)}"""
+        ids = np.flatnonzero(self._pending >= 0)
+        pending = {
+            self._names[i]: (float(self._pending[i]), int(self._counts[i]), float(self._sums[i]))
+            for i in ids.tolist()
+        }
+        self._pending[ids] = -1.0
+        self._counts[ids] = 0
+        self._sums[ids] = 0.0
+        return pending
+
+    @property
+    def processing_fps(self):
+        """Кадров в секунду, обработанных за последний такт показа"""
+        return self._processing_fps
+
+    def stats(self):
+        return {
+            'frames_processed': self.frames_processed,
+            'frames_displayed': self.frames_displayed,
+            'display_fps_limit': 1.0 / self.interval if self.interval else 0.0,
+        }
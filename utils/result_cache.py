@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from utils.backends import CACHE_DIR_NAME, InferenceBackend, weights_hash
+from utils.detection import make_result
+from utils.detection_log import DetectionLog, DetectionLogWriter
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def video_hash(path, samples=16, block_size=1 << 20):
+    """
+    Хэш содержимого видео по размеру и samples блокам, равномерно взятым по файлу.
+    Многогигабайтный файл не читается целиком, а любая перекодировка или обрезка
+    меняет размер или выборочные блоки.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        if size <= samples * block_size:
+            for chunk in iter(lambda: f.read(block_size), b''):
+                h.update(chunk)
+        else:
+            step = (size - block_size) // (samples - 1)
+            for i in range(samples):
+                f.seek(i * step)
+                h.update(f.read(block_size))
+    return h.hexdigest()[:16]
+
+
+def default_cache_root(model_path):
+    """Рядом с кэшем экспортов: <папка весов>/.cache/results"""
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), CACHE_DIR_NAME, 'results')
+
+
+class ResultCache:
+    """
+    Дисковый кэш детекций целого видео. Запись - журнал utils.detection_log
+    (<ключ>.detlog); ключ - хэш видео, хэш весов, imgsz, бэкенд, пороги и
+    параметры планировщика. Общий объём ограничен max_bytes: при превышении
+    удаляются записи, к которым дольше всего не обращались (LRU).
+    Статистика (попадания, промахи, объём) хранится в manifest.json.
+    """
+
+    def __init__(self, root, max_bytes=2 << 30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, MANIFEST_FILE)
+        try:
+            with open(self._manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {'entries': {}, 'hits': 0, 'misses': 0, 'evictions': 0}
+        self._hashes = {}
+
+    def _save(self):
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _hash(self, fn, path):
+        # Хэши файлов запоминаются по (путь, размер, mtime) на время жизни кэша
+        stat = os.stat(path)
+        key = (fn.__name__, os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._hashes:
+            self._hashes[key] = fn(path)
+        return self._hashes[key]
+
+    def key(self, video_path, model_path, imgsz, backend, options=None,
+            conf=InferenceBackend.conf, iou=InferenceBackend.iou):
+        parts = {
+            'video': self._hash(video_hash, video_path),
+            'weights': self._hash(weights_hash, model_path),
+            'imgsz': imgsz,
+            'backend': backend,
+            'conf': conf,
+            'iou': iou,
+            'options': options or {},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.detlog")
+
+    def lookup(self, key):
+        """Путь к записи или None; учитывается в статистике и обновляет время доступа"""
+        with self._lock:
+            entry = self.manifest['entries'].get(key)
+            if entry is not None and not os.path.isdir(self.path(key)):
+                del self.manifest['entries'][key]
+                entry = None
+            if entry is None:
+                self.manifest['misses'] += 1
+                self._save()
+                return None
+            entry['last_used'] = time.time()
+            self.manifest['hits'] += 1
+            self._save()
+            return self.path(key)
+
+    def begin(self, key, names, source):
+        """Писатель временной записи; попадает в кэш только после commit()"""
+        partial = self.path(key) + '.partial'
+        shutil.rmtree(partial, ignore_errors=True)
+        return DetectionLogWriter(partial, names=names, source=source)
+
+    def commit(self, key, writer, meta):
+        writer.close()
+        size = writer.size_bytes()
+        target = self.path(key)
+        with self._lock:
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(writer.path, target)
+            now = time.time()
+            self.manifest['entries'][key] = dict(meta, bytes=size, created=now, last_used=now)
+            self._evict()
+            self._save()
+
+    def abort(self, writer):
+        writer.close()
+        shutil.rmtree(writer.path, ignore_errors=True)
+
+    def _evict(self):
+        entries = self.manifest['entries']
+        total = sum(e['bytes'] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]['bytes']
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            del entries[key]
+            self.manifest['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            entries = self.manifest['entries']
+            lookups = self.manifest['hits'] + self.manifest['misses']
+            return {
+                'entries': len(entries),
+                'bytes': sum(e['bytes'] for e in entries.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.manifest['hits'],
+                'misses': self.manifest['misses'],
+                'hit_rate': self.manifest['hits'] / lookups if lookups else 0.0,
+                'evictions': self.manifest['evictions'],
+            }
+
+
+class ReplayPredictor:
+    """
+    predict(frames) по записи кэша вместо модели: кадры приходят строго по
+    порядку (FramePipeline для файлов ничего не выбрасывает), поэтому номер
+    кадра - просто счётчик.
+    """
+
+    name = 'cache'
+
+    def __init__(self, path):
+        log = DetectionLog(path)
+        self.names = log.names
+        records = log.query()
+        self._frames = records['frame']
+        tracked = bool(len(records)) and bool((records['track_id'] >= 0).any())
+        columns = [records['x1'], records['y1'], records['x2'], records['y2']]
+        if tracked:
+            columns.append(records['track_id'])
+        columns += [records['conf'], records['cls']]
+        self._data = np.column_stack(columns).astype(np.float32) if len(records) else \
+            np.empty((0, 7 if tracked else 6), dtype=np.float32)
+        self._next = 0
+
+    def data(self, index):
+        lo, hi = np.searchsorted(self._frames, [index, index + 1])
+        return self._data[lo:hi]
+
+    def predict(self, frames):
+        results = []
+        for frame in frames:
+            results.append(make_result(frame, self.names, self.data(self._next)))
+            self._next += 1
+        return results
@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+
+import cv2
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS - глобальная переменная процесса, меняем её под блокировкой
+_ffmpeg_options_lock = threading.Lock()
+
+TRANSPORTS = ('tcp', 'udp')
+
+
+def open_ffmpeg_capture(url, transport='tcp', buffer_size=1, open_timeout_ms=5000):
+    """cv2.VideoCapture для сетевого потока с минимальной буферизацией"""
+    options = f"rtsp_transport;{transport}|fflags;nobuffer|flags;low_delay"
+    with _ffmpeg_options_lock:
+        previous = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+        os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = options
+        try:
+            cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, open_timeout_ms,
+            ])
+        finally:
+            if previous is None:
+                os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+            else:
+                os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = previous
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return cap
+
+
+def open_video_source(source, transport='tcp'):
+    """RTSPCapture для rtsp://, обычный cv2.VideoCapture для файлов и прочих источников"""
+    if str(source).startswith('rtsp://'):
+        return RTSPCapture(source, transport=transport)
+    return cv2.VideoCapture(source)
+
+
+class RTSPCapture:
+    """
+    Устойчивый захват сетевого потока с интерфейсом cv2.VideoCapture (read/isOpened/get/release).
+
+    Отдельный поток непрерывно вычитывает кадры и хранит только самый свежий,
+    поэтому read() никогда не отдаёт устаревший кадр из буфера декодера.
+    При обрыве поток переподключается с экспоненциальной задержкой; max_reconnects
+    ограничивает число подряд неудачных попыток (None - пытаться бесконечно).
+
+    open_capture(url) можно подменить, например, на cv2.VideoCapture для локального
+    файла - это удобная замена RTSP-серверу при проверке переподключений.
+    """
+
+    def __init__(self, url, transport='tcp', buffer_size=1, backoff=0.5, max_backoff=10.0,
+                 max_reconnects=None, gap_threshold=1.0, open_capture=None):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown RTSP transport: {transport}")
+        self.url = url
+        self.transport = transport
+        self.buffer_size = buffer_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_reconnects = max_reconnects
+        self.gap_threshold = gap_threshold
+        self.open_capture = open_capture or (
+            lambda u: open_ffmpeg_capture(u, self.transport, self.buffer_size))
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._seq = 0
+        self._delivered_seq = 0
+        self._running = True
+        self._failed = False
+        self._props = {}
+
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.frames_grabbed = 0
+        self.frames_delivered = 0
+        self.stale_dropped = 0
+        self.latency_sum = 0.0
+        self.last_latency = 0.0
+        self.gap_count = 0
+        self.gap_max = 0.0
+        self.gap_sum = 0.0
+        self.stalls = 0
+        self._last_grab = None
+
+        # Первое подключение синхронное, чтобы isOpened() сразу отражал доступность потока
+        self._cap = self._open()
+        self._thread = None
+        if self._cap is not None:
+            self._thread = threading.Thread(target=self._grab_loop, name='rtsp-grab', daemon=True)
+            self._thread.start()
+
+    def _open(self):
+        cap = self.open_capture(self.url)
+        if cap is None or not cap.isOpened():
+            if cap is not None:
+                cap.release()
+            return None
+        for prop in (cv2.CAP_PROP_FPS, cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            value = cap.get(prop)
+            if value:
+                self._props[prop] = value
+        return cap
+
+    def isOpened(self):
+        return self._cap is not None and not self._failed
+
+    def get(self, prop):
+        return self._props.get(prop, 0.0)
+
+    def _record_gap(self, now):
+        if self._last_grab is not None:
+            gap = now - self._last_grab
+            self.gap_count += 1
+            self.gap_sum += gap
+            self.gap_max = max(self.gap_max, gap)
+            if gap > self.gap_threshold:
+                self.stalls += 1
+        self._last_grab = now
+
+    def _reconnect(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+        attempt = 0
+        while self._running:
+            if self.max_reconnects is not None and attempt >= self.max_reconnects:
+                print(f"[RTSP] Giving up after {attempt} reconnect attempts")
+                return False
+            delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+            print(f"[RTSP] Stream lost, reconnecting in {delay:.1f} s")
+            deadline = time.monotonic() + delay
+            while self._running and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if not self._running:
+                return False
+
+            self.reconnect_attempts += 1
+            attempt += 1
+            cap = self._open()
+            if cap is not None:
+                self._cap = cap
+                self.reconnects += 1
+                print(f"[RTSP] Reconnected ({self.reconnects} reconnects total)")
+                return True
+        return False
+
+    def _grab_loop(self):
+        try:
+            while self._running:
+                ret, frame = self._cap.read()
+                if not ret:
+                    if not self._reconnect():
+                        break
+                    continue
+
+                now = time.perf_counter()
+                with self._cond:
+                    self._record_gap(now)
+                    if self._seq > self._delivered_seq:
+                        # Предыдущий кадр так и не был прочитан - заменяем его свежим
+                        self.stale_dropped += 1
+                    self._frame = frame
+                    self._frame_time = now
+                    self._seq += 1
+                    self.frames_grabbed += 1
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._failed = self._running
+                self._running = False
+                self._cond.notify_all()
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+    def read(self, timeout=None):
+        """Самый свежий ещё не выданный кадр; ждёт его, пока поток жив"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= self._delivered_seq:
+                if not self._running:
+                    return False, None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False, None
+                self._cond.wait(0.1 if remaining is None else min(0.1, remaining))
+
+            self._delivered_seq = self._seq
+            self.frames_delivered += 1
+            self.last_latency = time.perf_counter() - self._frame_time
+            self.latency_sum += self.last_latency
+            return True, self._frame
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def release(self):
+        self.stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'transport': self.transport,
+                'reconnects': self.reconnects,
+                'reconnect_attempts': self.reconnect_attempts,
+                'frames_grabbed': self.frames_grabbed,
+                'frames_delivered': self.frames_delivered,
+                'stale_dropped': self.stale_dropped,
+                'latency_ms': self.last_latency * 1000.0,
+                'mean_latency_ms': (self.latency_sum / self.frames_delivered * 1000.0
+                                    if self.frames_delivered else 0.0),
+                'mean_gap_ms': self.gap_sum / self.gap_count * 1000.0 if self.gap_count else 0.0,
+                'max_gap_ms': self.gap_max * 1000.0,
+                'stalls': self.stalls,
+            }
@@ -0,0 +1,216 @@
+# Холодный старт приложения: профиль импортов, кэш определения устройства, метрики запуска.
+# Профиль импортов включается флагом:  python main.py --profile-startup
+# Каждый запуск дописывает строку в logs/startup.jsonl (время до окна, до устройства, до модели).
+import importlib.abc
+import importlib.metadata
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+STARTUP_LOG = os.path.join('logs', 'startup.jsonl')
+DEVICE_CACHE_FILE = 'device.json'
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Обёртка загрузчика модуля: замеряет exec_module"""
+
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler._enter()
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler._leave(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """
+    Время импорта каждого модуля, как у python -X importtime, но в памяти процесса:
+    cumulative - вместе с вложенными импортами, self - без них. Поток учитывается,
+    поэтому фоновые импорты не смешиваются со временем до показа окна.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _enter(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+
+    def _leave(self, name, elapsed):
+        stack = self._local.stack
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self._lock:
+            self.records.append({'module': name, 'thread': threading.current_thread().name,
+                                 'cumulative_ms': elapsed * 1000.0, 'self_ms': (elapsed - nested) * 1000.0,
+                                 'top_level': not stack})
+
+    def top(self, count=20, key='cumulative_ms'):
+        with self._lock:
+            records = list(self.records)
+        return sorted(records, key=lambda r: r[key], reverse=True)[:count]
+
+    def total_ms(self, thread=None):
+        """Суммарное время импортов верхнего уровня (в потоке thread или во всех)"""
+        with self._lock:
+            return sum(r['cumulative_ms'] for r in self.records
+                       if r['top_level'] and (thread is None or r['thread'] == thread))
+
+
+class StartupProfile:
+    """Отметки времени от старта процесса до окна, устройства и загруженной модели"""
+
+    def __init__(self, profile_imports=False):
+        self.start = time.perf_counter()
+        self.marks = {}
+        self.details = {}
+        self.imports = ImportProfiler().install() if profile_imports else None
+        self._written = False
+
+    def mark(self, name, **details):
+        """Первая отметка с этим именем, секунды от старта; повторные игнорируются"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+            self.details.update(details)
+        return self.marks[name]
+
+    def report(self, top=20):
+        report = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'marks_s': {k: round(v, 4) for k, v in self.marks.items()},
+            **self.details,
+        }
+        if self.imports is not None:
+            report['imports_main_ms'] = round(self.imports.total_ms('MainThread'), 1)
+            report['imports_total_ms'] = round(self.imports.total_ms(), 1)
+            report['top_imports'] = [{**r, 'cumulative_ms': round(r['cumulative_ms'], 1),
+                                      'self_ms': round(r['self_ms'], 1)} for r in self.imports.top(top)]
+        return report
+
+    def write(self, path=STARTUP_LOG):
+        """Дописывает отчёт строкой JSON; повторный вызов ничего не делает"""
+        if self._written:
+            return None
+        self._written = True
+        if self.imports is not None:
+            self.imports.uninstall()
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        return report
+
+
+def _nvidia_driver():
+    try:
+        with open('/proc/driver/nvidia/version', encoding='utf-8') as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def device_key():
+    """
+    Всё, от чего зависит ответ torch.cuda.is_available(), без импорта torch:
+    версия torch, видимые GPU, драйвер NVIDIA, интерпретатор.
+    """
+    try:
+        torch_version = importlib.metadata.version('torch')
+    except importlib.metadata.PackageNotFoundError:
+        torch_version = None
+    return '|'.join(str(v) for v in (torch_version, os.environ.get('CUDA_VISIBLE_DEVICES'), _nvidia_driver(),
+                                     sys.executable, platform.machine()))
+
+
+def cached_device(cache_dir):
+    """Результат прошлого определения устройства для той же конфигурации или None"""
+    try:
+        with open(os.path.join(cache_dir, DEVICE_CACHE_FILE), encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get('key') == device_key() else None
+
+
+def probe_device(cache_dir=None):
+    """
+    {'device': 'cuda'|'cpu', 'gpu': имя GPU или None, 'cached': bool}. Импортирует torch,
+    если в cache_dir нет ответа для текущей конфигурации - вызывать из фонового потока.
+    """
+    if cache_dir:
+        entry = cached_device(cache_dir)
+        if entry is not None:
+            return {**entry, 'cached': True}
+
+    start = time.perf_counter()
+    import torch
+
+    cuda = torch.cuda.is_available()
+    entry = {
+        'key': device_key(),
+        'device': 'cuda' if cuda else 'cpu',
+        'gpu': torch.cuda.get_device_name(0) if cuda else None,
+        'probe_ms': round((time.perf_counter() - start) * 1000.0, 1),
+    }
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = os.path.join(cache_dir, DEVICE_CACHE_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, os.path.join(cache_dir, DEVICE_CACHE_FILE))
+    return {**entry, 'cached': False}
+
+
+def warm_imports(modules):
+    """Импорт тяжёлых модулей заранее, в фоновом потоке; {модуль: мс}"""
+    import importlib
+
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"[STARTUP] Failed to preload {name}: {e}")
+            continue
+        timings[name] = round((time.perf_counter() - start) * 1000.0, 1)
+    return timings
@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+
+from utils.detection import box_ios, boxes_data, make_result, nms
+
+
+def tile_positions(length, tile, overlap):
+    """Начала тайлов по одной оси: равномерно, с перекрытием не меньше overlap, последний - у края"""
+    if length <= tile:
+        return [0]
+    step = tile * (1.0 - overlap)
+    count = math.ceil((length - tile) / step) + 1
+    return [int(round(p)) for p in np.linspace(0, length - tile, count)]
+
+
+def tile_grid(width, height, tile, overlap=0.2):
+    """Тайлы (x1, y1, x2, y2) одного размера, покрывающие кадр; пусто, если кадр не больше тайла"""
+    if width <= tile and height <= tile:
+        return []
+    tw, th = min(tile, width), min(tile, height)
+    return [(x, y, x + tw, y + th)
+            for y in tile_positions(height, tile, overlap)
+            for x in tile_positions(width, tile, overlap)]
+
+
+def select_tiles(tiles, candidates, margin=0.5):
+    """Тайлы, пересекающие рамки-кандидаты, расширенные на margin своего размера"""
+    if not len(candidates) or not tiles:
+        return []
+    boxes = candidates[:, :4].astype(np.float32)
+    pad = (boxes[:, 2:4] - boxes[:, :2]) * margin
+    boxes = np.concatenate([boxes[:, :2] - pad, boxes[:, 2:4] + pad], axis=1)
+    grid = np.asarray(tiles, dtype=np.float32)
+    hit = ((grid[:, None, 0] < boxes[None, :, 2]) & (grid[:, None, 2] > boxes[None, :, 0]) &
+           (grid[:, None, 1] < boxes[None, :, 3]) & (grid[:, None, 3] > boxes[None, :, 1]))
+    return [tile for tile, selected in zip(tiles, hit.any(axis=1)) if selected]
+
+
+class TiledInference:
+    """
+    Инференс по перекрывающимся тайлам для мелких знаков на кадрах высокого разрешения.
+
+    Кадр целиком (модель сама уменьшит его до imgsz) и тайлы tile x tile без
+    уменьшения идут одним батчем; рамки тайлов переводятся в координаты кадра и
+    сливаются NMS между тайлами. Дубликат знака, обрезанный краем тайла, почти
+    целиком лежит внутри целой рамки, поэтому перекрытие меряется по меньшей
+    рамке (box_ios), а не по IoU.
+
+    guided=True - сначала только проход по уменьшенному кадру, затем тайлы лишь
+    вокруг найденных кандидатов. Дешевле на кадрах без знаков, но знак, которого
+    уменьшенный проход не увидел совсем, не найдётся.
+    """
+
+    def __init__(self, predict, tile=640, overlap=0.2, guided=False, margin=0.5, nms_iou=0.6):
+        if not 0.0 <= overlap < 1.0:
+            raise ValueError(f"Invalid tile overlap: {overlap}")
+        self.predict = predict
+        self.tile = int(tile)
+        self.overlap = overlap
+        self.guided = guided
+        self.margin = margin
+        self.nms_iou = nms_iou
+        self._grids = {}
+        self.frames = 0
+        self.tiles_run = 0
+        self.tiles_total = 0
+
+    def grid(self, frame):
+        h, w = frame.shape[:2]
+        if (w, h) not in self._grids:
+            self._grids[(w, h)] = tile_grid(w, h, self.tile, self.overlap)
+        return self._grids[(w, h)]
+
+    def __call__(self, frames):
+        if self.guided:
+            full = self.predict(frames)
+            plan = [select_tiles(self.grid(f), boxes_data(r), self.margin) for f, r in zip(frames, full)]
+            crops = [f[y1:y2, x1:x2] for f, tiles in zip(frames, plan) for x1, y1, x2, y2 in tiles]
+            tile_results = self.predict(crops) if crops else []
+        else:
+            plan = [self.grid(f) for f in frames]
+            crops = [f[y1:y2, x1:x2] for f, tiles in zip(frames, plan) for x1, y1, x2, y2 in tiles]
+            # Полные кадры и все тайлы - один вызов модели
+            batch = self.predict(list(frames) + crops)
+            full, tile_results = batch[:len(frames)], batch[len(frames):]
+
+        results = []
+        pos = 0
+        for frame, result, tiles in zip(frames, full, plan):
+            self.frames += 1
+            self.tiles_run += len(tiles)
+            self.tiles_total += len(self.grid(frame))
+            if not tiles:
+                results.append(result)
+                continue
+            parts = [boxes_data(result)]
+            for (x1, y1, _, _), tile_result in zip(tiles, tile_results[pos:pos + len(tiles)]):
+                data = boxes_data(tile_result)
+                data[:, [0, 2]] += x1
+                data[:, [1, 3]] += y1
+                parts.append(data)
+            pos += len(tiles)
+            merged = nms(np.concatenate(parts), self.nms_iou, overlap=box_ios)
+            results.append(make_result(frame, result.names, merged))
+        return results
+
+    def stats(self):
+        return {
+            'tile': self.tile,
+            'overlap': self.overlap,
+            'guided': self.guided,
+            'frames': self.frames,
+            'tiles_per_frame': self.tiles_run / self.frames if self.frames else 0.0,
+            # Для guided - доля тайлов сетки, которые действительно прогнали через модель
+            'tile_fraction': self.tiles_run / self.tiles_total if self.tiles_total else 0.0,
+        }
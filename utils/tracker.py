@@ -0,0 +1,172 @@
+import numpy as np
+
+from utils.detection import box_iou
+
+# Модель постоянной скорости из SORT: состояние [cx, cy, s, r, vx, vy, vs],
+# s - площадь рамки, r - соотношение сторон (считается постоянным)
+_F = np.eye(7)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 1e-4])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+
+def _to_z(boxes):
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-6)], axis=1)
+
+
+def _to_boxes(x):
+    s = np.maximum(x[:, 2], 1e-6)
+    w = np.sqrt(s * np.maximum(x[:, 3], 1e-6))
+    h = s / w
+    return np.stack([x[:, 0] - w / 2, x[:, 1] - h / 2, x[:, 0] + w / 2, x[:, 1] + h / 2], axis=1)
+
+
+def greedy_match(ious, threshold):
+    """Пары (строка, столбец) по убыванию IoU, каждая строка и столбец не более одного раза"""
+    rows, cols = np.nonzero(ious >= threshold)
+    if not len(rows):
+        return []
+    order = np.argsort(-ious[rows, cols], kind='stable')
+    used_rows, used_cols, pairs = set(), set(), []
+    for i, j in zip(rows[order].tolist(), cols[order].tolist()):
+        if i in used_rows or j in used_cols:
+            continue
+        used_rows.add(i)
+        used_cols.add(j)
+        pairs.append((i, j))
+    return pairs
+
+
+class SignTracker:
+    """
+    Лёгкий SORT-трекер на NumPy: фильтр Калмана по всем трекам сразу (векторно)
+    и жадное сопоставление по IoU внутри одного класса.
+
+    update(data)  - кадр с детекциями (N, 6): x1, y1, x2, y2, conf, cls;
+    predict()     - кадр без инференса, рамки только экстраполируются.
+    Оба метода возвращают (M, 7): x1, y1, x2, y2, track_id, conf, cls -
+    тот же порядок столбцов, что у ultralytics Boxes с трекингом.
+
+    Как в SORT, выдаются только подтверждённые треки (hits >= min_hits): одиночные
+    ложные срабатывания не мигают на экране, цена - знак появляется на min_hits-м
+    кадре с инференсом.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=5, min_hits=2, conf_alpha=0.3):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.conf_alpha = conf_alpha
+
+        self.x = np.zeros((0, 7))
+        self.P = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.cls = np.zeros(0, dtype=np.int64)
+        self.conf = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.streak = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+
+        self._next_id = 1
+        self.confirmed = {}
+        self.births = 0
+        self.deaths = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def stable(self):
+        """Треки есть, все подтверждены, на последнем обновлении никто не появился и не пропал"""
+        return (len(self.ids) > 0 and self.births == 0 and self.deaths == 0
+                and bool(np.all(self.streak >= self.min_hits)))
+
+    def _predict_state(self):
+        if not len(self.ids):
+            return
+        # Площадь не может стать отрицательной
+        shrink = self.x[:, 2] + self.x[:, 6] <= 0
+        self.x[shrink, 6] = 0.0
+        self.x = self.x @ _F.T
+        self.P = _F @ self.P @ _F.T + _Q
+
+    def _output(self, mask):
+        boxes = _to_boxes(self.x[mask])
+        return np.column_stack([boxes, self.ids[mask], self.conf[mask], self.cls[mask]]).astype(np.float32)
+
+    def predict(self):
+        self._predict_state()
+        return self._output(self.hits >= self.min_hits)
+
+    def update(self, data):
+        self._predict_state()
+        data = np.asarray(data, dtype=np.float64).reshape(-1, 6)
+
+        ious = box_iou(_to_boxes(self.x), data[:, :4]) if len(self.ids) else np.zeros((0, len(data)))
+        if ious.size:
+            ious[self.cls[:, None] != data[:, 5].astype(np.int64)[None, :]] = 0.0
+        pairs = greedy_match(ious, self.iou_threshold)
+
+        matched = np.zeros(len(self.ids), dtype=bool)
+        used = np.zeros(len(data), dtype=bool)
+        if pairs:
+            t, d = (np.array(v) for v in zip(*pairs))
+            matched[t] = True
+            used[d] = True
+
+            # Шаг коррекции Калмана для всех сопоставленных треков разом
+            z = _to_z(data[d, :4])
+            y = z - self.x[t, :4]
+            P = self.P[t]
+            S = P[:, :4, :4] + _R
+            K = P[:, :, :4] @ np.linalg.inv(S)
+            self.x[t] += np.einsum('nij,nj->ni', K, y)
+            self.P[t] = P - K @ P[:, :4, :]
+
+            self.conf[t] = self.conf_alpha * data[d, 4] + (1.0 - self.conf_alpha) * self.conf[t]
+            self.hits[t] += 1
+
+        self.streak[matched] += 1
+        self.streak[~matched] = 0
+        self.misses[matched] = 0
+        self.misses[~matched] += 1
+
+        new = data[~used]
+        self.births = len(new)
+        if len(new):
+            n = len(new)
+            self.x = np.vstack([self.x, np.column_stack([_to_z(new[:, :4]), np.zeros((n, 3))])])
+            self.P = np.concatenate([self.P, np.repeat(_P0[None], n, axis=0)])
+            self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + n)])
+            self._next_id += n
+            self.cls = np.concatenate([self.cls, new[:, 5].astype(np.int64)])
+            self.conf = np.concatenate([self.conf, new[:, 4]])
+            self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int64)])
+            self.streak = np.concatenate([self.streak, np.ones(n, dtype=np.int64)])
+            self.misses = np.concatenate([self.misses, np.zeros(n, dtype=np.int64)])
+            matched = np.concatenate([matched, np.ones(n, dtype=bool)])
+
+        # Трек подтверждается ровно один раз - в момент, когда hits достигает min_hits
+        just_confirmed = matched & (self.hits == self.min_hits)
+        for track_id, class_id in zip(self.ids[just_confirmed].tolist(), self.cls[just_confirmed].tolist()):
+            self.confirmed[track_id] = class_id
+
+        output = self._output(matched & (self.hits >= self.min_hits))
+
+        alive = self.misses <= self.max_age
+        self.deaths = int(np.count_nonzero(~alive))
+        if self.deaths:
+            for name in ('x', 'P', 'ids', 'cls', 'conf', 'hits', 'streak', 'misses'):
+                setattr(self, name, getattr(self, name)[alive])
+        return output
+
+    def unique_signs(self, names=None):
+        """Число уникальных подтверждённых знаков по классам за всё время"""
+        counts = {}
+        for class_id in self.confirmed.values():
+            key = names[class_id] if names else class_id
+            counts[key] = counts.get(key, 0) + 1
+        return counts
@@ -3,9 +3,22 @@ from PyQt6.QtGui import QImage
 import cv2
 import time
 import traceback
-from ultralytics import YOLO
 import sys
+import json
 import os
+from utils.frame_pipeline import FramePipeline, is_live_source
+from utils.detection import extract_detection_info, result_to_records
+from utils.backends import create_backend, resolve_backend_name
+from utils.frame_buffers import FrameBufferRing
+from utils.presentation import PresentationScheduler
+from utils.inference_scheduler import InferenceScheduler
+from utils.tracker import SignTracker
+from utils.video_writer import AsyncVideoWriter
+from utils.rtsp_ingest import RTSPCapture, open_video_source
+from utils.metrics import MetricsServer, StageMetrics, write_snapshot
+from utils.overlay import OVERLAY_FRAME, OVERLAY_MODES, OverlayRenderer, result_data
+from utils.detection_log import DetectionLogWriter
+from utils.result_cache import ReplayPredictor
 
 def resource_path(relative_path):
     try:
@@ -15,12 +28,22 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class VideoThread(QThread):
-    frame_ready = pyqtSignal(QImage)
+    # QImage указывает на буфер из display_buffers; слот возвращается через release_display_buffer
+    frame_ready = pyqtSignal(QImage, int)
     fps_ready = pyqtSignal(float)
     finished_signal = pyqtSignal()
     detection_info_ready = pyqtSignal(dict)
-
-    def __init__(self, model_path, video_path, output_path, device='cpu', imgsz=640, save_video=False):
+    model_ready = pyqtSignal(str)
+    display_stats_ready = pyqtSignal(dict)
+    # {'stages': {стадия: {count, mean_ms, p50_ms, p95_ms, p99_ms, buckets}}, 'bottleneck': стадия}
+    metrics_ready = pyqtSignal(dict)
+
+    def __init__(self, model_path, video_path, output_path, device='cpu', imgsz=640, save_video=False,
+                 drop_policy=None, queue_size=2, batch_size=1, backend='torch',
+                 model_manager=None, display_fps=30.0, frame_skip=1, target_fps=None, rois=None,
+                 tracking=False, codec='xvid', rtsp_transport='tcp', metrics_path=None,
+                 metrics_port=None, metrics_interval=1.0, overlay=OVERLAY_FRAME, detection_log=None,
+                 result_cache=None, tiling=None):
         super().__init__()
 
         if not os.path.isabs(model_path) and not model_path.startswith(('rtsp://', 'http://')):
@@ -28,25 +51,152 @@ class VideoThread(QThread):
         else:
             self.model_path = model_path
         self.video_path = video_path
-        self.output_path = os.path.join(os.path.expanduser("~"), "Road_Sign_Recognition_Result.avi")
+        self.output_path = output_path
         self.device = device
         self.imgsz = imgsz
         self.save_video = save_video
-
-        self.model = YOLO(model_path)
-        try:
-            self.cap = cv2.VideoCapture(video_path)
-        except Exception:
-            self.cap = None
+        # None -> 'latest' для живых источников, 'block' для файлов
+        self.drop_policy = drop_policy
+        self.queue_size = queue_size
+        # Для файлов: число кадров на один вызов predict, 'auto' - подбор по ядрам
+        self.batch_size = batch_size
+        self.pipeline = None
+        self.display_buffers = FrameBufferRing(slots=3)
+        self.display_size = None
+        # Частота обновления GUI (кадр, FPS, таблица детекций) не выше display_fps
+        self.presenter = PresentationScheduler(display_fps)
+        # Пропуск кадров / зоны интереса / тайлы, см. InferenceScheduler; по умолчанию выключены
+        self.scheduler_options = {'frame_skip': frame_skip, 'target_fps': target_fps, 'rois': rois,
+                                  'tiling': tiling}
+        # SORT-трекер: стабильные id знаков и пропуск инференса, пока треки стабильны
+        self.tracker = SignTracker() if tracking else None
+        self.scheduler = None
+
+        # 'torch', 'onnx', 'openvino' или 'auto' - самый быстрый на этой машине
+        self.backend = backend
+        # Модель и источник открываются в run(), чтобы не блокировать GUI-поток
+        self.model_manager = model_manager
+        self.model = None
+        self.cap = None
+        # RTSP читается через RTSPCapture: переподключение и только свежие кадры
+        self.rtsp_transport = rtsp_transport
 
         self.is_paused = False
         self.running = True
         self.released = False
-        self.out = None
-        self.video_writer_initialized = False
+        # Запись идёт в отдельном потоке (AsyncVideoWriter) и не тормозит обработку
+        self.codec = codec
+        self.writer = None
+
+        # 'frame' - рамки рисуются в сам кадр и попадают в запись;
+        # 'none'  - записываются исходные кадры, детекции - в <видео>_detections.jsonl,
+        #           рамки для показа рисуются только в уменьшенный буфер экрана
+        if overlay not in OVERLAY_MODES:
+            raise ValueError(f"Unknown overlay mode: {overlay}")
+        self.overlay = overlay
+        self.renderer = OverlayRenderer()
+        self.sidecar = None
+
+        # Каталог .detlog: все рамки каждого кадра с временем, см. utils.detection_log
+        self.detection_log_path = detection_log
+        self.detection_log = None
+
+        # ResultCache: для файлов детекции берутся из кэша без загрузки модели,
+        # при промахе полный прогон записывается в кэш
+        self.result_cache = result_cache
+        self.cache_key = None
+        self.cache_writer = None
+        self.replay = False
+        self._replay_clock = None
+
+        # Задержки стадий кадра; экспорт в файл (.prom или .json) и/или по HTTP
+        self.metrics = StageMetrics()
+        self.metrics_path = metrics_path
+        self.metrics_port = metrics_port
+        self.metrics_interval = metrics_interval
+        self.metrics_server = None
+        self._last_metrics = 0.0
+
+    def load_model(self):
+        start = time.perf_counter()
+        if self.model_manager is not None:
+            model = None
+            # Ждём короткими интервалами, чтобы stop() не зависал на загрузке модели
+            while model is None:
+                if not self.running:
+                    return None
+                try:
+                    model = self.model_manager.get(self.model_path, self.backend, self.device,
+                                                   self.imgsz, timeout=0.1)
+                except TimeoutError:
+                    continue
+        else:
+            model = create_backend(self.backend, self.model_path, device=self.device, imgsz=self.imgsz)
+        print(f"[THREAD] Inference backend: {model.name}, ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return model
+
+    def cache_options(self):
+        # Всё, что кроме модели и видео влияет на набор рамок
+        return dict(self.scheduler_options, tracking=self.tracker is not None)
+
+    def lookup_cache(self, backend):
+        try:
+            self.cache_key = self.result_cache.key(self.video_path, self.model_path, self.imgsz, backend,
+                                                   self.cache_options())
+        except OSError as e:
+            print(f"[THREAD] Result cache unavailable: {e}")
+            self.result_cache = None
+            return None
+        path = self.result_cache.lookup(self.cache_key)
+        if path is not None:
+            try:
+                return ReplayPredictor(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[THREAD] Broken result cache entry {path}: {e}")
+        return None
 
     def run(self):
         try:
+            live = is_live_source(self.video_path)
+            replay = None
+            use_cache = self.result_cache is not None and not live
+            backend = resolve_backend_name(self.backend, self.model_path, self.device, self.imgsz) \
+                if use_cache else None
+            if backend is not None:
+                replay = self.lookup_cache(backend)
+
+            if replay is None:
+                self.model = self.load_model()
+                if self.model is None:
+                    print("[THREAD] Stopped while waiting for model")
+                    return
+                # 'auto' без сохранённого замера: ключ известен только после загрузки
+                if use_cache and self.cache_key is None and self.result_cache is not None:
+                    replay = self.lookup_cache(self.model.name)
+
+            if replay is not None:
+                print(f"[THREAD] Result cache hit {self.cache_key}: replaying detections, model not used")
+                self.model = replay
+                self.replay = True
+                self.model_ready.emit(replay.name)
+                # Кэш записан уже после пропуска кадров и трекинга
+                self.scheduler = InferenceScheduler(replay.predict)
+            else:
+                self.model_ready.emit(self.model.name)
+                self.scheduler = InferenceScheduler(self.model.predict, tracker=self.tracker,
+                                                    **self.scheduler_options)
+                if self.cache_key is not None and self.result_cache is not None:
+                    try:
+                        self.cache_writer = self.result_cache.begin(self.cache_key, self.model.names,
+                                                                    self.video_path)
+                    except OSError as e:
+                        print(f"[THREAD] Cannot write result cache: {e}")
+
+            try:
+                self.cap = open_video_source(self.video_path, self.rtsp_transport)
+            except Exception:
+                self.cap = None
+
             if not self.cap or not self.cap.isOpened():
                 print("[THREAD] Cannot open video file")
                 return
@@ -60,65 +210,58 @@ class VideoThread(QThread):
             print(f"[DEBUG] Save video enabled: {self.save_video}")
             print(f"[DEBUG] Output path: {self.output_path}")
 
-            frame_count = 0
-            while self.running:
-                if self.is_paused:
-                    self.msleep(100)
-                    continue
-
-                ret, frame = self.cap.read()
-                if not ret:
-                    print("[THREAD] End of video or cannot read frame")
-                    break
-
-                frame_count += 1
-                start_time = time.time()
+            self.fps = fps
+            self.frame_size = (width, height)
+            self.frame_count = 0
+            self.live = live
+            self.start_wall = time.time()
 
-                # Безопасный вызов predict
+            if self.detection_log_path:
                 try:
-                    results = self.model.predict(frame, verbose=False, imgsz=self.imgsz, device=self.device)
-                    annotated = results[0].plot()
-
-                    detection_dict = self.extract_detection_info(results[0])
-                    if detection_dict:
-                        self.detection_info_ready.emit(detection_dict)
-
-                    if self.save_video:
-                        if not self.video_writer_initialized:
-                            fourcc = cv2.VideoWriter_fourcc(*'XVID')
-                            self.out = cv2.VideoWriter(self.output_path, fourcc, fps, (width, height))
-                            if self.out.isOpened():
-                                self.video_writer_initialized = True
-                                print(f"[THREAD] Video recording STARTED: {self.output_path}")
-                                print(f"[THREAD] Video writer initialized with: {width}x{height}, FPS: {fps}")
-                            else:
-                                print(f"[THREAD] FAILED to initialize video writer")
-                                self.save_video = False
-
-                        if self.video_writer_initialized and self.out.isOpened():
-                            self.out.write(annotated)
-                            if frame_count % 30 == 0:
-                                print(f"[THREAD] Frame {frame_count} written to video")
-
-                except Exception as e:
-                    print(f"[THREAD] Prediction error: {e}")
-                    traceback.print_exc()
-                    break
+                    self.detection_log = DetectionLogWriter(self.detection_log_path, names=self.model.names,
+                                                            source=self.video_path)
+                except OSError as e:
+                    print(f"[THREAD] Cannot open detection log: {e}")
 
+            if self.metrics_port is not None:
                 try:
-                    rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
-                    h, w, ch = rgb.shape
-                    bytes_per_line = ch * w
-
-                    qimg = QImage(rgb.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                    self.frame_ready.emit(qimg.copy())
-                except Exception as e:
-                    print(f"[THREAD] Image conversion error: {e}")
-                    continue
-
-                end_time = time.time()
-                fps_now = 1.0 / (end_time - start_time + 1e-6)
-                self.fps_ready.emit(fps_now)
+                    self.metrics_server = MetricsServer(self.metrics, port=self.metrics_port)
+                except OSError as e:
+                    print(f"[THREAD] Cannot start metrics endpoint: {e}")
+
+            self.pipeline = FramePipeline(
+                self.cap,
+                self.predict_frames,
+                self.render_frame,
+                live=live,
+                policy=self.drop_policy,
+                queue_size=self.queue_size,
+                batch_size=self.batch_size,
+                metrics=self.metrics
+            )
+            self.pipeline.paused = self.is_paused
+            if not self.running:
+                self.pipeline.stop()
+            print(f"[DEBUG] Pipeline queue policy: {self.pipeline.capture_queue.policy}, "
+                  f"size: {self.pipeline.capture_queue.maxsize}, batch: {self.batch_size}")
+
+            self.pipeline.run()
+            self.finish_cache()
+
+            # Детекции последних кадров могли не дождаться такта показа
+            detections = self.presenter.take_detections()
+            if detections:
+                self.detection_info_ready.emit(detections)
+            print(f"[THREAD] Pipeline stats: {self.pipeline.stats()}")
+            print(f"[THREAD] Presentation stats: {self.presenter.stats()}")
+            self.publish_metrics(force=True)
+            print(f"[THREAD] Stage latency: {self.metrics.snapshot()}")
+            if not self.scheduler.passthrough:
+                print(f"[THREAD] Scheduler report: {self.scheduler.report()}")
+            if isinstance(self.cap, RTSPCapture):
+                print(f"[THREAD] RTSP ingest stats: {self.cap.stats()}")
+            if self.tracker is not None and not self.replay:
+                print(f"[THREAD] Unique signs: {self.tracker.unique_signs(self.model.names)}")
 
         except Exception as e:
             print(f"[THREAD] Exception in run: {e}")
@@ -132,36 +275,224 @@ class VideoThread(QThread):
             except Exception as e:
                 print(f"[THREAD] Error emitting finished signal: {e}")
 
-    def extract_detection_info(self, result):
-        try:
-            boxes = result.boxes
-            if boxes is None or len(boxes) == 0:
-                return {}
-
-            detection_dict = {}
+    def predict_frames(self, frames):
+        return self.scheduler(frames)
+
+    def render_frame(self, index, frame, result):
+        self.frame_count += 1
+        # preprocess / inference / nms из замеров самого ultralytics
+        self.metrics.record_speed(getattr(result, 'speed', None))
+        data = result_data(result)
+        if self.detection_log is not None or self.cache_writer is not None:
+            self.log_detections(index, data)
+        if self.replay:
+            self.pace_replay(index)
+        if self.overlay == OVERLAY_FRAME:
+            # Кадр принадлежит нам до передачи писателю, поэтому рисуем прямо в него
+            with self.metrics.stage('plot'):
+                annotated = self.renderer.draw(frame, data, result.names)
+        else:
+            annotated = frame
 
-            for box in boxes:
-                class_id = int(box.cls.item())
-                confidence = box.conf.item()
-                class_name = result.names[class_id]
+        detection_dict = self.extract_detection_info(result)
+        due = self.presenter.frame_processed(detection_dict)
 
-                if class_name in detection_dict:
-                    if confidence > detection_dict[class_name]:
-                        detection_dict[class_name] = confidence
-                else:
-                    detection_dict[class_name] = confidence
+        if self.save_video:
+            with self.metrics.stage('write'):
+                self.write_frame(annotated)
+                if self.overlay != OVERLAY_FRAME:
+                    self.write_sidecar(index, result)
 
-            return detection_dict
+        # Между тактами показа кадр только записывается, GUI не трогаем
+        if not due:
+            return
 
+        displayed = False
+        try:
+            overlay = None if self.overlay == OVERLAY_FRAME else (data, result.names)
+            displayed = self.emit_display_frame(annotated, overlay)
         except Exception as e:
-            print(f"Error extracting detection info: {e}")
+            print(f"[THREAD] Image conversion error: {e}")
+        self.present_tick(displayed)
+
+    def present_tick(self, displayed):
+        detections = self.presenter.take_detections()
+        if detections:
+            self.detection_info_ready.emit(detections)
+        if displayed:
+            self.presenter.mark_displayed()
+        if self.presenter.processing_fps:
+            self.fps_ready.emit(self.presenter.processing_fps)
+        stats = self.presenter.stats()
+        if isinstance(self.cap, RTSPCapture):
+            stats['ingest'] = self.cap.stats()
+        self.display_stats_ready.emit(stats)
+        self.publish_metrics()
+
+    def publish_metrics(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self._last_metrics < self.metrics_interval:
+            return
+        self._last_metrics = now
+
+        snapshot = self.metrics.snapshot()
+        if not snapshot:
+            return
+        self.metrics_ready.emit({'stages': snapshot, 'bottleneck': self.metrics.bottleneck(snapshot)})
+        if self.metrics_path:
+            try:
+                write_snapshot(self.metrics_path, snapshot)
+            except OSError as e:
+                print(f"[THREAD] Cannot write metrics: {e}")
+                self.metrics_path = None
+
+    def set_display_size(self, width, height):
+        self.display_size = (max(1, width), max(1, height))
+
+    def display_shape(self, h, w):
+        if self.display_size is None:
+            return h, w
+        # Вписываем кадр в область показа с сохранением пропорций
+        scale = min(self.display_size[0] / w, self.display_size[1] / h)
+        return max(1, int(h * scale)), max(1, int(w * scale))
+
+    def emit_display_frame(self, annotated, overlay=None):
+        """overlay=(data, names) - рамки рисуются в буфер экрана после масштабирования"""
+        h, w = annotated.shape[:2]
+        th, tw = self.display_shape(h, w)
+
+        start = time.perf_counter()
+        slot, buf = self.display_buffers.acquire((th, tw, 3))
+        if slot is None:
+            # GUI ещё не отрисовал предыдущие кадры - этот не показываем
+            return False
+
+        # Масштабирование выполняется здесь, в GUI-поток уходит готовый кадр в BGR
+        if (th, tw) == (h, w):
+            buf[...] = annotated
+        else:
+            interpolation = cv2.INTER_AREA if tw < w else cv2.INTER_LINEAR
+            cv2.resize(annotated, (tw, th), dst=buf, interpolation=interpolation)
+        if overlay is not None:
+            self.renderer.draw(buf, overlay[0], overlay[1], scale=tw / w)
+
+        qimg = QImage(buf.data, tw, th, buf.strides[0], QImage.Format.Format_BGR888)
+        emit_start = time.perf_counter()
+        self.metrics.record('convert', emit_start - start)
+        self.frame_ready.emit(qimg, slot)
+        self.metrics.record('emit', time.perf_counter() - emit_start)
+        return True
+
+    def release_display_buffer(self, slot):
+        self.display_buffers.release(slot)
+
+    def write_frame(self, annotated):
+        writer = self.writer
+        if writer is None:
+            try:
+                # Для живых источников запись может терять кадры, но не тормозит обработку
+                writer = AsyncVideoWriter(self.output_path, self.fps, codec=self.codec,
+                                          drop_frames=is_live_source(self.video_path),
+                                          metrics=self.metrics)
+            except Exception as e:
+                print(f"[THREAD] FAILED to initialize video writer: {e}")
+                self.save_video = False
+                return
+            self.writer = writer
+
+        if not writer.write(annotated):
+            print("[THREAD] Video writer failed, recording disabled")
+            self.save_video = False
+        elif self.frame_count % 30 == 0:
+            print(f"[THREAD] Frame {self.frame_count} queued for video: {writer.stats()}")
+
+    def log_detections(self, index, data):
+        # Для файлов время кадра берём из его номера, для живых источников - текущее
+        if self.live or not self.fps:
+            wall = time.time()
+            pts = wall - self.start_wall
+        else:
+            pts = index / self.fps
+            wall = self.start_wall + pts
+        if self.detection_log is not None:
+            self.detection_log.append(index, pts, wall, data)
+        if self.cache_writer is not None:
+            self.cache_writer.append(index, pts, wall, data)
+
+    def pace_replay(self, index):
+        # Детекции из кэша готовы мгновенно - отдаём кадры с частотой источника
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self._replay_clock is None:
+            self._replay_clock = now - index / self.fps
+        delay = self._replay_clock + index / self.fps - now
+        if delay > 0:
+            time.sleep(min(delay, 1.0))
+        elif delay < -0.5:
+            # После паузы или медленного показа не догоняем, а продолжаем с текущего момента
+            self._replay_clock = now - index / self.fps
+
+    def finish_cache(self):
+        """В кэш попадает только полный прогон файла: без остановки, ошибок и потерянных кадров"""
+        writer, self.cache_writer = self.cache_writer, None
+        if writer is None:
+            return
+        stats = self.pipeline.stats()
+        dropped = sum(q['dropped'] for q in stats['queues'].values())
+        if not self.running or self.pipeline.error is not None or dropped:
+            self.result_cache.abort(writer)
+            print("[THREAD] Incomplete run, result cache entry discarded")
+            return
+        self.result_cache.commit(self.cache_key, writer, {
+            'video': os.path.abspath(self.video_path),
+            'frames': stats['frames_rendered'],
+            'fps': self.fps,
+        })
+        print(f"[THREAD] Result cache stored {self.cache_key}: {self.result_cache.stats()}")
+
+    def write_sidecar(self, index, result):
+        if self.sidecar is None:
+            path = f"{os.path.splitext(self.output_path)[0]}_detections.jsonl"
+            try:
+                self.sidecar = open(path, 'w', encoding='utf-8')
+            except OSError as e:
+                print(f"[THREAD] Cannot open detections file: {e}")
+                self.overlay = OVERLAY_FRAME
+                return
+            print(f"[THREAD] Detections sidecar: {path}")
+        self.sidecar.write(json.dumps({'frame': index, 'detections': result_to_records(result)}) + '\n')
+
+    def close_sidecar(self):
+        sidecar, self.sidecar = self.sidecar, None
+        if sidecar is not None:
+            sidecar.close()
+
+    def writer_stats(self):
+        return self.writer.stats() if self.writer is not None else {}
+
+    def pipeline_stats(self):
+        if self.pipeline is None:
             return {}
+        return self.pipeline.stats()
+
+    def extract_detection_info(self, result):
+        return extract_detection_info(result)
 
     def toggle_pause(self):
         self.is_paused = not self.is_paused
+        if self.pipeline:
+            self.pipeline.paused = self.is_paused
+            if not self.running:
+                self.pipeline.stop()
 
     def stop(self):
         self.running = False
+        if self.pipeline:
+            self.pipeline.stop()
+        if isinstance(self.cap, RTSPCapture):
+            # read() ждёт кадр и во время переподключения - будим его
+            self.cap.stop()
         self.msleep(100)
 
     def set_save_video(self, save_video):
@@ -169,13 +500,13 @@ class VideoThread(QThread):
         self.save_video = save_video
 
         if save_video and not old_setting:
-            self.video_writer_initialized = False
             print(f"[THREAD] Video saving ENABLED, will start recording next frame")
         elif not save_video and old_setting:
-            if self.out:
-                self.out.release()
-                self.out = None
-            self.video_writer_initialized = False
+            writer, self.writer = self.writer, None
+            if writer:
+                # Дописывание очереди идёт в потоке писателя, GUI не ждёт
+                writer.close(wait=False)
+            self.close_sidecar()
             print("[THREAD] ⚫ Video recording STOPPED")
 
     def release(self):
@@ -187,9 +518,19 @@ class VideoThread(QThread):
             if self.cap:
                 self.cap.release()
                 print("[THREAD] Video capture released")
-            if self.out:
-                self.out.release()
+            if self.writer:
+                self.writer.close()
                 print("[THREAD] Video writer released and file saved")
+            self.close_sidecar()
+            if self.cache_writer is not None:
+                self.result_cache.abort(self.cache_writer)
+                self.cache_writer = None
+            if self.detection_log:
+                self.detection_log.close()
+                print(f"[THREAD] Detection log saved: {self.detection_log_path} "
+                      f"({self.detection_log.rows} boxes)")
+            if self.metrics_server:
+                self.metrics_server.shutdown()
         except Exception as e:
             print(f"[THREAD] Release error: {e}")
         print("[THREAD] All resources released")
\ No newline at end of file
@@ -0,0 +1,158 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+import traceback
+
+import cv2
+
+from utils.frame_pipeline import POLICY_BLOCK, POLICY_DROP_OLDEST, BoundedFrameQueue
+
+# Кодек -> FourCC для cv2.VideoWriter; 'x264' пишется через ffmpeg-пайп
+CODECS = {
+    'xvid': 'XVID',
+    'mjpg': 'MJPG',
+    'mp4v': 'mp4v',
+    'x264': None,
+}
+
+EXTENSIONS = {'xvid': '.avi', 'mjpg': '.avi', 'mp4v': '.mp4', 'x264': '.mp4'}
+
+
+class AsyncVideoWriter:
+    """
+    Запись видео в отдельном потоке за ограниченной очередью.
+
+    С drop_frames=True (живые источники) write() никогда не блокирует поток обработки:
+    если кодировщик не успевает, из очереди выбрасывается самый старый кадр и
+    увеличивается счётчик dropped. С drop_frames=False (файлы) write() ждёт места
+    в очереди, и в результат попадают все кадры.
+    Кадр после write() принадлежит писателю и не должен изменяться вызывающим.
+    Кодировщик создаётся по размеру первого кадра.
+    Время кодирования кадра пишется в стадию 'encode' metrics (StageMetrics), если он задан.
+    """
+
+    def __init__(self, output_path, fps, codec='xvid', queue_size=32, preset='veryfast', crf=23,
+                 drop_frames=True, metrics=None):
+        codec = codec.lower()
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        if codec == 'x264' and shutil.which('ffmpeg') is None:
+            print("[WRITER] ffmpeg not found, falling back to mp4v")
+            codec = 'mp4v'
+
+        self.output_path = output_path
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.metrics = metrics
+
+        self.queue = BoundedFrameQueue('writer', queue_size,
+                                       POLICY_DROP_OLDEST if drop_frames else POLICY_BLOCK)
+        self.encoded = 0
+        self.failed = False
+        self.encode_seconds = 0.0
+        self._backend = None
+        self._thread = threading.Thread(target=self._run, name='video-writer', daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self.queue.dropped
+
+    def write(self, frame):
+        while not self.failed:
+            if self.queue.put(frame):
+                return True
+            if self.queue.closed:
+                return False
+        return False
+
+    def close(self, wait=True, timeout=10.0):
+        """Дописывает оставшиеся в очереди кадры и закрывает файл"""
+        self.queue.close()
+        if wait:
+            self._thread.join(timeout)
+
+    def stats(self):
+        stats = self.queue.stats()
+        return {
+            'path': self.output_path,
+            'codec': self.codec,
+            'queue_depth': stats['depth'],
+            'max_queue_depth': stats['max_depth'],
+            'encoded': self.encoded,
+            'dropped': stats['dropped'],
+            'encode_ms': self.encode_seconds / self.encoded * 1000.0 if self.encoded else 0.0,
+        }
+
+    def _open(self, frame):
+        height, width = frame.shape[:2]
+        directory = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(directory, exist_ok=True)
+
+        if self.codec == 'x264':
+            command = [
+                'ffmpeg', '-y', '-loglevel', 'error',
+                '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{width}x{height}", '-r', str(self.fps),
+                '-i', '-',
+                '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf), '-pix_fmt', 'yuv420p',
+                self.output_path,
+            ]
+            self._backend = subprocess.Popen(command, stdin=subprocess.PIPE)
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*CODECS[self.codec])
+            self._backend = cv2.VideoWriter(self.output_path, fourcc, self.fps, (width, height))
+            if not self._backend.isOpened():
+                raise RuntimeError(f"Cannot open video writer: {self.output_path}")
+
+        print(f"[WRITER] Recording STARTED: {self.output_path} ({self.codec}, {width}x{height}, FPS: {self.fps})")
+
+    def _encode(self, frame):
+        if self.codec == 'x264':
+            self._backend.stdin.write(memoryview(frame).cast('B') if frame.flags['C_CONTIGUOUS']
+                                      else frame.tobytes())
+        else:
+            self._backend.write(frame)
+
+    def _release(self):
+        if self._backend is None:
+            return
+        if self.codec == 'x264':
+            self._backend.stdin.close()
+            self._backend.wait()
+        else:
+            self._backend.release()
+        self._backend = None
+
+    def _run(self):
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    if self.queue.drained():
+                        break
+                    continue
+
+                if self._backend is None:
+                    self._open(frame)
+                start = time.perf_counter()
+                self._encode(frame)
+                elapsed = time.perf_counter() - start
+                self.encode_seconds += elapsed
+                if self.metrics is not None:
+                    self.metrics.record('encode', elapsed)
+                self.encoded += 1
+        except Exception as e:
+            self.failed = True
+            self.queue.close()
+            print(f"[WRITER] Encoding error: {e}")
+            traceback.print_exc()
+        finally:
+            try:
+                self._release()
+            except Exception as e:
+                print(f"[WRITER] Release error: {e}")
+            print(f"[WRITER] Recording STOPPED: {self.stats()}")